@@ -1,13 +1,155 @@
 from django.contrib import admin
-from .models import Categoria, Produto, ProdutoImagem, Peca, Usuario, Pedido, ItemCarrinho, Avaliacao, CartaoCredito, Devolucao
-
-admin.site.register(Categoria)
-admin.site.register(Produto)
-admin.site.register(ProdutoImagem)
-admin.site.register(Peca)
-admin.site.register(Usuario)
-admin.site.register(ItemCarrinho)
-admin.site.register(Pedido)
-admin.site.register(Avaliacao)
-admin.site.register(CartaoCredito)
-admin.site.register(Devolucao)
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+from .models import (
+    Categoria, Produto, ProdutoImagem, Peca, Usuario, Pedido, ItemCarrinho, Avaliacao, CartaoCredito, Devolucao, Promocao,
+)
+
+
+# ---- CONTAGEM ESTIMADA ---- #
+def estimar_linhas(modelo, using="default"):
+    """
+    Número de linhas da tabela segundo as estatísticas do SQLite (sqlite_stat1,
+    preenchida por ANALYZE), sem varrer a tabela. None se não houver estatística.
+    """
+    conexao = connections[using]
+    if conexao.vendor != "sqlite":
+        return None
+    try:
+        with conexao.cursor() as cursor:
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [modelo._meta.db_table])
+            linha = cursor.fetchone()
+    except DatabaseError:
+        # ANALYZE nunca rodou: a tabela sqlite_stat1 não existe
+        return None
+    return int(linha[0].split()[0]) if linha else None
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Sem filtro nem busca, a lista inteira é contada pela estimativa do banco
+    em vez de um COUNT(*); tabelas pequenas (ou sem estatística) continuam
+    com a contagem exata. Com filtros, o COUNT usa os índices do filtro.
+    """
+    limite_exato = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimativa = estimar_linhas(queryset.model, queryset.db)
+            if estimativa is not None and estimativa >= self.limite_exato:
+                return estimativa
+        return super().count
+
+
+class AdminEscalavel(admin.ModelAdmin):
+    # Nada de segundo COUNT(*) da tabela inteira para "N de M selecionados"
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    list_per_page = 50
+
+
+# ---- CATÁLOGO ---- #
+@admin.register(Categoria)
+class CategoriaAdmin(admin.ModelAdmin):
+    search_fields = ["nome"]
+
+
+@admin.register(Produto)
+class ProdutoAdmin(AdminEscalavel):
+    list_display = ["id", "codigo", "nome", "categoria", "preco", "media_avaliacao", "total_avaliacoes"]
+    list_select_related = ["categoria"]
+    list_filter = ["categoria"]
+    search_fields = ["=codigo", "nome"]
+    # Agregados das avaliações são mantidos por APP/avaliacoes.py
+    readonly_fields = [
+        "media_avaliacao", "total_avaliacoes", "soma_avaliacoes",
+        "avaliacoes_nota_1", "avaliacoes_nota_2", "avaliacoes_nota_3", "avaliacoes_nota_4", "avaliacoes_nota_5",
+    ]
+
+
+@admin.register(ProdutoImagem)
+class ProdutoImagemAdmin(AdminEscalavel):
+    list_display = ["id", "produto", "ordem", "imagem"]
+    list_select_related = ["produto"]
+    autocomplete_fields = ["produto"]
+
+
+@admin.register(Peca)
+class PecaAdmin(AdminEscalavel):
+    # __str__ lê produto.nome: sem o JOIN seria uma query por linha
+    list_display = ["id", "nome", "produto", "medida", "peso"]
+    list_select_related = ["produto"]
+    autocomplete_fields = ["produto"]
+    search_fields = ["nome"]
+
+
+@admin.register(Promocao)
+class PromocaoAdmin(AdminEscalavel):
+    # Salvar ou apagar pelo admin invalida a tabela compilada (APP/signals.py)
+    list_display = [
+        "id", "nome", "percentual", "produto", "categoria", "metodo_pagamento", "quantidade_minima", "ativa", "fim",
+    ]
+    list_select_related = ["produto", "categoria"]
+    list_filter = ["ativa", "metodo_pagamento"]
+    search_fields = ["nome"]
+    autocomplete_fields = ["produto", "categoria"]
+
+
+# ---- USUÁRIOS ---- #
+@admin.register(Usuario)
+class UsuarioAdmin(AdminEscalavel):
+    list_display = ["id", "email", "nome", "cargo", "is_staff", "date_joined"]
+    list_filter = ["cargo", "is_staff"]
+    search_fields = ["=email", "=cpf", "nome"]
+    # O hash da senha não é editável por aqui
+    readonly_fields = ["password", "last_login", "date_joined"]
+
+
+@admin.register(CartaoCredito)
+class CartaoCreditoAdmin(AdminEscalavel):
+    list_display = ["id", "__str__", "nome", "usuario"]
+    list_select_related = ["usuario"]
+    raw_id_fields = ["usuario"]
+
+
+# ---- PEDIDOS ---- #
+@admin.register(ItemCarrinho)
+class ItemCarrinhoAdmin(AdminEscalavel):
+    list_display = ["id", "produto", "quantidade"]
+    list_select_related = ["produto"]
+    autocomplete_fields = ["produto"]
+
+
+@admin.register(Pedido)
+class PedidoAdmin(AdminEscalavel):
+    list_display = ["id", "usuario", "status", "metodo_pagamento", "valor_total", "data_criacao"]
+    list_select_related = ["usuario"]
+    # Filtros cobertos por pedido_status_data_id_idx e pedido_data_id_idx
+    list_filter = ["status", "data_criacao"]
+    ordering = ["-data_criacao", "-id"]
+    search_fields = ["=id", "=codigo_rastreio"]
+    # O select de itens carregaria todas as linhas de ItemCarrinho do banco
+    raw_id_fields = ["itens", "cartao"]
+    autocomplete_fields = ["usuario", "responsavel"]
+    # O status só muda pela API (pedidos.salvar_status), que valida a
+    # transição e lança o evento nos consolidados de vendas
+    readonly_fields = ["status", "data_criacao", "reserva", "reservado_ate"]
+
+
+@admin.register(Devolucao)
+class DevolucaoAdmin(AdminEscalavel):
+    list_display = ["id", "pedido_id", "item", "data_solicitacao"]
+    list_select_related = ["item__produto"]
+    raw_id_fields = ["pedido", "item"]
+
+
+@admin.register(Avaliacao)
+class AvaliacaoAdmin(AdminEscalavel):
+    list_display = ["id", "pedido_id", "produto", "nota"]
+    list_select_related = ["produto"]
+    raw_id_fields = ["pedido"]
+    autocomplete_fields = ["produto"]
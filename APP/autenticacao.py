@@ -0,0 +1,199 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import F
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+
+# ---- CLAIMS DO TOKEN ---- #
+# Além do email (USER_ID_CLAIM), os tokens carregam o id e o cargo do usuário.
+# Com isso os endpoints autorizam pela assinatura do token, sem buscar o
+# Usuario no banco a cada requisição.
+#
+# A claim "cv" é a versao_credenciais do usuário na emissão. Toda alteração
+# do usuário incrementa a coluna; um token de versão antiga deixa de valer
+# só pelas claims e passa pela busca no banco (cargo atual, is_active).
+CLAIM_ID = "uid"
+CLAIM_CARGO = "cargo"
+CLAIM_VERSAO = "cv"
+
+
+def adicionar_claims(token, usuario):
+    token[CLAIM_ID] = usuario.id
+    token[CLAIM_CARGO] = usuario.cargo
+    token[CLAIM_VERSAO] = usuario.versao_credenciais
+    return token
+
+
+class TokenUsuarioSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return adicionar_claims(super().get_token(user), user)
+
+
+class TokenRefreshUsuarioSerializer(TokenRefreshSerializer):
+    """Renova o access token relendo o cargo, para que ele nunca fique defasado."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        usuario = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.payload.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+
+        if usuario is None or not api_settings.USER_AUTHENTICATION_RULE(usuario):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        return {"access": str(adicionar_claims(refresh.access_token, usuario))}
+
+
+# ---- USUÁRIO DO TOKEN ---- #
+class UsuarioToken:
+    """
+    Usuário autenticado montado a partir das claims. Expõe só o que os
+    endpoints usam (id, email, cargo); não é uma instância de Usuario.
+    """
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, id, email, cargo):
+        self.id = self.pk = id
+        self.email = email
+        self.cargo = cargo
+
+    def __eq__(self, other):
+        return getattr(other, "pk", None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.email
+
+
+# ---- INVALIDAÇÃO ---- #
+# A versão vale pelo banco; o cache CREDENCIAIS_CACHE (sem despejo e, em
+# produção, compartilhado entre processos) só evita lê-la a cada requisição.
+# Se a chave sumir do cache, a versão é relida do banco: nunca se volta a
+# confiar às cegas no cargo do token.
+def _cache():
+    return caches[settings.CREDENCIAIS_CACHE]
+
+
+def chave_usuario(email):
+    return f"usuario:claims:{email}"
+
+
+def chave_versao(usuario_id):
+    return f"usuario:versao:{usuario_id}"
+
+
+def versao_em_cache(usuario_id):
+    return _cache().get(chave_versao(usuario_id))
+
+
+def versao_credenciais(usuario_id):
+    """Versão atual das credenciais (None se o usuário não existe)."""
+    versao = versao_em_cache(usuario_id)
+    if versao is None:
+        versao = get_user_model().objects.filter(id=usuario_id).values_list("versao_credenciais", flat=True).first()
+        if versao is None:
+            return None
+        _cache().set(chave_versao(usuario_id), versao, timeout=settings.CREDENCIAIS_CACHE_TIMEOUT)
+    return versao
+
+
+def usuario_criado(usuario):
+    _cache().set(chave_versao(usuario.id), usuario.versao_credenciais, timeout=settings.CREDENCIAIS_CACHE_TIMEOUT)
+
+
+def incrementar_versao(usuario):
+    """Antes do save: o próprio UPDATE incrementa a versão, sem sobrescrevê-la com o valor da instância."""
+    usuario.versao_credenciais = F("versao_credenciais") + 1
+
+
+def usuario_alterado(usuario, incrementada=False):
+    """
+    Chamado quando um usuário é salvo ou removido: incrementa a versão das
+    credenciais no banco (se o save ainda não o fez) e descarta as cópias em
+    cache. Tokens emitidos antes disso passam pela busca no banco até expirarem.
+    """
+    if incrementada:
+        # O novo valor só existe no banco: é relido se a instância precisar dele
+        usuario.__dict__.pop("versao_credenciais", None)
+    else:
+        get_user_model().objects.filter(id=usuario.id).update(versao_credenciais=F("versao_credenciais") + 1)
+    _cache().delete_many([chave_versao(usuario.id), chave_usuario(usuario.email)])
+
+
+# ---- AUTENTICAÇÃO ---- #
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que confia nas claims uid/cargo do token. Tokens sem
+    essas claims (emitidos antes delas) ou de uma versão de credenciais
+    anterior à atual caem em uma busca por email guardada em cache por
+    USUARIO_CACHE_TIMEOUT segundos.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            email = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+
+        return self._usuario_das_claims(validated_token) or self._usuario_em_cache(email)
+
+    async def aautenticar(self, request):
+        """
+        Equivalente a authenticate() para as views assíncronas, devolvendo só
+        o usuário (ou None). Apenas o fallback, quando as claims não bastam,
+        passa por uma thread para consultar o banco.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.USER_ID_CLAIM in validated_token:
+            # Versão fora do cache exige o banco: fica para a thread abaixo
+            usuario = self._usuario_das_claims(validated_token, versao_em_cache)
+            if usuario is not None:
+                return usuario
+        return await sync_to_async(self.get_user)(validated_token)
+
+    def _usuario_das_claims(self, validated_token, versao_atual=versao_credenciais):
+        usuario_id = validated_token.get(CLAIM_ID)
+        cargo = validated_token.get(CLAIM_CARGO)
+        versao = validated_token.get(CLAIM_VERSAO)
+        if usuario_id is None or cargo is None or versao is None:
+            return None
+
+        if versao_atual(usuario_id) == versao:
+            return UsuarioToken(usuario_id, validated_token[api_settings.USER_ID_CLAIM], cargo)
+        return None
+
+    def _usuario_em_cache(self, email):
+        dados = _cache().get(chave_usuario(email))
+        if dados is None:
+            dados = (
+                self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: email})
+                .values("id", "email", "cargo", "is_active")
+                .first()
+            )
+            if dados is None:
+                raise AuthenticationFailed("Usuário não encontrado", code="user_not_found")
+            _cache().set(chave_usuario(email), dados, timeout=settings.USUARIO_CACHE_TIMEOUT)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not dados["is_active"]:
+            raise AuthenticationFailed("Usuário inativo", code="user_inactive")
+
+        return UsuarioToken(dados["id"], dados["email"], dados["cargo"])
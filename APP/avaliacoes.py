@@ -0,0 +1,57 @@
+from django.db.models import Avg, Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Avaliacao, Produto
+
+
+NOTAS = range(1, 6)
+
+
+def campo_nota(nota):
+    return f"avaliacoes_nota_{nota}"
+
+
+# ---- ATUALIZAÇÃO INCREMENTAL ---- #
+def registrar_nota(produto_id, nota):
+    """
+    Soma a nova nota aos agregados do produto em um único UPDATE atômico.
+    Todas as expressões do SET leem os valores anteriores da linha, então o
+    custo é o mesmo para 1 ou 100 mil avaliações e duas avaliações
+    simultâneas não sobrescrevem uma à outra.
+    """
+    return Produto.objects.filter(id=produto_id).update(
+        total_avaliacoes=F("total_avaliacoes") + 1,
+        soma_avaliacoes=F("soma_avaliacoes") + nota,
+        media_avaliacao=Cast(F("soma_avaliacoes") + nota, FloatField()) / (F("total_avaliacoes") + 1),
+        **{campo_nota(nota): F(campo_nota(nota)) + 1},
+    )
+
+
+# ---- RECONCILIAÇÃO EM LOTE ---- #
+def _subquery(modelo_avaliacao, expressao, padrao, **filtros):
+    agregado = (
+        modelo_avaliacao.objects
+        .filter(produto=OuterRef("pk"), **filtros)
+        .order_by()
+        .values("produto")
+        .annotate(valor=expressao)
+        .values("valor")
+    )
+    return Coalesce(Subquery(agregado), Value(padrao))
+
+
+def reconciliar_avaliacoes(modelo_produto=Produto, modelo_avaliacao=Avaliacao):
+    """
+    Recalcula os agregados de todos os produtos a partir de Avaliacao com um
+    único UPDATE de subqueries correlacionadas, executado inteiro no banco.
+    Recebe os modelos para poder ser usada também dentro de migrations.
+    """
+    return modelo_produto.objects.update(
+        total_avaliacoes=_subquery(modelo_avaliacao, Count("id"), 0),
+        soma_avaliacoes=_subquery(modelo_avaliacao, Sum("nota"), 0),
+        media_avaliacao=_subquery(modelo_avaliacao, Avg(Cast("nota", FloatField())), 0.0),
+        **{
+            campo_nota(nota): _subquery(modelo_avaliacao, Count("id"), 0, nota=nota)
+            for nota in NOTAS
+        },
+    )
@@ -0,0 +1,331 @@
+import itertools
+import json
+import math
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .autenticacao import TokenUsuarioSerializer
+from .carrinho import Carrinho
+from .models import ItemCarrinho, Pedido, Produto, Promocao, Usuario
+from .pedidos import reservar_pedidos
+from .promocoes import invalidar_promocoes
+
+
+# ---- CENÁRIOS ---- #
+# Um cenário por rota de APP/urls.py (algumas rotas têm mais de um). Cada
+# um declara o orçamento de queries SQL por requisição e o limite de p95
+# em milissegundos; `preparar` monta os dados de cada requisição fora da
+# medição (pedidos no status certo, carrinho cheio, cache frio...) e
+# `argumentos`, os da URL (produto do detalhe...).
+SENHA = "senha-benchmark-123"
+# BEGIN/COMMIT/SAVEPOINT dependem de a requisição já estar ou não dentro de
+# uma transação (como nos testes): ficam fora da contagem
+CONTROLE_TRANSACAO = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+CARGOS = ["CLIENTE", "FINANCEIRO", "LOGISTICA", "POS_VENDA", "ADMIN"]
+
+
+class Cenario:
+    def __init__(self, nome, rota, metodo="get", cargo=None, status=200, consultas=0, p95_ms=50, preparar=None,
+                 argumentos=None):
+        self.nome = nome
+        self.rota = rota
+        self.metodo = metodo
+        self.cargo = cargo
+        self.status = status
+        self.consultas = consultas
+        self.p95_ms = p95_ms
+        self.preparar = preparar or (lambda contexto: {})
+        self.argumentos = argumentos or (lambda contexto: {})
+
+
+class Contexto:
+    """Usuários, tokens e produtos usados pelos cenários."""
+
+    def __init__(self):
+        self.usuarios = {}
+        self.tokens = {}
+        for numero, cargo in enumerate(CARGOS):
+            usuario = Usuario.objects.create_user(
+                email=f"benchmark.{cargo.lower()}@exemplo.com", password=SENHA, nome=f"Benchmark {cargo}",
+                endereco="Rua do Benchmark", cpf=f"9{numero:010d}", cargo=cargo,
+            )
+            self.usuarios[cargo] = usuario
+            self.tokens[cargo] = TokenUsuarioSerializer.get_token(usuario)
+
+        self.cliente = self.usuarios["CLIENTE"]
+        self.produto_ids = list(Produto.objects.order_by("id").values_list("id", flat=True)[:50])
+        self.categoria_id = Produto.objects.values_list("categoria_id", flat=True).first()
+        self.sequencia = itertools.count()
+
+        # Promoções de produto, de categoria (por faixa) e de pagamento para a cotação e o checkout
+        Promocao.objects.bulk_create([
+            *(Promocao(nome=f"Oferta {produto_id}", percentual=5, produto_id=produto_id) for produto_id in self.produto_ids),
+            Promocao(nome="Atacado", percentual=12, categoria_id=self.categoria_id, quantidade_minima=10),
+            Promocao(nome="Desconto no PIX", percentual=3, metodo_pagamento="PIX"),
+        ])
+        invalidar_promocoes()
+
+        # Histórico do cliente com mais de uma página
+        for _ in range(60):
+            self.criar_pedido("RECEBIDO")
+
+    def criar_pedido(self, status, usuario=None, itens=3):
+        itens = ItemCarrinho.objects.bulk_create([
+            ItemCarrinho(produto_id=produto_id, quantidade=1) for produto_id in self.produto_ids[:itens]
+        ])
+        pedido = Pedido.objects.create(
+            usuario=usuario or self.cliente, valor_total="100.00", metodo_pagamento="PIX", status=status
+        )
+        pedido.itens.set(itens)
+        return pedido
+
+    def encher_carrinho(self, quantidade=10):
+        def encher(carrinho):
+            carrinho.itens = {produto_id: 1 for produto_id in self.produto_ids[:quantidade]}
+
+        Carrinho.alterar(self.cliente.id, encher)
+
+
+def _cache_frio(contexto):
+    cache.clear()
+    return {"page_size": 20}
+
+
+def _detalhe_frio(contexto):
+    cache.clear()
+    return {}
+
+
+def _filtros(contexto):
+    cache.clear()
+    return {"categoria": contexto.categoria_id, "preco_max": 100}
+
+
+def _registrar(contexto):
+    numero = next(contexto.sequencia)
+    return {
+        "email": f"novo{numero}@exemplo.com", "password": SENHA, "nome": "Novo",
+        "endereco": "Rua Nova", "cpf": f"7{numero:010d}",
+    }
+
+
+def _carrinho_cheio(contexto):
+    contexto.encher_carrinho()
+    return {}
+
+
+def _cotacao(contexto):
+    contexto.encher_carrinho()
+    return {"metodo_pagamento": "PIX"}
+
+
+def _checkout(contexto):
+    contexto.encher_carrinho()
+    return {"metodo_pagamento": "PIX"}
+
+
+def _status(contexto):
+    return {"pedido_id": contexto.criar_pedido("EM_PREPARACAO").id, "status": "ENVIADO"}
+
+
+def _aprovar(contexto):
+    return {"pedido_id": contexto.criar_pedido("EM_PROCESSAMENTO").id, "status": "PAGAMENTO_APROVADO"}
+
+
+def _status_lote(contexto):
+    return {"pedidos": [contexto.criar_pedido("EM_PREPARACAO", itens=1).id for _ in range(100)], "status": "ENVIADO"}
+
+
+def _devolucao(contexto):
+    pedido = contexto.criar_pedido("SOLICITACAO_DEVOLUCAO")
+    return {"pedido_id": pedido.id, "item_id": pedido.itens.values_list("id", flat=True).first(), "motivo": "Vazando"}
+
+
+def _devolucao_varios_itens(contexto):
+    pedido = contexto.criar_pedido("SOLICITACAO_DEVOLUCAO", itens=40)
+    return {"pedido_id": pedido.id, "itens": [
+        {"item_id": item_id, "motivo": "Kit incompleto"} for item_id in pedido.itens.values_list("id", flat=True)
+    ]}
+
+
+def _hoje(contexto):
+    hoje = timezone.localdate().isoformat()
+    return {"formato": "jsonl", "inicio": hoje, "fim": hoje}
+
+
+def _liberar(contexto):
+    # Garante pedidos livres na fila antes de reservar
+    for _ in range(10):
+        contexto.criar_pedido("EM_PREPARACAO", itens=1)
+    reserva, _ = reservar_pedidos(contexto.usuarios["LOGISTICA"], "LOGISTICA", 10, 300)
+    return {"reserva": str(reserva)}
+
+
+def _reservar(contexto):
+    for _ in range(10):
+        contexto.criar_pedido("EM_PREPARACAO", itens=1)
+    return {"quantidade": 10}
+
+
+def _avaliar(contexto):
+    pedido = contexto.criar_pedido("RECEBIDO")
+    return {"pedido_id": pedido.id, "produto_id": contexto.produto_ids[0], "nota": 4}
+
+
+CENARIOS = [
+    Cenario("catalogo (cache frio)", "lista_produtos", consultas=2, preparar=_cache_frio),
+    Cenario("catalogo (cache)", "lista_produtos", preparar=lambda contexto: {"page_size": 20}),
+    # +1 query: o filtro de categoria valida que ela existe
+    Cenario("catalogo (filtros)", "lista_produtos", consultas=3, preparar=_filtros),
+    # Documento pronto no cache: nenhuma query; sem cache, uma leitura de ProdutoDetalhe
+    Cenario(
+        "detalhe do produto (cache)", "detalhe_produto",
+        argumentos=lambda contexto: {"produto_id": contexto.produto_ids[0]},
+    ),
+    Cenario(
+        "detalhe do produto (cache frio)", "detalhe_produto", consultas=1, preparar=_detalhe_frio,
+        argumentos=lambda contexto: {"produto_id": contexto.produto_ids[0]},
+    ),
+    Cenario("busca", "busca_produtos", consultas=4, p95_ms=100, preparar=lambda contexto: {"q": "mangueira silicone"}),
+    # Uma categoria inteira (~5 mil produtos): 1 query dos produtos + 2 por bloco de 2000
+    Cenario(
+        "exportar catalogo", "exportar_catalogo", cargo="ADMIN", consultas=7, p95_ms=1000,
+        preparar=lambda contexto: {"formato": "jsonl", "categoria": contexto.categoria_id},
+    ),
+    Cenario("registrar", "registrar", "post", status=201, consultas=3, p95_ms=1500, preparar=_registrar),
+    Cenario(
+        "login", "login", "post", consultas=1, p95_ms=1500,
+        preparar=lambda contexto: {"email": contexto.cliente.email, "password": SENHA},
+    ),
+    Cenario(
+        "token refresh", "token_refresh", "post", consultas=1,
+        preparar=lambda contexto: {"refresh": str(contexto.tokens["CLIENTE"])},
+    ),
+    Cenario("carrinho", "carrinho", cargo="CLIENTE", consultas=1, preparar=_carrinho_cheio),
+    # Validação dos produtos e o compare-and-set da linha do carrinho
+    Cenario(
+        "carrinho (operacoes)", "carrinho", "post", cargo="CLIENTE", consultas=2,
+        preparar=lambda contexto: {"operacoes": [
+            {"acao": "definir", "produto_id": produto_id, "quantidade": 2} for produto_id in contexto.produto_ids[:10]
+        ]},
+    ),
+    # Tabela de promoções já compilada na memória: só a leitura dos produtos
+    Cenario("cotacao do carrinho", "cotacao_carrinho", cargo="CLIENTE", consultas=1, preparar=_cotacao),
+    Cenario("carrinho (limpar)", "carrinho", "delete", cargo="CLIENTE", status=204, consultas=1),
+    Cenario(
+        "adicionar ao carrinho", "add_carrinho", "post", cargo="CLIENTE", consultas=2,
+        preparar=lambda contexto: {"produto_id": contexto.produto_ids[0], "quantidade": 1},
+    ),
+    # Linha do carrinho, produtos, INSERT dos itens, o pipeline e o carrinho esvaziado
+    Cenario("criar pedido", "criar_pedido", "post", cargo="CLIENTE", status=201, consultas=10, preparar=_checkout),
+    Cenario("status", "status_pedido", "post", cargo="LOGISTICA", consultas=2, preparar=_status),
+    Cenario("status em lote", "status_pedido_lote", "post", cargo="LOGISTICA", consultas=2, preparar=_status_lote),
+    Cenario("devolucao", "registrar_devolucao", "post", cargo="CLIENTE", consultas=4, preparar=_devolucao),
+    # Um kit de 40 peças: as mesmas 4 queries de um item só
+    Cenario(
+        "devolucao (varios itens)", "registrar_devolucao", "post", cargo="CLIENTE", consultas=4,
+        preparar=_devolucao_varios_itens,
+    ),
+    Cenario("historico", "historico_pedidos", cargo="CLIENTE", consultas=2),
+    # Todos os pedidos do dia (~5 mil): 2 queries por bloco de 2000
+    Cenario("exportar pedidos", "exportar_pedidos", cargo="FINANCEIRO", consultas=6, p95_ms=1000, preparar=_hoje),
+    Cenario("fila", "fila_pedidos", cargo="LOGISTICA", consultas=1),
+    Cenario("reservar", "reservar_pedidos", "post", cargo="LOGISTICA", consultas=3, preparar=_reservar),
+    Cenario("liberar reserva", "liberar_reserva", "post", cargo="LOGISTICA", consultas=1, preparar=_liberar),
+    # +1 query: apaga o documento de detalhe, que é remontado na próxima leitura
+    Cenario("avaliar", "avaliar_produto", "post", cargo="CLIENTE", consultas=6, preparar=_avaliar),
+    Cenario("aprovar pagamento", "status_pedido", "post", cargo="FINANCEIRO", consultas=5, preparar=_aprovar),
+    Cenario("relatorio de vendas", "relatorio_vendas", cargo="FINANCEIRO", consultas=2),
+    Cenario(
+        "relatorio por produto", "relatorio_vendas", cargo="FINANCEIRO", consultas=2,
+        preparar=lambda contexto: {"agrupar": "produto", "categoria": contexto.categoria_id},
+    ),
+    Cenario("metricas", "metricas"),
+]
+
+
+# ---- EXECUÇÃO ---- #
+def percentil(valores, p):
+    """Percentil pelo posto mais próximo."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(len(ordenados) * p / 100) - 1)]
+
+
+def executar_cenario(cenario, contexto, repeticoes=20, aquecimento=1):
+    """Mede latência e queries de `repeticoes` requisições, depois de `aquecimento` não medidas."""
+    client = APIClient()
+    if cenario.cargo:
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {contexto.tokens[cenario.cargo].access_token}")
+    chamar = getattr(client, cenario.metodo)
+    url = reverse(cenario.rota, kwargs=cenario.argumentos(contexto))
+
+    latencias, consultas, status = [], [], {}
+    for numero in range(aquecimento + repeticoes):
+        dados = cenario.preparar(contexto)
+        kwargs = {"data": dados} if cenario.metodo == "get" else {"data": dados, "format": "json"}
+
+        # O log de queries da conexão tem tamanho máximo: zera antes de medir
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            resposta = chamar(url, **kwargs)
+            if resposta.streaming:
+                # As queries do streaming só rodam enquanto o corpo é consumido
+                b"".join(resposta.streaming_content)
+            duracao = time.perf_counter() - inicio
+
+        if numero < aquecimento:
+            continue
+        latencias.append(duracao * 1000)
+        consultas.append(sum(1 for query in capturadas if not query["sql"].startswith(CONTROLE_TRANSACAO)))
+        status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+
+    return {
+        "rota": cenario.rota,
+        "metodo": cenario.metodo.upper(),
+        "repeticoes": repeticoes,
+        "status": status,
+        "consultas": max(consultas),
+        "consultas_media": statistics.fmean(consultas),
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "max_ms": round(max(latencias), 3),
+        "orcamento_consultas": cenario.consultas,
+        "limite_p95_ms": cenario.p95_ms,
+    }
+
+
+def violacoes(cenario, resultado, fator_latencia=1.0):
+    erros = []
+    if set(resultado["status"]) != {cenario.status}:
+        erros.append(f"status {resultado['status']} (esperado {cenario.status})")
+    if resultado["consultas"] > cenario.consultas:
+        erros.append(f"{resultado['consultas']} queries (orçamento {cenario.consultas})")
+    if fator_latencia and resultado["p95_ms"] > cenario.p95_ms * fator_latencia:
+        erros.append(f"p95 {resultado['p95_ms']:.1f} ms (limite {cenario.p95_ms * fator_latencia:.0f} ms)")
+    return erros
+
+
+def comparar(anterior, atual):
+    """Diferenças de p95 e de queries em relação a um resultado salvo."""
+    linhas = []
+    for nome, resultado in atual["cenarios"].items():
+        antes = anterior.get("cenarios", {}).get(nome)
+        if antes is None:
+            continue
+        variacao = (resultado["p95_ms"] - antes["p95_ms"]) / antes["p95_ms"] * 100 if antes["p95_ms"] else 0
+        linhas.append((nome, antes["p95_ms"], resultado["p95_ms"], variacao, antes["consultas"], resultado["consultas"]))
+    return linhas
+
+
+def carregar_resultados(caminho):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
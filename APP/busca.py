@@ -0,0 +1,167 @@
+import re
+
+from django.db import connection, connections
+
+from .models import Categoria, Peca, Produto
+
+
+# ---- ÍNDICE DE BUSCA (SQLite FTS5) ---- #
+# Tabela virtual FTS5 com uma linha por produto (rowid = Produto.id).
+# O tokenizer unicode61 com remove_diacritics normaliza acentos tanto no
+# índice quanto na consulta, então "agua" encontra "água".
+TABELA_BUSCA = "APP_produto_busca"
+
+# Peso de cada coluna no ranking bm25: nome > categoria > peças > descrição
+PESOS_BM25 = (10.0, 1.0, 4.0, 2.0)
+
+SQL_CRIAR_INDICE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+        nome, descricao, categoria, pecas,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+SQL_REMOVER_INDICE = f"DROP TABLE IF EXISTS {TABELA_BUSCA}"
+
+_SQL_INSERIR = f"""
+    INSERT INTO {TABELA_BUSCA} (rowid, nome, descricao, categoria, pecas)
+    SELECT p.id, p.nome, p.descricao, c.nome,
+           COALESCE((SELECT group_concat(pc.nome, ' ')
+                     FROM {Peca._meta.db_table} pc
+                     WHERE pc.produto_id = p.id), '')
+    FROM {Produto._meta.db_table} p
+    JOIN {Categoria._meta.db_table} c ON c.id = p.categoria_id
+"""
+
+TAMANHO_LOTE = 500
+
+
+def indice_disponivel(conexao=connection):
+    return conexao.vendor == "sqlite"
+
+
+def _lotes(ids):
+    ids = list(ids)
+    for inicio in range(0, len(ids), TAMANHO_LOTE):
+        yield ids[inicio:inicio + TAMANHO_LOTE]
+
+
+def remover_produtos(ids):
+    if not indice_disponivel():
+        return
+    with connection.cursor() as cursor:
+        for lote in _lotes(ids):
+            marcadores = ", ".join(["%s"] * len(lote))
+            cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE rowid IN ({marcadores})", lote)
+
+
+def indexar_produtos(ids):
+    """Reindexa apenas os produtos informados (usado pelos signals)."""
+    if not indice_disponivel():
+        return
+    remover_produtos(ids)
+    with connection.cursor() as cursor:
+        for lote in _lotes(ids):
+            marcadores = ", ".join(["%s"] * len(lote))
+            cursor.execute(f"{_SQL_INSERIR} WHERE p.id IN ({marcadores})", lote)
+
+
+def indexar_categoria(categoria_id):
+    if not indice_disponivel():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {TABELA_BUSCA} WHERE rowid IN "
+            f"(SELECT id FROM {Produto._meta.db_table} WHERE categoria_id = %s)",
+            [categoria_id],
+        )
+        cursor.execute(f"{_SQL_INSERIR} WHERE p.categoria_id = %s", [categoria_id])
+
+
+def reconstruir_indice(conexao=connection):
+    """Reconstrói o índice inteiro com um único INSERT ... SELECT."""
+    if not indice_disponivel(conexao):
+        return 0
+    with conexao.cursor() as cursor:
+        cursor.execute(SQL_CRIAR_INDICE)
+        cursor.execute(f"DELETE FROM {TABELA_BUSCA}")
+        cursor.execute(_SQL_INSERIR)
+        cursor.execute(f"INSERT INTO {TABELA_BUSCA} ({TABELA_BUSCA}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {TABELA_BUSCA}")
+        return cursor.fetchone()[0]
+
+
+# ---- CONSULTA ---- #
+def montar_consulta(termo):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira
+    um prefixo entre aspas ("mang"*) e todas precisam aparecer.
+    """
+    palavras = re.findall(r"\w+", termo)
+    return " ".join(f'"{palavra}"*' for palavra in palavras)
+
+
+def _id(produto):
+    return produto["id"] if isinstance(produto, dict) else produto.pk
+
+
+class ResultadoBusca:
+    """
+    Sequência preguiçosa de produtos ordenados por relevância, compatível com
+    os paginadores do Django/DRF: count() e fatias viram COUNT e LIMIT/OFFSET
+    direto no índice, sem varrer as tabelas de produtos.
+    """
+
+    def __init__(self, termo, queryset=None):
+        self.consulta = montar_consulta(termo)
+        self.queryset = Produto.objects.all() if queryset is None else queryset
+
+    @property
+    def conexao(self):
+        # Segue o roteador: na réplica quando a view lê dela
+        return connections[self.queryset.db]
+
+    def count(self):
+        if not self.consulta:
+            return 0
+        if not indice_disponivel(self.conexao):
+            return self._fallback().count()
+        with self.conexao.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s", [self.consulta])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, fatia):
+        if not isinstance(fatia, slice):
+            raise TypeError("ResultadoBusca só aceita fatias")
+        if not self.consulta:
+            return []
+        inicio = fatia.start or 0
+        limite = (fatia.stop - inicio) if fatia.stop is not None else -1
+
+        if not indice_disponivel(self.conexao):
+            return list(self._fallback()[fatia])
+
+        pesos = ", ".join(str(peso) for peso in PESOS_BM25)
+        with self.conexao.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s "
+                f"ORDER BY bm25({TABELA_BUSCA}, {pesos}) LIMIT %s OFFSET %s",
+                [self.consulta, limite, inicio],
+            )
+            ids = [linha[0] for linha in cursor.fetchall()]
+
+        # Aceita também querysets de values() (APP/serializacao.py), sem in_bulk
+        produtos = {_id(produto): produto for produto in self.queryset.filter(id__in=ids)}
+        return [produtos[i] for i in ids if i in produtos]
+
+    def _fallback(self):
+        # Outros bancos: sem FTS5, cai para icontains (varredura completa)
+        from django.db.models import Q
+
+        filtro = Q()
+        for palavra in re.findall(r"\w+", self.consulta):
+            filtro &= Q(nome__icontains=palavra) | Q(descricao__icontains=palavra)
+        return self.queryset.filter(filtro).order_by("id")
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+
+CHAVE_VERSAO_CATALOGO = "catalogo:versao"
+
+
+# ---- VERSÃO DO CATÁLOGO ---- #
+# Toda alteração em Produto, ProdutoImagem, Categoria ou nas avaliações
+# incrementa a versão; as páginas em cache ficam órfãs e expiram sozinhas.
+def versao_catalogo():
+    versao = cache.get(CHAVE_VERSAO_CATALOGO)
+    if versao is None:
+        # Começa pelo relógio para que, se a chave for despejada do cache,
+        # a nova versão nunca coincida com uma versão antiga.
+        cache.add(CHAVE_VERSAO_CATALOGO, time.time_ns(), timeout=None)
+        versao = cache.get(CHAVE_VERSAO_CATALOGO)
+    return versao
+
+
+def invalidar_catalogo():
+    try:
+        cache.incr(CHAVE_VERSAO_CATALOGO)
+    except ValueError:
+        versao_catalogo()
+
+
+def chave_pagina(request):
+    """Identifica a página pela versão do catálogo e pela URL completa."""
+    versao = versao_catalogo()
+    resumo = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"catalogo:pagina:{versao}:{resumo}", f'"{versao}-{resumo}"'
+
+
+def etag_confere(etag, if_none_match):
+    """Comparação fraca do If-None-Match: a resposta comprimida leva o ETag como W/"..."."""
+    return etag in {enviado.removeprefix("W/") for enviado in parse_etags(if_none_match)}
+
+
+# ---- CÁLCULO COALESCIDO ---- #
+def obter_ou_calcular(chave, calcular, timeout=None):
+    """
+    Busca `chave` no cache; em caso de falta, só um worker executa `calcular`
+    enquanto os demais aguardam o resultado ser publicado no cache.
+    """
+    valor = cache.get(chave)
+    if valor is not None:
+        return valor
+
+    timeout = settings.CATALOGO_CACHE_TIMEOUT if timeout is None else timeout
+    trava = f"{chave}:trava"
+    espera = settings.CATALOGO_CACHE_ESPERA
+
+    if cache.add(trava, 1, timeout=espera):
+        try:
+            valor = calcular()
+            cache.set(chave, valor, timeout=timeout)
+        finally:
+            cache.delete(trava)
+        return valor
+
+    prazo = time.monotonic() + espera
+    while time.monotonic() < prazo:
+        time.sleep(0.01)
+        valor = cache.get(chave)
+        if valor is not None:
+            return valor
+
+    # Quem segurava a trava demorou demais ou falhou: calcula por conta própria
+    valor = calcular()
+    cache.set(chave, valor, timeout=timeout)
+    return valor
+
+
+async def aobter_ou_calcular(chave, calcular, timeout=None):
+    """
+    obter_ou_calcular para as views assíncronas: `calcular` é uma corrotina e
+    a espera pela trava cede o event loop em vez de bloquear uma thread.
+    O cache local é em memória, então é consultado direto, sem cache.aget.
+    """
+    valor = cache.get(chave)
+    if valor is not None:
+        return valor
+
+    timeout = settings.CATALOGO_CACHE_TIMEOUT if timeout is None else timeout
+    trava = f"{chave}:trava"
+    espera = settings.CATALOGO_CACHE_ESPERA
+
+    if cache.add(trava, 1, timeout=espera):
+        try:
+            valor = await calcular()
+            cache.set(chave, valor, timeout=timeout)
+        finally:
+            cache.delete(trava)
+        return valor
+
+    prazo = time.monotonic() + espera
+    while time.monotonic() < prazo:
+        await asyncio.sleep(0.01)
+        valor = cache.get(chave)
+        if valor is not None:
+            return valor
+
+    valor = await calcular()
+    cache.set(chave, valor, timeout=timeout)
+    return valor
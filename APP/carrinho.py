@@ -0,0 +1,273 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from . import promocoes
+from .models import CarrinhoSalvo, Produto
+
+
+# ---- CARRINHO ---- #
+# O carrinho de cada usuário é uma linha de CarrinhoSalvo, um dicionário
+# {produto_id: quantidade}; linhas de ItemCarrinho só são gravadas no checkout.
+#
+# Toda alteração grava a linha com compare-and-set na versão: se outra
+# requisição do mesmo usuário gravou antes, o carrinho é relido do banco e as
+# operações são reaplicadas, sem perder os itens de nenhuma das duas.
+#
+# O cache CARRINHO_CACHE guarda uma cópia de leitura (itens e versão) para a
+# listagem, a cotação e o início das alterações. A cópia pode ficar atrás do
+# banco numa corrida entre duas gravações; o checkout sempre lê a linha.
+TENTATIVAS = 5
+
+
+class QuantidadeInvalida(Exception):
+    pass
+
+
+class CarrinhoConcorrente(Exception):
+    """Outras requisições gravaram o carrinho antes em todas as tentativas."""
+
+
+def _cache():
+    return caches[settings.CARRINHO_CACHE]
+
+
+def _quantidade(valor):
+    try:
+        quantidade = int(valor)
+    except (TypeError, ValueError):
+        raise QuantidadeInvalida()
+    if quantidade < 0:
+        raise QuantidadeInvalida()
+    return quantidade
+
+
+class Carrinho:
+    def __init__(self, usuario_id, itens=None, versao=0):
+        self.usuario_id = usuario_id
+        self.itens = itens or {}
+        # 0: o usuário ainda não tem linha em CarrinhoSalvo
+        self.versao = versao
+
+    @staticmethod
+    def chave(usuario_id):
+        return f"carrinho:{usuario_id}"
+
+    @classmethod
+    def _da_linha(cls, usuario_id, salvo):
+        if salvo is None:
+            return cls(usuario_id)
+        itens, versao = salvo
+        return cls(usuario_id, {int(produto_id): quantidade for produto_id, quantidade in itens.items()}, versao)
+
+    @classmethod
+    def _linha(cls, usuario_id, travar=False):
+        linhas = CarrinhoSalvo.objects.filter(usuario_id=usuario_id)
+        if travar:
+            linhas = linhas.select_for_update()
+        return linhas.values_list("itens", "versao")
+
+    @classmethod
+    def do_banco(cls, usuario_id, travar=False):
+        return cls._da_linha(usuario_id, cls._linha(usuario_id, travar).first())
+
+    @classmethod
+    async def ado_banco(cls, usuario_id):
+        return cls._da_linha(usuario_id, await cls._linha(usuario_id).afirst())
+
+    @classmethod
+    def do_usuario(cls, usuario_id):
+        """Cópia do cache; na falta, a linha do banco, que passa a ser a cópia."""
+        dados = _cache().get(cls.chave(usuario_id))
+        if dados is not None:
+            return cls(usuario_id, dados["itens"], dados["versao"])
+        carrinho = cls.do_banco(usuario_id)
+        carrinho._copiar(so_se_ausente=True)
+        return carrinho
+
+    @classmethod
+    async def ado_usuario(cls, usuario_id):
+        dados = _cache().get(cls.chave(usuario_id))
+        if dados is not None:
+            return cls(usuario_id, dados["itens"], dados["versao"])
+        carrinho = await cls.ado_banco(usuario_id)
+        carrinho._copiar(so_se_ausente=True)
+        return carrinho
+
+    # ---- ALTERAÇÃO ATÔMICA ---- #
+    @classmethod
+    def alterar(cls, usuario_id, aplicar):
+        """
+        Aplica `aplicar(carrinho)` e grava a linha se ela ainda está na versão
+        lida; senão relê do banco e reaplica, até TENTATIVAS vezes.
+        """
+        carrinho = cls.do_usuario(usuario_id)
+        for _ in range(TENTATIVAS):
+            aplicar(carrinho)
+            if carrinho._gravar():
+                carrinho._copiar()
+                return carrinho
+            carrinho = cls.do_banco(usuario_id)
+        raise CarrinhoConcorrente()
+
+    @classmethod
+    async def aalterar(cls, usuario_id, aplicar):
+        carrinho = await cls.ado_usuario(usuario_id)
+        for _ in range(TENTATIVAS):
+            aplicar(carrinho)
+            if await carrinho._agravar():
+                carrinho._copiar()
+                return carrinho
+            carrinho = await cls.ado_banco(usuario_id)
+        raise CarrinhoConcorrente()
+
+    def _gravar(self):
+        if self.versao == 0:
+            # Primeira gravação: outra requisição pode ter criado a linha antes
+            _, gravado = CarrinhoSalvo.objects.get_or_create(
+                usuario_id=self.usuario_id, defaults={"itens": self.itens}
+            )
+        else:
+            gravado = self._na_versao().update(itens=self.itens, versao=self.versao + 1, atualizado_em=timezone.now())
+        if gravado:
+            self.versao += 1
+        return bool(gravado)
+
+    async def _agravar(self):
+        if self.versao == 0:
+            _, gravado = await CarrinhoSalvo.objects.aget_or_create(
+                usuario_id=self.usuario_id, defaults={"itens": self.itens}
+            )
+        else:
+            gravado = await self._na_versao().aupdate(
+                itens=self.itens, versao=self.versao + 1, atualizado_em=timezone.now()
+            )
+        if gravado:
+            self.versao += 1
+        return bool(gravado)
+
+    def _na_versao(self):
+        return CarrinhoSalvo.objects.filter(usuario_id=self.usuario_id, versao=self.versao)
+
+    def esvaziar(self):
+        """Esvazia a linha lida (no checkout); False se ela mudou desde a leitura."""
+        if not self._na_versao().update(itens={}, versao=self.versao + 1, atualizado_em=timezone.now()):
+            return False
+        self.itens = {}
+        self.versao += 1
+        return True
+
+    def __bool__(self):
+        return bool(self.itens)
+
+    # ---- OPERAÇÕES ---- #
+    def adicionar(self, produto_id, quantidade=1):
+        """Soma à quantidade já existente (mescla itens repetidos)."""
+        quantidade = _quantidade(quantidade)
+        if quantidade:
+            self.itens[int(produto_id)] = self.itens.get(int(produto_id), 0) + quantidade
+
+    def definir(self, produto_id, quantidade):
+        quantidade = _quantidade(quantidade)
+        if quantidade:
+            self.itens[int(produto_id)] = quantidade
+        else:
+            self.remover(produto_id)
+
+    def remover(self, produto_id):
+        self.itens.pop(int(produto_id), None)
+
+    def limpar(self):
+        self.itens = {}
+        CarrinhoSalvo.objects.filter(usuario_id=self.usuario_id).update(
+            itens={}, versao=F("versao") + 1, atualizado_em=timezone.now()
+        )
+        self.descartar_copia()
+
+    # ---- CÓPIA NO CACHE ---- #
+    def _copiar(self, so_se_ausente=False):
+        # Quem só leu o banco não sobrescreve a cópia de uma gravação mais nova
+        guardar = _cache().add if so_se_ausente else _cache().set
+        guardar(
+            self.chave(self.usuario_id),
+            {"itens": self.itens, "versao": self.versao},
+            timeout=settings.CARRINHO_TIMEOUT,
+        )
+
+    def descartar_copia(self):
+        _cache().delete(self.chave(self.usuario_id))
+
+    # ---- LEITURA ---- #
+    def produtos(self):
+        """Produtos do carrinho que ainda existem, em uma única query."""
+        return Produto.objects.filter(id__in=self.itens).only("id", "nome", "preco", "categoria_id")
+
+    def resumo(self):
+        linhas = [
+            {
+                "produto_id": produto.id,
+                "nome": produto.nome,
+                "preco": produto.preco,
+                "quantidade": self.itens[produto.id],
+                "subtotal": produto.preco * self.itens[produto.id],
+            }
+            for produto in self.produtos().order_by("id")
+        ]
+        return {"itens": linhas, "total": sum(linha["subtotal"] for linha in linhas)}
+
+    def cotacao(self, metodo_pagamento=None):
+        """Resumo com as promoções aplicadas, pelo mesmo cálculo do checkout (APP/promocoes.py)."""
+        produtos = list(
+            Produto.objects.filter(id__in=self.itens).order_by("id").values_list("id", "nome", "preco", "categoria_id")
+        )
+        precos = promocoes.precificar(
+            [(produto_id, categoria_id, preco, self.itens[produto_id]) for produto_id, _, preco, categoria_id in produtos],
+            metodo_pagamento,
+        )
+
+        linhas = [
+            {
+                "produto_id": produto_id,
+                "nome": nome,
+                "preco": preco,
+                "quantidade": self.itens[produto_id],
+                "subtotal": bruto,
+                "desconto": desconto,
+                "total": bruto - desconto,
+                "promocao": regra and {"id": regra.id, "nome": regra.nome, "percentual": regra.percentual},
+            }
+            for (produto_id, nome, preco, _), (bruto, desconto, regra) in zip(produtos, precos)
+        ]
+        subtotal = sum(linha["subtotal"] for linha in linhas)
+        desconto = sum(linha["desconto"] for linha in linhas)
+        return {
+            "itens": linhas,
+            "metodo_pagamento": promocoes.METODOS.get(metodo_pagamento),
+            "subtotal": subtotal,
+            "desconto": desconto,
+            "total": subtotal - desconto,
+        }
+
+
+# ---- OPERAÇÕES EM LOTE ---- #
+ACOES = {
+    "adicionar": Carrinho.adicionar,
+    "definir": Carrinho.definir,
+    "remover": lambda carrinho, produto_id, quantidade=None: carrinho.remover(produto_id),
+}
+
+
+def produtos_inexistentes(produto_ids):
+    produto_ids = {int(produto_id) for produto_id in produto_ids}
+    existentes = set(Produto.objects.filter(id__in=produto_ids).values_list("id", flat=True))
+    return produto_ids - existentes
+
+
+async def aprodutos_inexistentes(produto_ids):
+    produto_ids = {int(produto_id) for produto_id in produto_ids}
+    existentes = {
+        produto_id
+        async for produto_id in Produto.objects.filter(id__in=produto_ids).values_list("id", flat=True)
+    }
+    return produto_ids - existentes
@@ -0,0 +1,129 @@
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+
+# ---- COMPRESSÃO DAS RESPOSTAS ---- #
+# Comprime JSON, NDJSON e CSV conforme o Accept-Encoding do cliente: brotli
+# quando a biblioteca está instalada e o cliente aceita, senão gzip.
+# Respostas menores que COMPRESSAO_MINIMO_BYTES saem como estão (o ganho não
+# paga a CPU); exportações em streaming são comprimidas bloco a bloco.
+#
+# O ETag vira fraco: o corpo comprimido não é byte a byte o mesmo
+# representado pelo ETag forte (RFC 9110, 8.8.1).
+TIPOS_COMPRIMIVEIS = ("application/json", "application/x-ndjson", "text/")
+QUALIDADE_BROTLI = 4  # 11 (o padrão) custa dezenas de ms por resposta grande
+_codificacao = re.compile(r"^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$")
+
+
+def codificacoes_aceitas(cabecalho):
+    """{codificação: q} do Accept-Encoding; q=0 recusa."""
+    aceitas = {}
+    for parte in cabecalho.lower().split(","):
+        encontrado = _codificacao.match(parte)
+        if encontrado:
+            try:
+                aceitas[encontrado[1]] = float(encontrado[2] or 1)
+            except ValueError:
+                continue
+    return aceitas
+
+
+def escolher_codificacao(cabecalho):
+    aceitas = codificacoes_aceitas(cabecalho)
+    candidatas = ["br", "gzip"] if brotli else ["gzip"]
+    # Em empate de q, a ordem de preferência do servidor decide
+    melhor = max(candidatas, key=lambda nome: (aceitas.get(nome, aceitas.get("*", 0)), -candidatas.index(nome)))
+    return melhor if aceitas.get(melhor, aceitas.get("*", 0)) > 0 else None
+
+
+def comprimir(conteudo, codificacao):
+    if codificacao == "br":
+        return brotli.compress(conteudo, quality=QUALIDADE_BROTLI)
+    return compress_string(conteudo)
+
+
+def _compressor(codificacao):
+    """(processar, finalizar) de um compressor incremental."""
+    if codificacao == "br":
+        compressor = brotli.Compressor(quality=QUALIDADE_BROTLI)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # cabeçalho gzip
+    return compressor.compress, compressor.flush
+
+
+# Sem flush por bloco: o compressor só devolve bytes quando junta o
+# suficiente, e a razão de compressão fica a mesma do corpo inteiro.
+def comprimir_em_blocos(sequencia, codificacao):
+    processar, finalizar = _compressor(codificacao)
+    for bloco in sequencia:
+        if saida := processar(bloco):
+            yield saida
+    yield finalizar()
+
+
+async def _comprimir_em_blocos_async(sequencia, codificacao):
+    processar, finalizar = _compressor(codificacao)
+    async for bloco in sequencia:
+        if saida := processar(bloco):
+            yield saida
+    yield finalizar()
+
+
+class CompressaoMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.comprimir_resposta(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.comprimir_resposta(request, await self.get_response(request))
+
+    def comprimir_resposta(self, request, response):
+        tipo = response.get("Content-Type", "")
+        if response.has_header("Content-Encoding") or not tipo.startswith(TIPOS_COMPRIMIVEIS):
+            return response
+
+        if not response.streaming and len(response.content) < settings.COMPRESSAO_MINIMO_BYTES:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codificacao = escolher_codificacao(request.headers.get("Accept-Encoding", ""))
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _comprimir_em_blocos_async(response.streaming_content, codificacao)
+            else:
+                response.streaming_content = comprimir_em_blocos(response.streaming_content, codificacao)
+            del response["Content-Length"]
+        else:
+            comprimido = comprimir(response.content, codificacao)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response["Content-Length"] = str(len(comprimido))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = codificacao
+        return response
@@ -0,0 +1,189 @@
+import itertools
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .avaliacoes import reconciliar_avaliacoes
+from .busca import reconstruir_indice
+from .cache import invalidar_catalogo
+from .detalhe import invalidar_detalhes
+from .models import Avaliacao, Categoria, ItemCarrinho, Peca, Pedido, Produto, ProdutoImagem, Usuario
+from .relatorios import reconstruir_vendas
+
+
+# ---- DADOS SINTÉTICOS ---- #
+# Gera um catálogo e um histórico de pedidos realistas só com bulk_create,
+# em lotes, para benchmarks e testes de carga. Nada passa pelos signals:
+# índice de busca, agregados de avaliação, consolidados de vendas e versão
+# do catálogo são refeitos de uma vez no final.
+SENHA_PADRAO = "senha-sintetica-123"
+
+TIPOS = ["Mangueira", "Esguicho", "Engate", "Carretel", "Aspersor", "Conector", "Registro", "Bico", "Torneira", "Filtro"]
+MATERIAIS = ["PVC", "Silicone", "Borracha", "Latão", "Nylon", "Aço Inox", "Polietileno"]
+PECAS = ["Anel de vedação", "Abraçadeira", "Adaptador", "Luva", "Niple", "Arruela", "Válvula"]
+MEDIDAS = ['1/2"', '3/4"', '1"', "10 m", "20 m", "30 m", "50 m"]
+
+# Cargos dos usuários gerados: a grande maioria é cliente
+PESOS_CARGOS = {"CLIENTE": 95, "FINANCEIRO": 2, "LOGISTICA": 2, "POS_VENDA": 1}
+PESOS_STATUS = {
+    "EM_PROCESSAMENTO": 10, "PAGAMENTO_APROVADO": 8, "PAGAMENTO_REPROVADO": 2, "NOTA_FISCAL_EMITIDA": 5,
+    "EM_PREPARACAO": 10, "ENVIADO": 10, "RECEBIDO": 45, "SOLICITACAO_DEVOLUCAO": 2, "EM_DEVOLUCAO": 1,
+    "DEVOLVIDO": 2, "DEVOLUCAO_CANCELADA": 1, "CANCELADO": 4,
+}
+PESOS_NOTAS = {1: 1, 2: 1, 3: 2, 4: 4, 5: 6}
+
+
+def _sortear(aleatorio, pesos, quantidade):
+    return aleatorio.choices(list(pesos), weights=list(pesos.values()), k=quantidade)
+
+
+def _faixas(total, lote):
+    for inicio in range(0, total, lote):
+        yield inicio, min(lote, total - inicio)
+
+
+def gerar_dados(
+    categorias=20, produtos=100_000, imagens_por_produto=3, pecas_por_produto=2,
+    usuarios=1000, pedidos=5000, itens_por_pedido=3, avaliacoes=10_000, lote=5000, semente=42,
+    dias_de_pedidos=365,
+):
+    """
+    Popula o banco e devolve quantas linhas foram criadas em cada tabela.
+    Os pedidos se espalham pelos últimos dias_de_pedidos dias, em ordem de id.
+    """
+    aleatorio = random.Random(semente)
+    agora = timezone.now()
+    janela = timedelta(days=dias_de_pedidos)
+    contagem = dict.fromkeys(
+        ["categorias", "produtos", "imagens", "pecas", "usuarios", "pedidos", "itens", "avaliacoes"], 0
+    )
+
+    with transaction.atomic():
+        lista_categorias = Categoria.objects.bulk_create([
+            Categoria(nome=f"{tipo} {material}")
+            for tipo, material in itertools.islice(itertools.product(TIPOS, MATERIAIS), categorias)
+        ])
+        contagem["categorias"] = len(lista_categorias)
+
+        # ---- CATÁLOGO ---- #
+        precos = {}
+        for inicio, tamanho in _faixas(produtos, lote):
+            criados = Produto.objects.bulk_create([
+                Produto(
+                    nome=f"{aleatorio.choice(TIPOS)} {aleatorio.choice(MATERIAIS)} {aleatorio.choice(MEDIDAS)} #{inicio + i}",
+                    descricao=f"Produto sintético {inicio + i} para jardinagem e irrigação.",
+                    preco=Decimal(aleatorio.randint(500, 50_000)) / 100,
+                    parcelas_max_sem_juros=aleatorio.choice([1, 1, 2, 3, 6, 10, 12]),
+                    categoria=aleatorio.choice(lista_categorias),
+                )
+                for i in range(tamanho)
+            ])
+            precos.update((produto.id, produto.preco) for produto in criados)
+
+            contagem["imagens"] += len(ProdutoImagem.objects.bulk_create([
+                ProdutoImagem(produto=produto, imagem=f"https://img.exemplo/{produto.id}/{ordem}.jpg", ordem=ordem)
+                for produto in criados
+                for ordem in range(imagens_por_produto)
+            ], batch_size=lote))
+            contagem["pecas"] += len(Peca.objects.bulk_create([
+                Peca(
+                    produto=produto,
+                    nome=aleatorio.choice(PECAS),
+                    medida=aleatorio.choice(MEDIDAS),
+                    peso=Decimal(aleatorio.randint(1, 9999)) / 100,
+                )
+                for produto in criados
+                for _ in range(pecas_por_produto)
+            ], batch_size=lote))
+        contagem["produtos"] = len(precos)
+        produto_ids = list(precos)
+
+        # ---- USUÁRIOS ---- #
+        # Um único hash para todos: o custo do PBKDF2 não escala com o volume
+        senha = make_password(SENHA_PADRAO)
+        clientes = []
+        for inicio, tamanho in _faixas(usuarios, lote):
+            cargos = _sortear(aleatorio, PESOS_CARGOS, tamanho)
+            criados = Usuario.objects.bulk_create([
+                Usuario(
+                    email=f"sintetico{inicio + i}@exemplo.com",
+                    cpf=f"8{inicio + i:010d}",
+                    nome=f"Usuário Sintético {inicio + i}",
+                    endereco=f"Rua Sintética, {inicio + i}",
+                    password=senha,
+                    cargo=cargo,
+                )
+                for i, cargo in enumerate(cargos)
+            ])
+            clientes.extend(usuario.id for usuario in criados if usuario.cargo == "CLIENTE")
+            contagem["usuarios"] += len(criados)
+
+        # ---- PEDIDOS ---- #
+        through = Pedido.itens.through
+        produtos_do_pedido = {}
+        if clientes and produto_ids:
+            for inicio, tamanho in _faixas(pedidos, lote):
+                itens = ItemCarrinho.objects.bulk_create([
+                    ItemCarrinho(
+                        produto_id=produto_id, quantidade=aleatorio.randint(1, 5), preco_unitario=precos[produto_id]
+                    )
+                    for produto_id in (aleatorio.choice(produto_ids) for _ in range(tamanho * itens_por_pedido))
+                ], batch_size=lote)
+                grupos = [itens[i:i + itens_por_pedido] for i in range(0, len(itens), itens_por_pedido)]
+
+                status = _sortear(aleatorio, PESOS_STATUS, tamanho)
+                criados = Pedido.objects.bulk_create([
+                    Pedido(
+                        usuario_id=aleatorio.choice(clientes),
+                        valor_total=sum(precos[item.produto_id] * item.quantidade for item in grupo),
+                        metodo_pagamento=aleatorio.choice(Pedido.MetodosPagamento.values),
+                        status=status[i],
+                    )
+                    for i, grupo in enumerate(grupos)
+                ])
+                # data_criacao é auto_now_add, então o bulk_create grava "agora";
+                # cada lote recebe sua fatia da janela, crescente com o id
+                momentos = sorted(
+                    agora - janela + janela * ((inicio + aleatorio.random() * tamanho) / pedidos)
+                    for _ in criados
+                )
+                for pedido, momento in zip(criados, momentos):
+                    pedido.data_criacao = momento
+                Pedido.objects.bulk_update(criados, ["data_criacao"], batch_size=lote)
+                through.objects.bulk_create([
+                    through(pedido_id=pedido.id, itemcarrinho_id=item.id)
+                    for pedido, grupo in zip(criados, grupos)
+                    for item in grupo
+                ], batch_size=lote)
+
+                for pedido, grupo in zip(criados, grupos):
+                    produtos_do_pedido[pedido.id] = list({item.produto_id for item in grupo})
+                contagem["pedidos"] += len(criados)
+                contagem["itens"] += len(itens)
+
+        # ---- AVALIAÇÕES ---- #
+        # Só produtos que fizeram parte do pedido, no máximo uma por par
+        pares = set()
+        pedido_ids = list(produtos_do_pedido)
+        tentativas = avaliacoes * 3
+        while pedido_ids and len(pares) < avaliacoes and tentativas:
+            pedido_id = aleatorio.choice(pedido_ids)
+            pares.add((pedido_id, aleatorio.choice(produtos_do_pedido[pedido_id])))
+            tentativas -= 1
+        notas = _sortear(aleatorio, PESOS_NOTAS, len(pares))
+        contagem["avaliacoes"] = len(Avaliacao.objects.bulk_create([
+            Avaliacao(pedido_id=pedido_id, produto_id=produto_id, nota=nota)
+            for (pedido_id, produto_id), nota in zip(sorted(pares), notas)
+        ], batch_size=lote))
+
+        reconciliar_avaliacoes()
+        reconstruir_indice(connection)
+        reconstruir_vendas()
+
+    invalidar_catalogo()
+    invalidar_detalhes()
+    return contagem
@@ -0,0 +1,145 @@
+import json
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .avaliacoes import NOTAS, campo_nota
+from .models import Peca, Produto, ProdutoDetalhe, ProdutoImagem
+
+
+# ---- DOCUMENTO DE DETALHE DO PRODUTO ---- #
+# /api/produtos/<id>/ devolve um JSON já serializado, montado fora da
+# requisição sempre que o produto, suas imagens, peças, categoria ou
+# avaliações mudam. O documento fica no cache e, como fallback, em
+# ProdutoDetalhe: um acerto no cache custa zero queries e nenhuma
+# serialização; uma falta custa uma query.
+#
+# Alterações em massa (importação, dados sintéticos, reconciliação) podem
+# só invalidar tudo: a versão dos documentos muda, as linhas de
+# ProdutoDetalhe são apagadas e cada documento é remontado no próximo acesso.
+CHAVE_VERSAO_DETALHES = "produto:detalhe:versao"
+CAMPOS_PRODUTO = [
+    "id", "codigo", "nome", "descricao", "preco", "parcelas_max_sem_juros",
+    "media_avaliacao", "total_avaliacoes", "categoria_id", "categoria__nome",
+    *(campo_nota(nota) for nota in NOTAS),
+]
+TAMANHO_LOTE = 500
+
+
+def _versao():
+    versao = cache.get(CHAVE_VERSAO_DETALHES)
+    if versao is None:
+        # Começa pelo relógio, como a versão do catálogo (APP/cache.py)
+        cache.add(CHAVE_VERSAO_DETALHES, time.time_ns(), timeout=None)
+        versao = cache.get(CHAVE_VERSAO_DETALHES)
+    return versao
+
+
+def _chave(versao, produto_id):
+    return f"produto:detalhe:{versao}:{produto_id}"
+
+
+def _agrupar(queryset, campos):
+    grupos = defaultdict(list)
+    for produto_id, *valores in queryset.values_list("produto_id", *campos):
+        grupos[produto_id].append(valores)
+    return grupos
+
+
+def montar_documentos(produto_ids):
+    """{produto_id: JSON em bytes} com três queries, qualquer que seja o número de produtos."""
+    produtos = Produto.objects.filter(id__in=produto_ids).values(*CAMPOS_PRODUTO)
+    imagens = _agrupar(ProdutoImagem.objects.filter(produto_id__in=produto_ids).order_by("ordem", "id"), ["imagem", "ordem"])
+    pecas = _agrupar(Peca.objects.filter(produto_id__in=produto_ids).order_by("id"), ["id", "nome", "medida", "peso"])
+
+    documentos = {}
+    for produto in produtos:
+        documento = {
+            "id": produto["id"],
+            "codigo": produto["codigo"],
+            "nome": produto["nome"],
+            "descricao": produto["descricao"],
+            "preco": str(produto["preco"]),
+            "parcelas_max_sem_juros": produto["parcelas_max_sem_juros"],
+            "categoria": {"id": produto["categoria_id"], "nome": produto["categoria__nome"]},
+            "imagens": [{"imagem": imagem, "ordem": ordem} for imagem, ordem in imagens.get(produto["id"], [])],
+            "pecas": [
+                {"id": peca_id, "nome": nome, "medida": medida, "peso": str(peso)}
+                for peca_id, nome, medida, peso in pecas.get(produto["id"], [])
+            ],
+            "avaliacoes": {
+                "media": produto["media_avaliacao"],
+                "total": produto["total_avaliacoes"],
+                "histograma": {str(nota): produto[campo_nota(nota)] for nota in NOTAS},
+            },
+        }
+        documentos[produto["id"]] = json.dumps(documento, ensure_ascii=False, separators=(",", ":")).encode()
+    return documentos
+
+
+def reconstruir_detalhes(produto_ids):
+    """Remonta e publica (banco e cache) os documentos; remove os de produtos que não existem mais."""
+    produto_ids = list(produto_ids)
+    versao = _versao()
+    for inicio in range(0, len(produto_ids), TAMANHO_LOTE):
+        lote = produto_ids[inicio:inicio + TAMANHO_LOTE]
+        documentos = montar_documentos(lote)
+        ProdutoDetalhe.objects.bulk_create(
+            [ProdutoDetalhe(produto_id=produto_id, documento=documento) for produto_id, documento in documentos.items()],
+            update_conflicts=True, unique_fields=["produto"], update_fields=["documento", "atualizado_em"],
+        )
+        cache.set_many(
+            {_chave(versao, produto_id): documento for produto_id, documento in documentos.items()},
+            timeout=settings.DETALHE_CACHE_TIMEOUT,
+        )
+        cache.delete_many([_chave(versao, produto_id) for produto_id in lote if produto_id not in documentos])
+
+
+def agendar_reconstrucao(produto_ids):
+    """Remonta depois do commit, para nunca publicar no cache um dado desfeito por rollback."""
+    produto_ids = list(produto_ids)
+    transaction.on_commit(lambda: reconstruir_detalhes(produto_ids))
+
+
+def descartar_detalhes(produto_ids):
+    """
+    Marca os documentos como velhos sem remontá-los: a linha de ProdutoDetalhe
+    sai junto com a transação de quem chamou e a cópia do cache depois do
+    commit. O próximo acesso ao detalhe remonta o documento (uma falta).
+    Para escritas frequentes na requisição, como as avaliações.
+    """
+    produto_ids = list(produto_ids)
+    ProdutoDetalhe.objects.filter(produto_id__in=produto_ids).delete()
+    transaction.on_commit(lambda: cache.delete_many([_chave(_versao(), produto_id) for produto_id in produto_ids]))
+
+
+def invalidar_detalhes():
+    ProdutoDetalhe.objects.all().delete()
+    try:
+        cache.incr(CHAVE_VERSAO_DETALHES)
+    except ValueError:
+        _versao()
+
+
+def documento_produto(produto_id):
+    """JSON em bytes do produto, ou None se ele não existe."""
+    chave = _chave(_versao(), produto_id)
+    documento = cache.get(chave)
+    if documento is not None:
+        return documento
+
+    documento = ProdutoDetalhe.objects.filter(produto_id=produto_id).values_list("documento", flat=True).first()
+    if documento is None:
+        documento = montar_documentos([produto_id]).get(produto_id)
+        if documento is None:
+            return None
+        ProdutoDetalhe.objects.bulk_create(
+            [ProdutoDetalhe(produto_id=produto_id, documento=documento)],
+            update_conflicts=True, unique_fields=["produto"], update_fields=["documento", "atualizado_em"],
+        )
+    documento = bytes(documento)
+    cache.set(chave, documento, timeout=settings.DETALHE_CACHE_TIMEOUT)
+    return documento
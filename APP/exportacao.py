@@ -0,0 +1,167 @@
+import csv
+import json
+from datetime import date, datetime, timedelta
+
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .importacao import SEPARADOR_IMAGENS, lotes
+from .models import Peca, Pedido, Produto, ProdutoImagem
+from .serializacao import Campo, Filhos, Leitor, centavos_texto, decimal_texto
+
+
+# ---- EXPORTAÇÃO EM STREAMING ---- #
+# As linhas são geradas sob demanda para um StreamingHttpResponse: o
+# queryset é percorrido com .iterator(chunk_size=...), então só um bloco
+# de produtos (com as imagens e peças dele) fica em memória por vez.
+# As colunas são as mesmas da importação: o arquivo exportado pode ser
+# reimportado sem alterações (produtos sem `codigo` saem com ele vazio e
+# são rejeitados na reimportação).
+COLUNAS_CATALOGO = ["codigo", "nome", "descricao", "preco", "parcelas_max_sem_juros", "categoria", "imagens", "pecas"]
+FORMATOS = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+def _vazio_se_nulo(valor):
+    return valor or ""
+
+
+# Um dicionário por produto, no formato da importação: produtos via
+# values() e, por bloco, imagens e peças em uma query cada (APP/serializacao.py)
+LEITOR_CATALOGO = Leitor({
+    "codigo": Campo("codigo", _vazio_se_nulo),
+    "nome": Campo("nome"),
+    "descricao": Campo("descricao"),
+    "preco": Campo("preco", decimal_texto),
+    "parcelas_max_sem_juros": Campo("parcelas_max_sem_juros"),
+    "categoria": Campo("categoria__nome"),
+    "imagens": Filhos(ProdutoImagem, "produto_id", {"imagem": Campo("imagem")}, ordem=("ordem", "id"), plano=True),
+    "pecas": Filhos(Peca, "produto_id", {
+        "nome": Campo("nome"), "medida": Campo("medida"), "peso": Campo("peso", decimal_texto),
+    }),
+})
+
+
+def registros_catalogo(categoria=None, chunk_size=2000):
+    produtos = Produto.objects.order_by("id")
+    if categoria:
+        produtos = produtos.filter(categoria_id=categoria)
+
+    for bloco in lotes(LEITOR_CATALOGO.linhas(produtos).iterator(chunk_size=chunk_size), chunk_size):
+        yield from LEITOR_CATALOGO.serializar(bloco)
+
+
+def linhas_catalogo(formato, categoria=None, chunk_size=2000):
+    registros = registros_catalogo(categoria, chunk_size)
+
+    if formato == "jsonl":
+        for registro in registros:
+            yield json.dumps(registro, ensure_ascii=False) + "\n"
+        return
+
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS_CATALOGO)
+    for registro in registros:
+        registro["imagens"] = SEPARADOR_IMAGENS.join(registro["imagens"])
+        registro["pecas"] = json.dumps(registro["pecas"], ensure_ascii=False)
+        yield escritor.writerow([registro[coluna] for coluna in COLUNAS_CATALOGO])
+
+
+# ---- EXPORTAÇÃO DE PEDIDOS ---- #
+# Pedidos de um período, um por linha, com os itens embutidos. A leitura é
+# por keyset em (data_criacao, id): cada bloco é uma query curta que
+# continua de onde a anterior parou, sem cursor aberto durante todo o
+# streaming. Os itens vêm em uma query por bloco, com o preço unitário e o
+# desconto do checkout. Do cartão só saem os quatro últimos dígitos.
+COLUNAS_PEDIDOS = [
+    "id", "data_criacao", "usuario_id", "email", "status", "metodo_pagamento", "cartao",
+    "valor_total", "valor_desconto", "codigo_rastreio", "itens",
+]
+
+
+def mascarar_cartao(numero):
+    return f"**** **** **** {numero[-4:]}" if numero else ""
+
+
+LEITOR_PEDIDOS = Leitor({
+    "id": Campo("id"),
+    "data_criacao": Campo("data_criacao", datetime.isoformat),
+    "usuario_id": Campo("usuario_id"),
+    "email": Campo("usuario__email"),
+    "status": Campo("status"),
+    "metodo_pagamento": Campo("metodo_pagamento"),
+    "cartao": Campo("cartao__numero", mascarar_cartao),
+    "valor_total": Campo("valor_total", decimal_texto),
+    "valor_desconto": Campo("valor_desconto", decimal_texto),
+    "codigo_rastreio": Campo("codigo_rastreio", _vazio_se_nulo),
+    "itens": Filhos(Pedido.itens.through, "pedido_id", {
+        "produto_id": Campo("itemcarrinho__produto_id"),
+        "nome": Campo("itemcarrinho__produto__nome"),
+        "quantidade": Campo("itemcarrinho__quantidade"),
+        # Preço e desconto congelados no checkout: preço × quantidade − desconto
+        # dos itens fecha com o valor_total do pedido
+        "preco_unitario": Campo(
+            Coalesce("itemcarrinho__preco_unitario", "itemcarrinho__produto__preco"), centavos_texto
+        ),
+        "desconto": Campo("itemcarrinho__desconto", decimal_texto),
+    }),
+})
+
+
+def intervalo_datas(inicio=None, fim=None):
+    """Datas ISO (inclusive) -> limites [início, fim) em datetimes com fuso; ValueError se inválidas."""
+    limites = []
+    for valor, dias in ((inicio, 0), (fim, 1)):
+        if not valor:
+            limites.append(None)
+            continue
+        data = date.fromisoformat(valor) + timedelta(days=dias)
+        limites.append(timezone.make_aware(datetime.combine(data, datetime.min.time())))
+    if all(limites) and limites[0] >= limites[1]:
+        raise ValueError("inicio deve ser anterior ao fim")
+    return limites
+
+
+def registros_pedidos(inicio=None, fim=None, chunk_size=2000):
+    pedidos = Pedido.objects.order_by("data_criacao", "id")
+    if inicio:
+        pedidos = pedidos.filter(data_criacao__gte=inicio)
+    if fim:
+        pedidos = pedidos.filter(data_criacao__lt=fim)
+
+    ultimo = None
+    while True:
+        bloco = pedidos
+        if ultimo:
+            bloco = bloco.filter(Q(data_criacao__gt=ultimo[0]) | Q(data_criacao=ultimo[0], id__gt=ultimo[1]))
+        bloco = list(LEITOR_PEDIDOS.linhas(bloco)[:chunk_size])
+        if not bloco:
+            return
+
+        yield from LEITOR_PEDIDOS.serializar(bloco)
+
+        if len(bloco) < chunk_size:
+            return
+        ultimo = (bloco[-1]["data_criacao"], bloco[-1]["id"])
+
+
+def linhas_pedidos(formato, inicio=None, fim=None, chunk_size=2000):
+    registros = registros_pedidos(inicio, fim, chunk_size)
+
+    if formato == "jsonl":
+        for registro in registros:
+            yield json.dumps(registro, ensure_ascii=False) + "\n"
+        return
+
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS_PEDIDOS)
+    for registro in registros:
+        registro["itens"] = json.dumps(registro["itens"], ensure_ascii=False)
+        yield escritor.writerow([registro[coluna] for coluna in COLUNAS_PEDIDOS])
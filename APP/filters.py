@@ -0,0 +1,25 @@
+import django_filters
+
+from .models import Pedido, Produto
+
+
+# ---- FILTROS DO CATÁLOGO ---- #
+# Cada filtro corresponde a um índice em Produto.Meta.indexes.
+class ProdutoFilter(django_filters.FilterSet):
+    preco_min = django_filters.NumberFilter(field_name="preco", lookup_expr="gte")
+    preco_max = django_filters.NumberFilter(field_name="preco", lookup_expr="lte")
+    avaliacao_min = django_filters.NumberFilter(field_name="media_avaliacao", lookup_expr="gte")
+    parcelas_min = django_filters.NumberFilter(field_name="parcelas_max_sem_juros", lookup_expr="gte")
+
+    class Meta:
+        model = Produto
+        fields = ["categoria"]
+
+
+# ---- FILTROS DO HISTÓRICO DE PEDIDOS ---- #
+class PedidoFilter(django_filters.FilterSet):
+    status = django_filters.MultipleChoiceFilter(choices=Pedido.StatusPedido.choices)
+
+    class Meta:
+        model = Pedido
+        fields = ["status"]
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import include, path
+
+from APP.autenticacao import TokenUsuarioSerializer
+from APP.benchmark import percentil
+from APP.models import Produto, Usuario
+
+
+class RotasSync:
+    urlpatterns = [path("api/", include("APP.urls"))]
+
+
+class RotasAsync:
+    urlpatterns = [path("api/", include("APP.urls_async"))]
+
+
+# (servidor, views): WSGI com um pool de threads, como gunicorn com threads;
+# ASGI com todas as requisições no mesmo event loop, como o uvicorn.
+CENARIOS = [
+    ("wsgi", "sync", RotasSync),
+    ("asgi", "sync", RotasSync),
+    ("asgi", "async", RotasAsync),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a vazão dos endpoints sob WSGI (pool de threads) e ASGI (event loop), "
+        "com as views síncronas e as assíncronas. Roda contra o banco configurado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=["catalogo", "carrinho"], default="catalogo")
+        parser.add_argument("--requisicoes", type=int, default=500)
+        parser.add_argument("--concorrencia", type=int, default=50)
+        parser.add_argument("--email", help="Usuário que autentica as requisições do carrinho.")
+        parser.add_argument(
+            "--sem-cache", action="store_true",
+            help="Uma URL diferente por requisição, para que o catálogo sempre vá ao banco.",
+        )
+
+    def handle(self, *args, **options):
+        self.cabecalhos = {}
+        if options["email"]:
+            usuario = Usuario.objects.filter(email=options["email"]).first()
+            if usuario is None:
+                raise CommandError(f"Usuário não encontrado: {options['email']}")
+            token = TokenUsuarioSerializer.get_token(usuario).access_token
+            self.cabecalhos["Authorization"] = f"Bearer {token}"
+        elif options["endpoint"] == "carrinho":
+            raise CommandError("Informe --email para o endpoint do carrinho.")
+
+        requisicoes = self.montar_requisicoes(options)
+        concorrencia = options["concorrencia"]
+
+        self.stdout.write(
+            f"{len(requisicoes)} requisições, concorrência {concorrencia}, endpoint {options['endpoint']}"
+        )
+        self.stdout.write(f"{'servidor':<8} {'views':<6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'erros':>6}")
+
+        for servidor, views, rotas in CENARIOS:
+            # Os clientes de teste do Django chamam o handler WSGI/ASGI direto,
+            # sem socket, como host "testserver"
+            with override_settings(ROOT_URLCONF=rotas, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                inicio = time.perf_counter()
+                if servidor == "wsgi":
+                    resultados = self.rodar_wsgi(requisicoes, concorrencia)
+                else:
+                    resultados = asyncio.run(self.rodar_asgi(requisicoes, concorrencia))
+                duracao = time.perf_counter() - inicio
+
+            latencias = [latencia for latencia, _ in resultados]
+            erros = sum(1 for _, status in resultados if status >= 400)
+            self.stdout.write(
+                f"{servidor:<8} {views:<6} {len(resultados) / duracao:>9.1f} "
+                f"{statistics.median(latencias) * 1000:>9.2f} {percentil(latencias, 95) * 1000:>9.2f} {erros:>6}"
+            )
+
+    def montar_requisicoes(self, options):
+        total = options["requisicoes"]
+        if options["endpoint"] == "carrinho":
+            produto_id = Produto.objects.values_list("id", flat=True).first()
+            if produto_id is None:
+                raise CommandError("Nenhum produto cadastrado.")
+            corpo = json.dumps({"produto_id": produto_id, "quantidade": 1})
+            return [("post", "/api/carrinho/add/", corpo)] * total
+
+        if options["sem_cache"]:
+            return [("get", f"/api/produtos/?_={i}", None) for i in range(total)]
+        return [("get", "/api/produtos/", None)] * total
+
+    def rodar_wsgi(self, requisicoes, concorrencia):
+        local = threading.local()
+
+        def executar(requisicao):
+            if not hasattr(local, "client"):
+                local.client = Client()
+            metodo, caminho, corpo = requisicao
+            inicio = time.perf_counter()
+            if metodo == "get":
+                resposta = local.client.get(caminho, headers=self.cabecalhos)
+            else:
+                resposta = local.client.post(caminho, corpo, content_type="application/json", headers=self.cabecalhos)
+            return time.perf_counter() - inicio, resposta.status_code
+
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            return list(executor.map(executar, requisicoes))
+
+    async def rodar_asgi(self, requisicoes, concorrencia):
+        # Cabeçalhos passados a cada requisição: os do construtor não chegam ao scope ASGI
+        client = AsyncClient()
+        semaforo = asyncio.Semaphore(concorrencia)
+
+        async def executar(requisicao):
+            metodo, caminho, corpo = requisicao
+            async with semaforo:
+                inicio = time.perf_counter()
+                if metodo == "get":
+                    resposta = await client.get(caminho, headers=self.cabecalhos)
+                else:
+                    resposta = await client.post(
+                        caminho, corpo, content_type="application/json", headers=self.cabecalhos
+                    )
+                return time.perf_counter() - inicio, resposta.status_code
+
+        return await asyncio.gather(*(executar(requisicao) for requisicao in requisicoes))
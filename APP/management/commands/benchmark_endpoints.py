@@ -0,0 +1,95 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from APP.benchmark import CENARIOS, Contexto, carregar_resultados, comparar, executar_cenario, violacoes
+from APP.dados_sinteticos import gerar_dados
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula um banco de teste com dados sintéticos, mede latência e queries SQL de todas as "
+        "rotas da API e falha se algum orçamento de queries ou limite de p95 for excedido."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--produtos", type=int, default=100_000)
+        parser.add_argument("--usuarios", type=int, default=1000)
+        parser.add_argument("--pedidos", type=int, default=5000)
+        parser.add_argument("--avaliacoes", type=int, default=10_000)
+        parser.add_argument("--repeticoes", type=int, default=20, help="Requisições medidas por cenário.")
+        parser.add_argument("--cenario", action="append", help="Roda só os cenários com este nome (repetível).")
+        parser.add_argument("--saida", default="benchmark.json", help="Arquivo JSON com os resultados.")
+        parser.add_argument("--comparar", help="Resultado de uma execução anterior para comparação.")
+        parser.add_argument(
+            "--fator-latencia", type=float, default=1.0,
+            help="Multiplica os limites de p95 (máquinas mais lentas); 0 desliga a verificação de latência.",
+        )
+
+    def handle(self, *args, **options):
+        cenarios = [c for c in CENARIOS if not options["cenario"] or c.nome in options["cenario"]]
+        if not cenarios:
+            raise CommandError("Nenhum cenário com esse nome.")
+
+        setup_test_environment()
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            resultado = self.executar(cenarios, options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+        with open(options["saida"], "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        self.stdout.write(f"Resultados gravados em {options['saida']}")
+
+        if options["comparar"]:
+            self.mostrar_comparacao(carregar_resultados(options["comparar"]), resultado)
+
+        if resultado["violacoes"]:
+            raise CommandError(f"{len(resultado['violacoes'])} cenário(s) fora do orçamento.")
+
+    def executar(self, cenarios, options):
+        inicio = time.perf_counter()
+        tamanhos = gerar_dados(
+            produtos=options["produtos"], usuarios=options["usuarios"],
+            pedidos=options["pedidos"], avaliacoes=options["avaliacoes"],
+        )
+        self.stdout.write(f"Dados gerados em {time.perf_counter() - inicio:.1f}s: {tamanhos}")
+        contexto = Contexto()
+
+        self.stdout.write(f"{'cenário':<24} {'queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        resultados, falhas = {}, {}
+        for cenario in cenarios:
+            resultado = executar_cenario(cenario, contexto, repeticoes=options["repeticoes"])
+            resultados[cenario.nome] = resultado
+            erros = violacoes(cenario, resultado, options["fator_latencia"])
+
+            linha = (
+                f"{cenario.nome:<24} {resultado['consultas']:>7} {resultado['p50_ms']:>9.2f} "
+                f"{resultado['p95_ms']:>9.2f} {resultado['p99_ms']:>9.2f}"
+            )
+            if erros:
+                falhas[cenario.nome] = erros
+                self.stdout.write(self.style.ERROR(f"{linha}  {'; '.join(erros)}"))
+            else:
+                self.stdout.write(linha)
+
+        return {
+            "gerado_em": timezone.now().isoformat(),
+            "tamanhos": tamanhos,
+            "repeticoes": options["repeticoes"],
+            "cenarios": resultados,
+            "violacoes": falhas,
+        }
+
+    def mostrar_comparacao(self, anterior, atual):
+        self.stdout.write(f"\n{'cenário':<24} {'p95 antes':>10} {'p95 agora':>10} {'variação':>9} {'queries':>9}")
+        for nome, antes, agora, variacao, consultas_antes, consultas_agora in comparar(anterior, atual):
+            self.stdout.write(
+                f"{nome:<24} {antes:>10.2f} {agora:>10.2f} {variacao:>+8.1f}% {consultas_antes:>4} → {consultas_agora}"
+            )
@@ -0,0 +1,78 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from APP.compressao import brotli, comprimir
+from APP.dados_sinteticos import gerar_dados
+from APP.models import Produto
+from APP.renderizadores import JSONRendererRapido, loads, orjson
+from APP.serializacao import LEITOR_PRODUTO
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede, para páginas de /api/produtos/ de vários tamanhos, o tempo de codificar e decodificar "
+        "o JSON (json padrão x renderer rápido) e os bytes transferidos sem compressão, com gzip e com brotli."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamanhos", type=int, nargs="+", default=[20, 100, 1000, 10_000],
+            help="Produtos por resposta.",
+        )
+        parser.add_argument("--repeticoes", type=int, default=20)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            gerar_dados(produtos=max(options["tamanhos"]), usuarios=10, pedidos=0, avaliacoes=0)
+            self.executar(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+    def executar(self, options):
+        repeticoes = options["repeticoes"]
+        padrao, rapido = JSONRenderer(), JSONRendererRapido()
+        self.stdout.write(f"renderer rápido: {'orjson ' + orjson.__version__ if orjson else 'indisponível (json padrão)'}")
+        self.stdout.write(
+            f"{'produtos':>8} {'json ms':>9} {'rápido ms':>10} {'parse ms':>9} {'rápido ms':>10} "
+            f"{'bytes':>10} {'gzip':>9} {'gzip ms':>8} {'brotli':>9} {'br ms':>7}"
+        )
+
+        for tamanho in options["tamanhos"]:
+            produtos = LEITOR_PRODUTO.linhas(Produto.objects.order_by("id"))[:tamanho]
+            dados = {"next": None, "previous": None, "results": LEITOR_PRODUTO.serializar(produtos)}
+            corpo = rapido.render(dados)
+            if corpo != padrao.render(dados):
+                self.stderr.write(self.style.WARNING(f"{tamanho}: saídas dos renderers diferem"))
+
+            gzip = comprimir(corpo, "gzip")
+            brotli_bytes = comprimir(corpo, "br") if brotli else None
+            linha = (
+                f"{tamanho:>8} {self.medir(lambda: padrao.render(dados), repeticoes):>9.2f} "
+                f"{self.medir(lambda: rapido.render(dados), repeticoes):>10.2f} "
+                f"{self.medir(lambda: json.loads(corpo), repeticoes):>9.2f} "
+                f"{self.medir(lambda: loads(corpo), repeticoes):>10.2f} "
+                f"{len(corpo):>10} {len(gzip):>9} {self.medir(lambda: comprimir(corpo, 'gzip'), repeticoes):>8.2f} "
+            )
+            if brotli_bytes is None:
+                linha += f"{'-':>9} {'-':>7}"
+            else:
+                linha += f"{len(brotli_bytes):>9} {self.medir(lambda: comprimir(corpo, 'br'), repeticoes):>7.2f}"
+            self.stdout.write(linha)
+
+    def medir(self, funcao, repeticoes):
+        """Mediana em ms."""
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tempos)
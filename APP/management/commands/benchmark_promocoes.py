@@ -0,0 +1,140 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from APP.dados_sinteticos import gerar_dados
+from APP.models import Pedido, Produto, Promocao
+from APP.promocoes import CENTAVO, ZERO, compilar, invalidar_promocoes, precificar
+
+METODOS = ["", *Pedido.MetodosPagamento.values]
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria milhares de promoções (produto, categoria, gerais, por método e por faixa de quantidade) e mede "
+        "a compilação da tabela e a precificação de carrinhos grandes, contra avaliar toda regra em toda linha."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--regras", type=int, default=10_000)
+        parser.add_argument("--linhas", type=int, default=200, help="Linhas por carrinho.")
+        parser.add_argument("--carrinhos", type=int, default=50)
+        parser.add_argument("--produtos", type=int, default=20_000)
+        parser.add_argument(
+            "--ingenuos", type=int, default=3,
+            help="Carrinhos precificados também pela varredura de todas as regras (lenta).",
+        )
+        parser.add_argument("--semente", type=int, default=42)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            gerar_dados(
+                produtos=options["produtos"], imagens_por_produto=0, pecas_por_produto=0,
+                usuarios=10, pedidos=0, avaliacoes=0,
+            )
+            self.executar(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+    def executar(self, options):
+        aleatorio = random.Random(options["semente"])
+        produtos = list(Produto.objects.values_list("id", "categoria_id", "preco"))
+        categorias = sorted({categoria_id for _, categoria_id, _ in produtos})
+
+        Promocao.objects.bulk_create(
+            [self.sortear_regra(aleatorio, numero, produtos, categorias) for numero in range(options["regras"])],
+            batch_size=2000,
+        )
+        invalidar_promocoes()
+
+        tempos = []
+        for _ in range(5):
+            inicio = time.perf_counter()
+            tabela = compilar()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        self.stdout.write(
+            f"{tabela.total_regras} regras em {len(tabela.indices)} índices; compilação: "
+            f"{statistics.median(tempos):.1f} ms (1 query)"
+        )
+
+        carrinhos = [
+            (
+                [
+                    (produto_id, categoria_id, preco, aleatorio.choice([1, 1, 2, 3, 5, 10, 12]))
+                    for produto_id, categoria_id, preco in aleatorio.sample(produtos, options["linhas"])
+                ],
+                aleatorio.choice(METODOS[1:]),
+            )
+            for _ in range(options["carrinhos"])
+        ]
+
+        tempos = []
+        for linhas, metodo in carrinhos:
+            inicio = time.perf_counter()
+            precificar(linhas, metodo, tabela)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        self.stdout.write(
+            f"tabela compilada: {statistics.median(tempos):.2f} ms por carrinho de {options['linhas']} linhas "
+            f"(p95 {sorted(tempos)[int(len(tempos) * 0.95) - 1]:.2f} ms)"
+        )
+
+        if not options["ingenuos"]:
+            return
+        regras = list(Promocao.objects.values(
+            "id", "percentual", "produto_id", "categoria_id", "metodo_pagamento", "quantidade_minima",
+        ))
+        tempos = []
+        for linhas, metodo in carrinhos[:options["ingenuos"]]:
+            inicio = time.perf_counter()
+            descontos = self.precificar_ingenuo(regras, linhas, metodo)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            if descontos != [desconto for _, desconto, _ in precificar(linhas, metodo, tabela)]:
+                self.stderr.write(self.style.WARNING("varredura e tabela compilada divergem"))
+        self.stdout.write(f"varredura de todas as regras: {statistics.median(tempos):.1f} ms por carrinho")
+
+    def sortear_regra(self, aleatorio, numero, produtos, categorias):
+        escopo = aleatorio.choices(["produto", "categoria", "geral"], weights=[70, 25, 5])[0]
+        return Promocao(
+            nome=f"Promoção {numero}",
+            percentual=Decimal(aleatorio.randint(100, 4000)) / 100,
+            produto_id=aleatorio.choice(produtos)[0] if escopo == "produto" else None,
+            categoria_id=aleatorio.choice(categorias) if escopo == "categoria" else None,
+            metodo_pagamento=aleatorio.choices(METODOS, weights=[70, 10, 10, 10])[0],
+            quantidade_minima=aleatorio.choice([1, 1, 1, 3, 5, 10]),
+            fim=timezone.now() + timedelta(days=30) if aleatorio.random() < 0.2 else None,
+        )
+
+    def precificar_ingenuo(self, regras, linhas, metodo):
+        """Toda regra contra toda linha, com o mesmo critério de desempate de APP/promocoes.py."""
+        descontos = []
+        for produto_id, categoria_id, preco, quantidade in linhas:
+            melhor = None
+            for regra in regras:
+                if regra["produto_id"] is not None:
+                    if regra["produto_id"] != produto_id:
+                        continue
+                    nivel = 0
+                elif regra["categoria_id"] is not None:
+                    if regra["categoria_id"] != categoria_id:
+                        continue
+                    nivel = 1
+                else:
+                    nivel = 2
+                if regra["metodo_pagamento"] not in ("", metodo) or quantidade < regra["quantidade_minima"]:
+                    continue
+                chave = (regra["percentual"], -nivel, -regra["id"])
+                if melhor is None or chave > melhor:
+                    melhor = chave
+            bruto = preco * quantidade
+            descontos.append((bruto * melhor[0] / 100).quantize(CENTAVO) if melhor else ZERO)
+        return descontos
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from APP.dados_sinteticos import SENHA_PADRAO, gerar_dados
+
+
+class Command(BaseCommand):
+    help = "Popula o banco configurado com dados sintéticos (catálogo, usuários, pedidos e avaliações)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--categorias", type=int, default=20)
+        parser.add_argument("--produtos", type=int, default=100_000)
+        parser.add_argument("--imagens-por-produto", type=int, default=3)
+        parser.add_argument("--pecas-por-produto", type=int, default=2)
+        parser.add_argument("--usuarios", type=int, default=1000)
+        parser.add_argument("--pedidos", type=int, default=5000)
+        parser.add_argument("--itens-por-pedido", type=int, default=3)
+        parser.add_argument("--avaliacoes", type=int, default=10_000)
+        parser.add_argument(
+            "--dias-de-pedidos", type=int, default=365, help="Janela, até hoje, em que as datas dos pedidos se espalham.",
+        )
+        parser.add_argument("--lote", type=int, default=5000, help="Linhas por bulk_create.")
+        parser.add_argument("--semente", type=int, default=42)
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        contagem = gerar_dados(
+            categorias=options["categorias"],
+            produtos=options["produtos"],
+            imagens_por_produto=options["imagens_por_produto"],
+            pecas_por_produto=options["pecas_por_produto"],
+            usuarios=options["usuarios"],
+            pedidos=options["pedidos"],
+            itens_por_pedido=options["itens_por_pedido"],
+            avaliacoes=options["avaliacoes"],
+            dias_de_pedidos=options["dias_de_pedidos"],
+            lote=options["lote"],
+            semente=options["semente"],
+        )
+        duracao = time.perf_counter() - inicio
+
+        for tabela, quantidade in contagem.items():
+            self.stdout.write(f"{tabela:<12} {quantidade:>9}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Dados gerados em {duracao:.1f}s. Senha dos usuários sintéticos: {SENHA_PADRAO}"
+        ))
@@ -0,0 +1,130 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from APP.importacao import ler_registros, lotes
+from APP.models import Usuario
+
+
+CAMPOS_OBRIGATORIOS = ("email", "cpf", "nome", "password")
+CARGOS = {cargo for cargo, _ in Usuario.CARGOS}
+
+
+def _inicializar_processo():
+    # Com "spawn" o processo filho começa sem o Django configurado
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Importa usuários em massa de um arquivo CSV ou JSONL (um objeto por linha)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo")
+        parser.add_argument("--formato", choices=["csv", "jsonl"], help="Padrão: pela extensão do arquivo.")
+        parser.add_argument("--lote", type=int, default=1000, help="Usuários gravados por bulk_create.")
+        parser.add_argument(
+            "--processos", type=int, default=os.cpu_count(),
+            help="Processos para o hash das senhas (0 = no próprio processo).",
+        )
+
+    def handle(self, *args, **options):
+        caminho = options["arquivo"]
+        formato = options["formato"] or ("csv" if caminho.endswith(".csv") else "jsonl")
+        if not os.path.exists(caminho):
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+
+        # Uma única query carrega emails e CPFs já cadastrados
+        self.emails = set()
+        self.cpfs = set()
+        for email, cpf in Usuario.objects.values_list("email", "cpf").iterator(chunk_size=5000):
+            self.emails.add(email.lower())
+            self.cpfs.add(cpf)
+
+        self.criados = self.rejeitados = 0
+        inicio = time.perf_counter()
+
+        executor = None
+        self.processos = options["processos"]
+        if self.processos:
+            # O fork não deve herdar conexões abertas com o banco
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=self.processos, initializer=_inicializar_processo)
+
+        try:
+            registros = ler_registros(caminho, formato)
+            for numero, lote in enumerate(lotes(registros, options["lote"]), start=1):
+                self.importar_lote(lote, executor)
+                decorrido = time.perf_counter() - inicio
+                self.stdout.write(
+                    f"lote {numero}: {self.criados} criados, {self.rejeitados} rejeitados "
+                    f"({self.criados / decorrido:.0f} usuários/s)"
+                )
+        finally:
+            if executor:
+                executor.shutdown()
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.criados} usuários importados, {self.rejeitados} rejeitados em {duracao:.2f}s "
+            f"({self.criados / duracao if duracao else 0:.0f} usuários/s)"
+        ))
+
+    def validar(self, registro):
+        registro = {campo: "" if valor is None else str(valor) for campo, valor in registro.items()}
+        faltando = [campo for campo in CAMPOS_OBRIGATORIOS if not registro.get(campo, "").strip()]
+        if faltando:
+            return f"campos obrigatórios ausentes: {', '.join(faltando)}"
+
+        email = Usuario.objects.normalize_email(registro["email"].strip())
+        cpf = registro["cpf"].strip()
+        cargo = registro.get("cargo", "").strip().upper() or "CLIENTE"
+
+        if email.lower() in self.emails:
+            return f"email já cadastrado: {email}"
+        if cpf in self.cpfs:
+            return f"CPF já cadastrado: {cpf}"
+        if cargo not in CARGOS:
+            return f"cargo inválido: {cargo}"
+
+        self.emails.add(email.lower())
+        self.cpfs.add(cpf)
+        return Usuario(
+            email=email,
+            cpf=cpf,
+            nome=registro["nome"].strip(),
+            endereco=registro.get("endereco", "").strip(),
+            cargo=cargo,
+        )
+
+    def importar_lote(self, lote, executor):
+        usuarios, senhas = [], []
+        for registro in lote:
+            resultado = self.validar(registro)
+            if isinstance(resultado, str):
+                self.rejeitados += 1
+                self.stderr.write(f"rejeitado: {resultado}")
+                continue
+            usuarios.append(resultado)
+            senhas.append(str(registro["password"]))
+
+        if not usuarios:
+            return
+
+        # O hash (PBKDF2) é o gargalo: distribuído entre os processos
+        if executor:
+            blocos = max(1, len(senhas) // (self.processos * 4))
+            hashes = executor.map(make_password, senhas, chunksize=blocos)
+        else:
+            hashes = map(make_password, senhas)
+
+        for usuario, senha_hash in zip(usuarios, hashes):
+            usuario.password = senha_hash
+
+        with transaction.atomic():
+            Usuario.objects.bulk_create(usuarios, batch_size=len(usuarios))
+        self.criados += len(usuarios)
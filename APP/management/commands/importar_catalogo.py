@@ -0,0 +1,46 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from APP.importacao import ImportadorCatalogo, ler_registros, lotes
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa (cria ou atualiza pelo codigo) produtos, categorias, imagens e peças de um arquivo "
+        "CSV ou JSONL, no mesmo formato de /api/produtos/exportar/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo")
+        parser.add_argument("--formato", choices=["csv", "jsonl"], help="Padrão: pela extensão do arquivo.")
+        parser.add_argument("--lote", type=int, default=1000, help="Produtos gravados por transação.")
+
+    def handle(self, *args, **options):
+        caminho = options["arquivo"]
+        formato = options["formato"] or ("csv" if caminho.endswith(".csv") else "jsonl")
+        if not os.path.exists(caminho):
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+
+        importador = ImportadorCatalogo()
+        inicio = time.perf_counter()
+
+        registros = ler_registros(caminho, formato)
+        for numero, lote in enumerate(lotes(registros, options["lote"]), start=1):
+            for erro in importador.importar_lote(lote):
+                self.stderr.write(f"rejeitado: {erro}")
+            decorrido = time.perf_counter() - inicio
+            processados = importador.criados + importador.atualizados
+            self.stdout.write(
+                f"lote {numero}: {importador.criados} criados, {importador.atualizados} atualizados, "
+                f"{importador.rejeitados} rejeitados ({processados / decorrido:.0f} produtos/s)"
+            )
+
+        duracao = time.perf_counter() - inicio
+        processados = importador.criados + importador.atualizados
+        self.stdout.write(self.style.SUCCESS(
+            f"{importador.criados} produtos criados, {importador.atualizados} atualizados, "
+            f"{importador.rejeitados} rejeitados em {duracao:.2f}s "
+            f"({processados / duracao if duracao else 0:.0f} produtos/s)"
+        ))
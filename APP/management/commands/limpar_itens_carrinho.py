@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from APP.models import ItemCarrinho
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove, em lotes, as linhas de ItemCarrinho que não pertencem a nenhum "
+        "pedido (sobras do carrinho antigo, que gravava uma linha por item adicionado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="Linhas removidas por transação.")
+        parser.add_argument("--dry-run", action="store_true", help="Só conta as linhas órfãs.")
+
+    def handle(self, *args, **options):
+        orfaos = ItemCarrinho.objects.filter(pedido__isnull=True)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{orfaos.count()} itens órfãos encontrados")
+            return
+
+        inicio = time.perf_counter()
+        removidos = 0
+        ultimo_id = 0
+        while True:
+            # Keyset por id: cada lote começa onde o anterior parou
+            ids = list(
+                orfaos.filter(id__gt=ultimo_id).order_by("id").values_list("id", flat=True)[:options["lote"]]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                _, por_modelo = ItemCarrinho.objects.filter(id__in=ids, pedido__isnull=True).delete()
+            removidos += por_modelo.get(ItemCarrinho._meta.label, 0)
+            ultimo_id = ids[-1]
+            self.stdout.write(f"{removidos} itens removidos...")
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(f"{removidos} itens órfãos removidos em {duracao:.2f}s"))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from APP.avaliacoes import reconciliar_avaliacoes
+from APP.cache import invalidar_catalogo
+from APP.detalhe import invalidar_detalhes
+
+
+class Command(BaseCommand):
+    help = "Recalcula média, total e histograma de avaliações de todos os produtos."
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            total = reconciliar_avaliacoes()
+        invalidar_catalogo()
+        invalidar_detalhes()
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} produtos reconciliados em {duracao:.2f}s"
+        ))
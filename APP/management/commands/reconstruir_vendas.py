@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from APP.relatorios import reconstruir_vendas
+
+
+class Command(BaseCommand):
+    help = "Recalcula do zero os consolidados diários de vendas (por produto e por categoria)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bloco", type=int, default=2000, help="Pedidos lidos por query.")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total = reconstruir_vendas(options["bloco"])
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} pedidos consolidados em {duracao:.2f}s"
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from APP.busca import indice_disponivel, reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Reconstrói do zero o índice de busca de produtos (FTS5)."
+
+    def handle(self, *args, **options):
+        if not indice_disponivel():
+            self.stderr.write("O índice FTS5 só está disponível com SQLite.")
+            return
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            total = reconstruir_indice()
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} produtos indexados em {duracao:.2f}s"
+        ))
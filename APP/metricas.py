@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+
+logger = logging.getLogger(__name__)
+
+
+# ---- MÉTRICAS POR ROTA ---- #
+# MetricasMiddleware mede cada requisição (latência, queries, tempo no banco,
+# tamanho da resposta) agrupando pelo nome da rota. As queries são contadas
+# por um execute_wrapper instalado uma única vez em cada conexão (signal
+# connection_created), que registra na coleta da requisição corrente, guardada
+# em uma ContextVar: funciona também nas views assíncronas, cujas queries
+# rodam em outra thread.
+#
+# Cada thread acumula em um fragmento próprio, sem trava; só o /metricas/
+# percorre e soma os fragmentos.
+FAIXAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+FAIXAS_QUERIES = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+FAIXAS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+HISTOGRAMAS = {
+    "mangeira_requisicao_segundos": ("Latência das requisições por rota.", FAIXAS_SEGUNDOS),
+    "mangeira_db_segundos": ("Tempo gasto em queries SQL por requisição.", FAIXAS_SEGUNDOS),
+    "mangeira_queries_por_requisicao": ("Queries SQL executadas por requisição.", FAIXAS_QUERIES),
+    "mangeira_resposta_bytes": ("Tamanho do corpo das respostas.", FAIXAS_BYTES),
+}
+CONTADORES = {
+    "mangeira_requisicoes_total": "Requisições por rota e status HTTP.",
+    "mangeira_queries_lentas_total": "Queries acima de METRICAS_QUERY_LENTA_MS por rota.",
+}
+
+ROTA_DESCONHECIDA = "nao_resolvida"
+
+
+class Fragmento:
+    """Métricas acumuladas por uma única thread."""
+
+    def __init__(self):
+        self.contadores = defaultdict(float)
+        # (nome, rótulos) -> [contagem por faixa..., contagem +Inf, soma]
+        self.histogramas = {}
+
+    def incrementar(self, nome, rotulos, valor=1):
+        self.contadores[nome, rotulos] += valor
+
+    def observar(self, nome, rotulos, valor):
+        faixas = HISTOGRAMAS[nome][1]
+        serie = self.histogramas.get((nome, rotulos))
+        if serie is None:
+            serie = self.histogramas[nome, rotulos] = [0] * (len(faixas) + 1) + [0.0]
+        serie[bisect_left(faixas, valor)] += 1
+        serie[-1] += valor
+
+
+class Registro:
+    def __init__(self):
+        self._local = threading.local()
+        self._fragmentos = []
+        self._trava = threading.Lock()
+
+    def fragmento(self):
+        fragmento = getattr(self._local, "fragmento", None)
+        if fragmento is None:
+            fragmento = self._local.fragmento = Fragmento()
+            # Única trava: uma vez por thread, ao criar o fragmento
+            with self._trava:
+                self._fragmentos.append(fragmento)
+        return fragmento
+
+    def limpar(self):
+        with self._trava:
+            for fragmento in self._fragmentos:
+                fragmento.contadores.clear()
+                fragmento.histogramas.clear()
+
+    def somar(self):
+        contadores = defaultdict(float)
+        histogramas = {}
+        with self._trava:
+            fragmentos = list(self._fragmentos)
+        for fragmento in fragmentos:
+            # dict(...) copia de uma vez, sem ceder o GIL para a thread dona
+            for chave, valor in dict(fragmento.contadores).items():
+                contadores[chave] += valor
+            for chave, serie in dict(fragmento.histogramas).items():
+                soma = histogramas.setdefault(chave, [0] * (len(serie) - 1) + [0.0])
+                for indice, valor in enumerate(list(serie)):
+                    soma[indice] += valor
+        return contadores, histogramas
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        contadores, histogramas = self.somar()
+        linhas = []
+
+        for nome, (ajuda, faixas) in HISTOGRAMAS.items():
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} histogram"]
+            for (serie_nome, rotulos), serie in sorted(histogramas.items()):
+                if serie_nome != nome:
+                    continue
+                acumulado = 0
+                for limite, quantidade in zip([*map(_numero, faixas), "+Inf"], serie[:-1]):
+                    acumulado += quantidade
+                    linhas.append(f"{nome}_bucket{_rotulos(rotulos, le=limite)} {acumulado}")
+                linhas.append(f"{nome}_sum{_rotulos(rotulos)} {_numero(serie[-1])}")
+                linhas.append(f"{nome}_count{_rotulos(rotulos)} {acumulado}")
+
+        for nome, ajuda in CONTADORES.items():
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+            for (serie_nome, rotulos), valor in sorted(contadores.items()):
+                if serie_nome == nome:
+                    linhas.append(f"{nome}{_rotulos(rotulos)} {_numero(valor)}")
+
+        return "\n".join(linhas) + "\n"
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(rotulos, **extras):
+    pares = [*rotulos, *extras.items()]
+    return "{" + ",".join(f'{chave}="{_escapar(valor)}"' for chave, valor in pares) + "}"
+
+
+registro = Registro()
+
+
+# ---- COLETA DA REQUISIÇÃO ---- #
+class Coleta:
+    __slots__ = ("request", "consultas", "tempo_db")
+
+    def __init__(self, request):
+        self.request = request
+        self.consultas = 0
+        self.tempo_db = 0.0
+
+    @property
+    def rota(self):
+        # resolver_match é preenchido antes da view rodar
+        resolver_match = getattr(self.request, "resolver_match", None)
+        return (resolver_match and resolver_match.view_name) or ROTA_DESCONHECIDA
+
+
+_coleta = ContextVar("coleta_metricas", default=None)
+
+
+def medir_query(execute, sql, params, many, context):
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracao = time.perf_counter() - inicio
+        coleta = _coleta.get()
+        if coleta is not None:
+            coleta.consultas += 1
+            coleta.tempo_db += duracao
+
+        if duracao * 1000 >= settings.METRICAS_QUERY_LENTA_MS:
+            rota = coleta.rota if coleta is not None else ROTA_DESCONHECIDA
+            registro.fragmento().incrementar("mangeira_queries_lentas_total", (("rota", rota),))
+            logger.warning("Query lenta (%.1f ms) na rota %s: %s", duracao * 1000, rota, sql[:1000])
+
+
+def instalar_medicao(sender, connection, **kwargs):
+    """Receptor de connection_created: mede todas as queries da conexão."""
+    if medir_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, medir_query)
+
+
+# ---- MIDDLEWARE ---- #
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        coleta = Coleta(request)
+        token = _coleta.set(coleta)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        self.registrar(response, coleta, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        coleta = Coleta(request)
+        token = _coleta.set(coleta)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _coleta.reset(token)
+        self.registrar(response, coleta, time.perf_counter() - inicio)
+        return response
+
+    def registrar(self, response, coleta, duracao):
+        rotulos = (("rota", coleta.rota),)
+        fragmento = registro.fragmento()
+        fragmento.observar("mangeira_requisicao_segundos", rotulos, duracao)
+        fragmento.observar("mangeira_db_segundos", rotulos, coleta.tempo_db)
+        fragmento.observar("mangeira_queries_por_requisicao", rotulos, coleta.consultas)
+        if not response.streaming:
+            fragmento.observar("mangeira_resposta_bytes", rotulos, len(response.content))
+        fragmento.incrementar("mangeira_requisicoes_total", (*rotulos, ("status", response.status_code)))
+
+
+# ---- ENDPOINT ---- #
+def metricas(request):
+    token = settings.METRICAS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401)
+    return HttpResponse(registro.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8")
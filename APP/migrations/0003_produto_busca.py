@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# SQL fixado aqui, como estava quando a migração foi escrita: o APP/busca.py
+# pode mudar (ou importar modelos que ainda não existem neste estado) sem
+# alterar o que esta migração faz.
+SQL_CRIAR_INDICE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS APP_produto_busca USING fts5(
+        nome, descricao, categoria, pecas,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+"""
+
+SQL_PREENCHER_INDICE = """
+    INSERT INTO APP_produto_busca (rowid, nome, descricao, categoria, pecas)
+    SELECT p.id, p.nome, p.descricao, c.nome,
+           COALESCE((SELECT group_concat(pc.nome, ' ')
+                     FROM APP_peca pc
+                     WHERE pc.produto_id = p.id), '')
+    FROM APP_produto p
+    JOIN APP_categoria c ON c.id = p.categoria_id
+"""
+
+SQL_REMOVER_INDICE = "DROP TABLE IF EXISTS APP_produto_busca"
+
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(SQL_CRIAR_INDICE)
+    schema_editor.execute("DELETE FROM APP_produto_busca")
+    schema_editor.execute(SQL_PREENCHER_INDICE)
+    schema_editor.execute("INSERT INTO APP_produto_busca (APP_produto_busca) VALUES ('optimize')")
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(SQL_REMOVER_INDICE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0002_alter_usuario_managers_usuario_cargo'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0003_produto_busca'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['categoria', 'preco'], name='produto_categoria_preco_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['categoria', 'media_avaliacao'], name='produto_categoria_media_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['categoria', 'total_avaliacoes'], name='produto_categoria_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['preco'], name='produto_preco_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['media_avaliacao'], name='produto_media_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['total_avaliacoes'], name='produto_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['parcelas_max_sem_juros', 'preco'], name='produto_parcelas_preco_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:53
+
+from django.db import migrations, models
+
+
+# Agregados de cada produto a partir das avaliações existentes, com o SQL
+# fixado aqui (como em 0003): mudanças em APP/avaliacoes.py não alteram o
+# que esta migração faz.
+SQL_PREENCHER_AGREGADOS = """
+    UPDATE "APP_produto" SET
+        total_avaliacoes = (
+            SELECT COUNT(*) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id
+        ),
+        soma_avaliacoes = COALESCE((
+            SELECT SUM(a.nota) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id
+        ), 0),
+        media_avaliacao = COALESCE((
+            SELECT AVG(CAST(a.nota AS REAL)) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id
+        ), 0.0),
+        avaliacoes_nota_1 = (
+            SELECT COUNT(*) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id AND a.nota = 1
+        ),
+        avaliacoes_nota_2 = (
+            SELECT COUNT(*) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id AND a.nota = 2
+        ),
+        avaliacoes_nota_3 = (
+            SELECT COUNT(*) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id AND a.nota = 3
+        ),
+        avaliacoes_nota_4 = (
+            SELECT COUNT(*) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id AND a.nota = 4
+        ),
+        avaliacoes_nota_5 = (
+            SELECT COUNT(*) FROM "APP_avaliacao" a WHERE a.produto_id = "APP_produto".id AND a.nota = 5
+        )
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0004_produto_indices_catalogo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='avaliacoes_nota_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='avaliacoes_nota_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='avaliacoes_nota_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='avaliacoes_nota_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='avaliacoes_nota_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='produto',
+            name='soma_avaliacoes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(SQL_PREENCHER_AGREGADOS, migrations.RunSQL.noop),
+    ]
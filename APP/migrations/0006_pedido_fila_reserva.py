@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0005_produto_agregados_avaliacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='reserva',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='reservado_ate',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='responsavel',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedidos_reservados', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['status', 'data_criacao'], name='pedido_status_data_idx'),
+        ),
+    ]
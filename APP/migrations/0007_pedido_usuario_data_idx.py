@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0006_pedido_fila_reserva'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', 'data_criacao'], name='pedido_usuario_data_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0007_pedido_usuario_data_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CarrinhoSalvo',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='carrinho_salvo', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('itens', models.JSONField(default=dict)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
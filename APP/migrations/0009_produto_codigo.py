@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0008_carrinhosalvo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='codigo',
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0009_produto_codigo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['data_criacao', 'id'], name='pedido_data_id_idx'),
+        ),
+    ]
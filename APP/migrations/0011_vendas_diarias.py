@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0010_pedido_data_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendaDiariaCategoria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('valor_bruto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_desconto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades_aprovadas', models.PositiveIntegerField(default=0)),
+                ('valor_aprovado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades_devolvidas', models.PositiveIntegerField(default=0)),
+                ('valor_devolvido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades_canceladas', models.PositiveIntegerField(default=0)),
+                ('valor_cancelado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendas_diarias', to='APP.categoria')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'categoria'), name='venda_dia_categoria_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VendaDiariaProduto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('valor_bruto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_desconto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades_aprovadas', models.PositiveIntegerField(default=0)),
+                ('valor_aprovado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades_devolvidas', models.PositiveIntegerField(default=0)),
+                ('valor_devolvido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades_canceladas', models.PositiveIntegerField(default=0)),
+                ('valor_cancelado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendas_diarias', to='APP.produto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'produto'), name='venda_dia_produto_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0011_vendas_diarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProdutoDetalhe',
+            fields=[
+                ('produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='detalhe', serialize=False, to='APP.produto')),
+                ('documento', models.BinaryField()),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0012_produtodetalhe'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usuario',
+            name='cargo',
+            field=models.CharField(choices=[('CLIENTE', 'Cliente'), ('FINANCEIRO', 'Financeiro'), ('LOGISTICA', 'Logística'), ('POS_VENDA', 'Pós Venda'), ('ADMIN', 'Administrador')], db_index=True, default='CLIENTE', max_length=20),
+        ),
+    ]
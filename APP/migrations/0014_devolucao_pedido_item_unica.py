@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:59
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remover_duplicadas(apps, schema_editor):
+    # Mantém a primeira devolução de cada (pedido, item)
+    Devolucao = apps.get_model('APP', 'Devolucao')
+    primeiras = Devolucao.objects.values('pedido_id', 'item_id').annotate(primeira=Min('id')).values('primeira')
+    Devolucao.objects.exclude(id__in=primeiras).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0013_usuario_cargo_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='devolucao',
+            constraint=models.UniqueConstraint(fields=('pedido', 'item'), name='devolucao_pedido_item_unica'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0014_devolucao_pedido_item_unica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promocao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=100)),
+                ('percentual', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('metodo_pagamento', models.CharField(blank=True, choices=[('PIX', 'Pix'), ('BOLETO', 'Boleto'), ('CARTAO_DE_CREDITO', 'Cartao')], max_length=30)),
+                ('quantidade_minima', models.PositiveIntegerField(default=1)),
+                ('ativa', models.BooleanField(default=True)),
+                ('inicio', models.DateTimeField(blank=True, null=True)),
+                ('fim', models.DateTimeField(blank=True, null=True)),
+                ('categoria', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promocoes', to='APP.categoria')),
+                ('produto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promocoes', to='APP.produto')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('percentual__gt', 0), ('percentual__lte', 100)), name='promocao_percentual_valido'), models.CheckConstraint(condition=models.Q(('produto__isnull', True), ('categoria__isnull', True), _connector='OR'), name='promocao_produto_ou_categoria')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0015_promocao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='versao_credenciais',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
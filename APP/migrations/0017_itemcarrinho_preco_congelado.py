@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:29
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+CENTAVO = Decimal('0.01')
+
+
+def congelar_precos(apps, schema_editor):
+    # Itens já em pedidos: o preço atual é o melhor que se tem do checkout;
+    # o desconto do pedido é rateado pelo valor bruto, como os consolidados faziam
+    ItemCarrinho = apps.get_model('APP', 'ItemCarrinho')
+    Pedido = apps.get_model('APP', 'Pedido')
+    through = Pedido.itens.through
+
+    em_pedidos = through.objects.values('itemcarrinho_id')
+    ItemCarrinho.objects.filter(id__in=em_pedidos).update(
+        preco_unitario=Subquery(
+            apps.get_model('APP', 'Produto').objects.filter(id=OuterRef('produto_id')).values('preco')[:1]
+        )
+    )
+
+    itens = defaultdict(list)
+    linhas = through.objects.exclude(pedido__valor_desconto=0).order_by('id').values_list(
+        'pedido_id', 'pedido__valor_desconto', 'itemcarrinho_id', 'itemcarrinho__preco_unitario',
+        'itemcarrinho__quantidade',
+    )
+    for pedido_id, valor_desconto, item_id, preco, quantidade in linhas.iterator():
+        itens[(pedido_id, valor_desconto)].append((item_id, preco * quantidade))
+
+    alterados = []
+    for (_, valor_desconto), grupo in itens.items():
+        total = sum(bruto for _, bruto in grupo)
+        if not total:
+            continue
+        descontos = [(valor_desconto * bruto / total).quantize(CENTAVO) for _, bruto in grupo]
+        descontos[-1] += valor_desconto - sum(descontos)
+        alterados.extend(ItemCarrinho(id=item_id, desconto=desconto) for (item_id, _), desconto in zip(grupo, descontos))
+    ItemCarrinho.objects.bulk_update(alterados, ['desconto'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0016_usuario_versao_credenciais'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemcarrinho',
+            name='desconto',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='itemcarrinho',
+            name='preco_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(congelar_precos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0017_itemcarrinho_preco_congelado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carrinhosalvo',
+            name='versao',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:48
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0018_carrinhosalvo_versao'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='usuario',
+            managers=[
+            ],
+        ),
+    ]
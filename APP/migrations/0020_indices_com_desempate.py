@@ -0,0 +1,81 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('APP', '0019_alter_usuario_managers'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedido_status_data_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedido_usuario_data_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_categoria_preco_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_categoria_media_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_categoria_total_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_preco_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_media_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='produto',
+            name='produto_total_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['status', 'data_criacao', 'id'], name='pedido_status_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', 'data_criacao', 'id'], name='pedido_usuario_data_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['categoria', 'preco', 'id'], name='produto_cat_preco_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['categoria', 'media_avaliacao', 'id'], name='produto_cat_media_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['categoria', 'total_avaliacoes', 'id'], name='produto_cat_total_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['preco', 'id'], name='produto_preco_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['media_avaliacao', 'id'], name='produto_media_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['total_avaliacoes', 'id'], name='produto_total_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['parcelas_max_sem_juros', 'id'], name='produto_parcelas_id_idx'),
+        ),
+    ]
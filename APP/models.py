@@ -9,6 +9,8 @@ class Categoria(models.Model):
         return self.nome
     
 class Produto(models.Model):
+    # Código do fornecedor (SKU): chave da importação em massa do catálogo
+    codigo = models.CharField(max_length=50, unique=True, null=True, blank=True)
     nome = models.CharField(max_length=150)
     descricao = models.TextField()
     preco = models.DecimalField(max_digits=10, decimal_places=2)
@@ -16,15 +18,49 @@ class Produto(models.Model):
     media_avaliacao = models.FloatField(default=0)
     total_avaliacoes = models.PositiveIntegerField(default=0)
 
+    # Agregados mantidos incrementalmente a cada avaliação (ver APP/avaliacoes.py)
+    soma_avaliacoes = models.PositiveIntegerField(default=0)
+    avaliacoes_nota_1 = models.PositiveIntegerField(default=0)
+    avaliacoes_nota_2 = models.PositiveIntegerField(default=0)
+    avaliacoes_nota_3 = models.PositiveIntegerField(default=0)
+    avaliacoes_nota_4 = models.PositiveIntegerField(default=0)
+    avaliacoes_nota_5 = models.PositiveIntegerField(default=0)
+
     categoria = models.ForeignKey(
         Categoria,
         on_delete=models.CASCADE,
         related_name="produtos"
     )
 
+    class Meta:
+        # Índices dos filtros/ordenações do catálogo (ver APP/filters.py)
+        indexes = [
+            # Cada ordenação da paginação termina no id (APP/pagination.py)
+            models.Index(fields=["categoria", "preco", "id"], name="produto_cat_preco_id_idx"),
+            models.Index(fields=["categoria", "media_avaliacao", "id"], name="produto_cat_media_id_idx"),
+            models.Index(fields=["categoria", "total_avaliacoes", "id"], name="produto_cat_total_id_idx"),
+            models.Index(fields=["preco", "id"], name="produto_preco_id_idx"),
+            models.Index(fields=["media_avaliacao", "id"], name="produto_media_id_idx"),
+            models.Index(fields=["total_avaliacoes", "id"], name="produto_total_id_idx"),
+            models.Index(fields=["parcelas_max_sem_juros", "id"], name="produto_parcelas_id_idx"),
+            models.Index(fields=["parcelas_max_sem_juros", "preco"], name="produto_parcelas_preco_idx"),
+        ]
+
     def __str__(self):
         return self.nome
 
+    @property
+    def histograma_avaliacoes(self):
+        return {str(nota): getattr(self, f"avaliacoes_nota_{nota}") for nota in range(1, 6)}
+
+
+class ProdutoDetalhe(models.Model):
+    # Documento JSON pré-montado da página do produto (ver APP/detalhe.py):
+    # fallback persistente do cache
+    produto = models.OneToOneField(Produto, on_delete=models.CASCADE, primary_key=True, related_name='detalhe')
+    documento = models.BinaryField()
+    atualizado_em = models.DateTimeField(auto_now=True)
+
 
 class ProdutoImagem(models.Model):
     produto = models.ForeignKey(Produto, on_delete=models.CASCADE, related_name='imagens')
@@ -76,8 +112,12 @@ class Usuario(AbstractUser):
     cargo = models.CharField(
         max_length=20,
         choices=CARGOS,
-        default="CLIENTE"  
+        default="CLIENTE",
+        db_index=True,  # filtro do admin
     )
+    # Incrementada a cada alteração do usuário; tokens de versão anterior
+    # não valem só pelas claims (ver APP/autenticacao.py)
+    versao_credenciais = models.PositiveIntegerField(default=0, editable=False)
 
     objects = UsuarioManager()
 
@@ -90,10 +130,23 @@ class Usuario(AbstractUser):
 class ItemCarrinho(models.Model):
     produto = models.ForeignKey(Produto, on_delete=models.CASCADE)
     quantidade = models.PositiveIntegerField(default=1)
+    # Congelados no checkout (APP/pedidos.py): os consolidados de vendas nunca
+    # leem o preço atual do produto
+    preco_unitario = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    desconto = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     def __str__(self):
         return f'{self.produto} x {self.quantidade}'
 
+class CarrinhoSalvo(models.Model):
+    # Carrinho de compras do usuário (ver APP/carrinho.py); o cache guarda só uma cópia de leitura
+    usuario = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='carrinho_salvo')
+    itens = models.JSONField(default=dict)
+    # Incrementada a cada gravação: o compare-and-set das alterações simultâneas
+    # (0 fica para o carrinho que ainda não tem linha)
+    versao = models.PositiveIntegerField(default=1)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
 class Pedido(models.Model):
 
     class MetodosPagamento(models.TextChoices):
@@ -129,6 +182,53 @@ class Pedido(models.Model):
 
     data_criacao = models.DateTimeField(auto_now_add=True)
 
+    # Reserva (lease) de um pedido por quem vai processá-lo na fila do cargo
+    responsavel = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='pedidos_reservados'
+    )
+    reserva = models.UUIDField(null=True, blank=True)
+    reservado_ate = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "data_criacao", "id"], name="pedido_status_data_id_idx"),
+            models.Index(fields=["usuario", "data_criacao", "id"], name="pedido_usuario_data_id_idx"),
+            # Exportação por período (ver APP/exportacao.py)
+            models.Index(fields=["data_criacao", "id"], name="pedido_data_id_idx"),
+        ]
+
+
+class VendaDiaria(models.Model):
+    # Consolidado de vendas mantido incrementalmente (ver APP/relatorios.py).
+    # Tudo é lançado no dia de criação do pedido.
+    dia = models.DateField()
+    unidades = models.PositiveIntegerField(default=0)
+    valor_bruto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    valor_desconto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unidades_aprovadas = models.PositiveIntegerField(default=0)
+    valor_aprovado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unidades_devolvidas = models.PositiveIntegerField(default=0)
+    valor_devolvido = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unidades_canceladas = models.PositiveIntegerField(default=0)
+    valor_cancelado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class VendaDiariaProduto(VendaDiaria):
+    produto = models.ForeignKey(Produto, on_delete=models.CASCADE, related_name='vendas_diarias')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["dia", "produto"], name="venda_dia_produto_unica")]
+
+
+class VendaDiariaCategoria(VendaDiaria):
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='vendas_diarias')
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["dia", "categoria"], name="venda_dia_categoria_unica")]
+
 
 class CartaoCredito(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cartoes')
@@ -146,6 +246,10 @@ class Devolucao(models.Model):
     motivo = models.TextField()
     data_solicitacao = models.DateField(auto_now_add=True)
 
+    class Meta:
+        # Um item só entra uma vez na devolução do pedido (ver APP/pedidos.py)
+        constraints = [models.UniqueConstraint(fields=["pedido", "item"], name="devolucao_pedido_item_unica")]
+
 class Avaliacao(models.Model):
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE)
     produto = models.ForeignKey(Produto, on_delete=models.CASCADE)
@@ -153,3 +257,32 @@ class Avaliacao(models.Model):
 
     class Meta:
         unique_together = ('pedido', 'produto')
+
+
+class Promocao(models.Model):
+    # Regra de desconto percentual, compilada em APP/promocoes.py. Sem produto
+    # nem categoria vale para qualquer item; sem método, para qualquer pagamento.
+    nome = models.CharField(max_length=100)
+    percentual = models.DecimalField(max_digits=5, decimal_places=2)
+    produto = models.ForeignKey(Produto, on_delete=models.CASCADE, null=True, blank=True, related_name='promocoes')
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, null=True, blank=True, related_name='promocoes')
+    metodo_pagamento = models.CharField(max_length=30, choices=Pedido.MetodosPagamento.choices, blank=True)
+    # Faixa de quantidade: a regra só vale para linhas com pelo menos tantas unidades
+    quantidade_minima = models.PositiveIntegerField(default=1)
+    ativa = models.BooleanField(default=True)
+    inicio = models.DateTimeField(null=True, blank=True)
+    fim = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(percentual__gt=0, percentual__lte=100), name="promocao_percentual_valido"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(produto__isnull=True) | models.Q(categoria__isnull=True),
+                name="promocao_produto_ou_categoria",
+            ),
+        ]
+
+    def __str__(self):
+        return self.nome
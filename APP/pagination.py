@@ -0,0 +1,136 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination, _reverse_ordering
+
+
+def com_desempate(ordenacao):
+    """
+    Acrescenta o id, no sentido do primeiro campo: a ordem fica total, então
+    o deslocamento do cursor entre valores empatados aponta sempre para as
+    mesmas linhas, e o índice (campo, id) entrega a página já ordenada.
+    """
+    ordenacao = tuple(ordenacao)
+    if ordenacao[-1].lstrip("-") in ("id", "pk"):
+        return ordenacao
+    return (*ordenacao, "-id" if ordenacao[0].startswith("-") else "id")
+
+
+# ---- PAGINAÇÃO DO CATÁLOGO ---- #
+# Paginação por cursor (keyset): cada página é buscada com "WHERE id > cursor"
+# em vez de OFFSET, então o custo não cresce com a página e novos produtos
+# inseridos durante a navegação não duplicam nem pulam itens.
+class ProdutoCursorPagination(CursorPagination):
+    ordering = "id"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    # Sem ?ordering=, um filtro de faixa passa a ditar a ordem: assim a página
+    # é lida em sequência no índice do campo filtrado, em vez de percorrer a
+    # tabela pela chave primária descartando as linhas fora da faixa.
+    ordenacao_por_filtro = {
+        "preco_min": "preco",
+        "preco_max": "preco",
+        "avaliacao_min": "-media_avaliacao",
+        "parcelas_min": "parcelas_max_sem_juros",
+    }
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get("ordering"):
+            for parametro, ordenacao in self.ordenacao_por_filtro.items():
+                if request.query_params.get(parametro):
+                    return com_desempate((ordenacao,))
+        return com_desempate(super().get_ordering(request, queryset, view))
+
+    # O paginate_queryset do DRF partido em volta da única leitura do banco,
+    # para que a view assíncrona (APP/views_async.py) leia a página pelo ORM
+    # assíncrono com a mesma lógica de cursor.
+    def paginate_queryset(self, queryset, request, view=None):
+        consulta = self.consulta_da_pagina(queryset, request, view)
+        return None if consulta is None else self.separar_pagina(list(consulta))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        consulta = self.consulta_da_pagina(queryset, request, view)
+        return None if consulta is None else self.separar_pagina([linha async for linha in consulta])
+
+    def consulta_da_pagina(self, queryset, request, view=None):
+        """Ordena, filtra pela posição do cursor e recorta a página (mais um item). Não toca no banco."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self._deslocamento, self._invertido, self._posicao = 0, False, None
+        else:
+            self._deslocamento, self._invertido, self._posicao = self.cursor
+
+        if self._invertido:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self._posicao is not None:
+            ordem = self.ordering[0]
+            campo = ordem.lstrip("-")
+            # Cursor invertido XOR ordenação decrescente
+            operador = "lt" if self.cursor.reverse != ordem.startswith("-") else "gt"
+            queryset = queryset.filter(**{f"{campo}__{operador}": self._posicao})
+
+        # Um item a mais diz se existe página seguinte
+        return queryset[self._deslocamento:self._deslocamento + self.page_size + 1]
+
+    def separar_pagina(self, resultados):
+        """A página e as posições dos links anterior/próximo, como no DRF."""
+        self.page = list(resultados[:self.page_size])
+
+        tem_seguinte = len(resultados) > len(self.page)
+        seguinte = self._get_position_from_instance(resultados[-1], self.ordering) if tem_seguinte else None
+        tem_anterior = self._posicao is not None or self._deslocamento > 0
+
+        if self._invertido:
+            self.page = list(reversed(self.page))
+            self.has_next, self.has_previous = tem_anterior, tem_seguinte
+            if self.has_next:
+                self.next_position = self._posicao
+            if self.has_previous:
+                self.previous_position = seguinte
+        else:
+            self.has_next, self.has_previous = tem_seguinte, tem_anterior
+            if self.has_next:
+                self.next_position = seguinte
+            if self.has_previous:
+                self.previous_position = self._posicao
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+# ---- PAGINAÇÃO DA BUSCA ---- #
+# Resultados ordenados por relevância não têm chave estável para cursor,
+# então a busca pagina por número de página direto no índice FTS.
+class BuscaPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+
+# ---- PAGINAÇÃO DA FILA DE TRABALHO ---- #
+# Keyset sobre o índice (status, data_criacao, id): os pedidos mais antigos primeiro.
+class FilaCursorPagination(CursorPagination):
+    ordering = com_desempate(["data_criacao"])
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+# ---- PAGINAÇÃO DO HISTÓRICO DE PEDIDOS ---- #
+# Keyset sobre o índice (usuario, data_criacao, id): os pedidos mais recentes primeiro.
+class HistoricoCursorPagination(CursorPagination):
+    ordering = com_desempate(["-data_criacao"])
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
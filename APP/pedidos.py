@@ -0,0 +1,315 @@
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Q, Value, When
+from django.db.models.sql import UpdateQuery
+from django.utils import timezone
+
+from . import promocoes, relatorios
+from .carrinho import Carrinho, CarrinhoConcorrente
+from .models import CartaoCredito, Devolucao, ItemCarrinho, Pedido, Produto
+from .status import FILA_POR_CARGO, TRANSICOES, gerar_codigo_rastreio
+
+
+# ---- PIPELINE DE CRIAÇÃO DE PEDIDO ---- #
+# Número fixo de queries, qualquer que seja o tamanho do carrinho:
+#   1. SELECT das linhas dos itens (produto, categoria, preço, quantidade);
+#      total e desconto (APP/promocoes.py, pela tabela compilada em memória)
+#      saem em memória e as mesmas linhas alimentam os consolidados de vendas;
+#   2. INSERT do cartão (se houver);
+#   3. INSERT do pedido, já com o cartão;
+#   4. INSERT ... SELECT de todas as linhas da tabela M2M de itens;
+#   5. UPDATE (executemany) congelando preço unitário e desconto de cada item;
+#   6. dois upserts nos consolidados de vendas (APP/relatorios.py).
+class PedidoVazio(Exception):
+    pass
+
+
+class CarrinhoVazio(Exception):
+    pass
+
+
+class StatusConcorrente(Exception):
+    """O pedido mudou de status entre a leitura e a gravação; nada foi gravado."""
+
+
+class ProdutosIndisponiveis(Exception):
+    """Produtos do carrinho que não existem mais; nada é gravado."""
+
+    def __init__(self, produto_ids):
+        super().__init__(produto_ids)
+        self.produto_ids = produto_ids
+
+
+def vincular_itens(pedido, itens):
+    """Insere as linhas pedido↔item da M2M com um único INSERT ... SELECT."""
+    through = Pedido.itens.through
+    coluna_pedido = through._meta.get_field("pedido").column
+    coluna_item = through._meta.get_field("itemcarrinho").column
+
+    sql, params = itens.order_by().values("id").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {through._meta.db_table} ({coluna_pedido}, {coluna_item}) "
+            f"SELECT %s, itens.id FROM ({sql}) itens",
+            [pedido.id, *params],
+        )
+
+
+def congelar_precos(linhas):
+    """Grava preço unitário e desconto do checkout em cada item (linhas como relatorios.campos_item)."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {ItemCarrinho._meta.db_table} SET preco_unitario = %s, desconto = %s WHERE id = %s",
+            [(preco, desconto, item_id) for item_id, _, _, preco, _, desconto in linhas],
+        )
+
+
+@transaction.atomic
+def criar_pedido(usuario, itens, metodo_pagamento, dados_cartao=None):
+    linhas = list(itens.values_list(*relatorios.CAMPOS_CHECKOUT))
+    if not linhas:
+        raise PedidoVazio()
+    precos = promocoes.precificar(
+        [(produto_id, categoria_id, preco, quantidade) for _, produto_id, categoria_id, preco, quantidade in linhas],
+        metodo_pagamento,
+    )
+    bruto = sum(valor for valor, _, _ in precos)
+    desconto = sum(valor for _, valor, _ in precos)
+    # Cada linha leva o desconto da própria promoção, não um rateio do total
+    linhas = [(*linha, desconto_linha) for linha, (_, desconto_linha, _) in zip(linhas, precos)]
+
+    cartao = None
+    if dados_cartao:
+        cartao = CartaoCredito.objects.create(usuario_id=usuario.id, **dados_cartao)
+
+    pedido = Pedido.objects.create(
+        usuario_id=usuario.id,
+        # valor_total é o que o cliente paga, já sem o desconto
+        valor_total=bruto - desconto,
+        valor_desconto=desconto,
+        metodo_pagamento=metodo_pagamento,
+        cartao=cartao,
+        status="EM_PROCESSAMENTO"
+    )
+    vincular_itens(pedido, itens)
+    congelar_precos(linhas)
+    relatorios.registrar_criacao(pedido, linhas)
+    return pedido
+
+
+@transaction.atomic
+def fechar_carrinho(usuario, metodo_pagamento, dados_cartao=None):
+    """
+    Checkout do carrinho do usuário, lido do banco: só aqui as linhas de
+    ItemCarrinho são gravadas (um bulk_create) e ligadas ao pedido pelo mesmo
+    pipeline. O carrinho é esvaziado na mesma transação, na versão lida.
+    """
+    carrinho = Carrinho.do_banco(usuario.id, travar=True)
+    if not carrinho:
+        raise CarrinhoVazio()
+
+    existentes = set(Produto.objects.filter(id__in=carrinho.itens).values_list("id", flat=True))
+    if len(existentes) < len(carrinho.itens):
+        raise ProdutosIndisponiveis(sorted(set(carrinho.itens) - existentes))
+
+    criados = ItemCarrinho.objects.bulk_create([
+        ItemCarrinho(produto_id=produto_id, quantidade=quantidade) for produto_id, quantidade in carrinho.itens.items()
+    ])
+    pedido = criar_pedido(usuario, ItemCarrinho.objects.filter(id__in=[i.id for i in criados]), metodo_pagamento, dados_cartao)
+
+    # Alterado entre a leitura e aqui (sem trava de linha, como no SQLite): desfaz o pedido
+    if not carrinho.esvaziar():
+        raise CarrinhoConcorrente()
+    transaction.on_commit(carrinho.descartar_copia)
+    return pedido
+
+
+# ---- TRANSIÇÃO DE STATUS ---- #
+# Mudar o status encerra a reserva do pedido na fila de trabalho
+SEM_RESERVA = {"responsavel": None, "reserva": None, "reservado_ate": None}
+
+
+# Colunas que _alterar_status pode mudar no pedido
+CAMPOS_STATUS = [Pedido._meta.get_field(campo).attname for campo in ["status", "codigo_rastreio", *SEM_RESERVA]]
+
+
+@transaction.atomic
+def salvar_status(pedido, status_anterior):
+    """
+    Grava o pedido já alterado (ver _alterar_status) e lança o evento nos
+    consolidados. Como no lote, o UPDATE repete o status de origem: se outra
+    requisição mudou o pedido depois da leitura, nada é gravado nem contado
+    e sobe StatusConcorrente.
+    """
+    alterados = Pedido.objects.filter(pk=pedido.pk, status=status_anterior).update(
+        **{campo: getattr(pedido, campo) for campo in CAMPOS_STATUS}
+    )
+    if alterados != 1:
+        raise StatusConcorrente(pedido.pk)
+    relatorios.registrar_status([pedido.id], pedido.status)
+
+
+def atualizar_devolvendo_ids(queryset, **valores):
+    """queryset.update(**valores) que devolve os ids das linhas de fato alteradas (UPDATE ... RETURNING)."""
+    consulta = queryset.query.chain(UpdateQuery)
+    consulta.add_update_values(valores)
+    sql, params = consulta.get_compiler(connection.alias).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {connection.ops.quote_name(queryset.model._meta.pk.column)}", params)
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+# Pedidos por UPDATE ... CASE na emissão de notas (um código por pedido)
+LOTE_CODIGOS = 500
+
+
+def atualizar_status_em_lote(usuario, cargo, pedidos_ids, novo_status):
+    """
+    Valida todos os pedidos contra a tabela de transições com uma única
+    leitura (travando as linhas) e aplica a mudança nos válidos com um único
+    UPDATE. Devolve um resultado por pedido, na ordem recebida.
+
+    O UPDATE repete a condição de origem: sem trava de linha (SQLite), um
+    pedido que mudou de status depois da leitura fica de fora, e só os ids
+    que o UPDATE devolveu contam como alterados e vão para os consolidados.
+    """
+    origens = TRANSICOES[cargo][novo_status]
+    resultados = {}
+    validos = []
+
+    with transaction.atomic():
+        linhas = (
+            Pedido.objects.select_for_update()
+            .filter(id__in=pedidos_ids)
+            .values_list("id", "status", "usuario_id")
+        )
+        for pedido_id, status_atual, dono_id in linhas:
+            if cargo == "CLIENTE" and dono_id != usuario.id:
+                resultados[pedido_id] = "Você não pode alterar pedido de outro usuário!"
+            elif status_atual not in origens:
+                resultados[pedido_id] = "Transição inválida conforme regras do pedido!"
+            else:
+                validos.append(pedido_id)
+
+        codigos = {}
+        atualizados = []
+        if novo_status == "NOTA_FISCAL_EMITIDA":
+            # Cada pedido precisa do próprio código: um UPDATE ... CASE por lote
+            codigos = {pedido_id: gerar_codigo_rastreio() for pedido_id in validos}
+            for inicio in range(0, len(validos), LOTE_CODIGOS):
+                lote = validos[inicio:inicio + LOTE_CODIGOS]
+                atualizados += atualizar_devolvendo_ids(
+                    Pedido.objects.filter(id__in=lote, status__in=origens),
+                    status=novo_status,
+                    codigo_rastreio=Case(*(When(id=pedido_id, then=Value(codigos[pedido_id])) for pedido_id in lote)),
+                    **SEM_RESERVA,
+                )
+        elif validos:
+            atualizados = atualizar_devolvendo_ids(
+                Pedido.objects.filter(id__in=validos, status__in=origens), status=novo_status, **SEM_RESERVA
+            )
+        relatorios.registrar_status(atualizados, novo_status)
+
+    atualizados = set(atualizados)
+    for pedido_id in set(validos) - atualizados:
+        # Válido na leitura, mas mudou de status antes do UPDATE
+        resultados[pedido_id] = "Transição inválida conforme regras do pedido!"
+
+    saida = []
+    for pedido_id in pedidos_ids:
+        if pedido_id in atualizados:
+            saida.append({"pedido_id": pedido_id, "ok": True, "codigo_rastreio": codigos.get(pedido_id)})
+        else:
+            erro = resultados.get(pedido_id, "Pedido não encontrado")
+            saida.append({"pedido_id": pedido_id, "ok": False, "erro": erro})
+    return saida
+
+
+# ---- DEVOLUÇÃO DE ITENS ---- #
+# Vários itens do mesmo pedido de uma vez: uma leitura de pertencimento,
+# uma de duplicidade e um único bulk_create, qualquer que seja o número de
+# itens. A constraint única (pedido, item) barra a corrida entre duas
+# requisições que passem juntas pela leitura de duplicidade.
+MOTIVO_OBRIGATORIO = "É obrigatório informar o motivo da devolução!"
+ITEM_FORA_DO_PEDIDO = "Esse item não pertence ao pedido informado!"
+ITEM_EM_DEVOLUCAO = "Este item já está em devolução!"
+
+
+def registrar_devolucoes(pedido_id, motivos, tentativas=2):
+    """
+    motivos: {item_id: motivo}. Devolve um resultado por item, na ordem
+    recebida; os itens válidos são gravados mesmo que outros sejam recusados.
+    """
+    erros = {item_id: MOTIVO_OBRIGATORIO for item_id, motivo in motivos.items() if not motivo}
+    pendentes = [item_id for item_id in motivos if item_id not in erros]
+
+    if pendentes:
+        do_pedido = set(
+            Pedido.itens.through.objects.filter(pedido_id=pedido_id, itemcarrinho_id__in=pendentes)
+            .values_list("itemcarrinho_id", flat=True)
+        )
+        em_devolucao = set(
+            Devolucao.objects.filter(pedido_id=pedido_id, item_id__in=pendentes).values_list("item_id", flat=True)
+        )
+        for item_id in pendentes:
+            if item_id not in do_pedido:
+                erros[item_id] = ITEM_FORA_DO_PEDIDO
+            elif item_id in em_devolucao:
+                erros[item_id] = ITEM_EM_DEVOLUCAO
+
+        novos = [Devolucao(pedido_id=pedido_id, item_id=item_id, motivo=motivos[item_id])
+                 for item_id in pendentes if item_id not in erros]
+        try:
+            with transaction.atomic():
+                Devolucao.objects.bulk_create(novos)
+        except IntegrityError:
+            if tentativas <= 1:
+                raise
+            # Outra requisição gravou algum desses itens depois da leitura: relê
+            return registrar_devolucoes(pedido_id, motivos, tentativas - 1)
+
+    return [
+        {"item_id": item_id, "ok": False, "erro": erros[item_id]} if item_id in erros
+        else {"item_id": item_id, "ok": True}
+        for item_id in motivos
+    ]
+
+
+# ---- FILA DE TRABALHO POR CARGO ---- #
+def fila_do_cargo(cargo, agora=None):
+    """Pedidos aguardando o cargo e que não estão reservados por ninguém."""
+    agora = agora or timezone.now()
+    return Pedido.objects.filter(status__in=FILA_POR_CARGO.get(cargo, ())).filter(
+        Q(reservado_ate__isnull=True) | Q(reservado_ate__lt=agora)
+    )
+
+
+def reservar_pedidos(usuario, cargo, quantidade, duracao):
+    """
+    Reserva até `quantidade` pedidos livres da fila por `duracao` segundos.
+
+    O UPDATE repete a condição "livre" (compare-and-set): se dois workers
+    escolherem os mesmos candidatos, só um deles grava a própria reserva e
+    o outro recebe apenas o que sobrou, então os lotes nunca se sobrepõem.
+    """
+    agora = timezone.now()
+    reserva = uuid.uuid4()
+    fila = fila_do_cargo(cargo, agora)
+
+    with transaction.atomic():
+        candidatos = list(
+            fila.select_for_update(skip_locked=True)
+            .order_by("data_criacao", "id")
+            .values_list("id", flat=True)[:quantidade]
+        )
+        fila.filter(id__in=candidatos).update(
+            responsavel_id=usuario.id, reserva=reserva, reservado_ate=agora + timedelta(seconds=duracao)
+        )
+
+    return reserva, Pedido.objects.filter(reserva=reserva).order_by("data_criacao", "id")
+
+
+def liberar_reserva(usuario, reserva):
+    return Pedido.objects.filter(reserva=reserva, responsavel_id=usuario.id).update(**SEM_RESERVA)
@@ -0,0 +1,169 @@
+import time
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Pedido, Promocao
+from .relatorios import CENTAVO
+
+
+# ---- PROMOÇÕES COMPILADAS ---- #
+# As regras ativas viram, uma vez por versão, índices por produto, por
+# categoria e gerais, cada um separado por método de pagamento ("" = qualquer
+# um). Dentro de cada índice as faixas de quantidade ficam em "degraus": para
+# cada quantidade mínima, a melhor regra que vale a partir dela. Precificar
+# uma linha é no máximo seis buscas em dicionário e seis bisect, quantas
+# regras houver; o carrinho inteiro sai em uma passada.
+#
+# Cada linha leva a melhor regra aplicável (sem acumular); no empate, a mais
+# específica (produto, depois categoria, depois geral) e, entre iguais, a
+# mais antiga.
+#
+# A tabela compilada fica na memória do processo, marcada com a versão do
+# cache compartilhado: alterar uma Promocao (signals.py) muda a versão e
+# cada worker recompila na próxima cotação, com uma query. Alterações em
+# massa (update, bulk_create) chamam invalidar_promocoes(). A tabela também
+# vence sozinha quando uma regra começa ou termina (inicio/fim).
+CHAVE_VERSAO_PROMOCOES = "promocoes:versao"
+CAMPOS_REGRA = [
+    "id", "nome", "percentual", "produto_id", "categoria_id", "metodo_pagamento", "quantidade_minima", "inicio", "fim",
+]
+
+ZERO = Decimal("0.00")
+
+Regra = namedtuple("Regra", "id nome percentual quantidade_minima")
+
+# Aceita tanto o valor gravado no pedido quanto o nome da opção ("CARTAO")
+METODOS = {
+    **{metodo.name: metodo.value for metodo in Pedido.MetodosPagamento},
+    **{metodo.value: metodo.value for metodo in Pedido.MetodosPagamento},
+}
+
+
+def _versao():
+    versao = cache.get(CHAVE_VERSAO_PROMOCOES)
+    if versao is None:
+        # Começa pelo relógio, como a versão do catálogo (APP/cache.py)
+        cache.add(CHAVE_VERSAO_PROMOCOES, time.time_ns(), timeout=None)
+        versao = cache.get(CHAVE_VERSAO_PROMOCOES)
+    return versao
+
+
+def invalidar_promocoes():
+    try:
+        cache.incr(CHAVE_VERSAO_PROMOCOES)
+    except ValueError:
+        _versao()
+
+
+class Degraus:
+    """Melhor regra por quantidade mínima, em ordem crescente de quantidade."""
+
+    def __init__(self, regras):
+        self.minimos, self.regras = [], []
+        melhor = None
+        for regra in sorted(regras, key=lambda regra: (regra.quantidade_minima, regra.id)):
+            if melhor is None or (regra.percentual, -regra.id) > (melhor.percentual, -melhor.id):
+                melhor = regra
+            if self.minimos and self.minimos[-1] == regra.quantidade_minima:
+                self.regras[-1] = melhor
+            else:
+                self.minimos.append(regra.quantidade_minima)
+                self.regras.append(melhor)
+
+    def melhor(self, quantidade):
+        posicao = bisect_right(self.minimos, quantidade)
+        return self.regras[posicao - 1] if posicao else None
+
+
+class TabelaPromocoes:
+    def __init__(self, versao, linhas, agora):
+        self.versao = versao
+        # Primeiro início ou fim de regra depois de agora: a tabela vence nele
+        self.valida_ate = None
+
+        grupos = defaultdict(list)
+        for regra_id, nome, percentual, produto_id, categoria_id, metodo, minima, inicio, fim in linhas:
+            if inicio and inicio > agora:
+                self._vencer_em(inicio)
+                continue
+            if fim:
+                self._vencer_em(fim)
+            if produto_id:
+                chave = ("produto", produto_id, metodo)
+            elif categoria_id:
+                chave = ("categoria", categoria_id, metodo)
+            else:
+                chave = ("geral", None, metodo)
+            grupos[chave].append(Regra(regra_id, nome, percentual, minima))
+
+        self.indices = {chave: Degraus(regras) for chave, regras in grupos.items()}
+        self.total_regras = sum(len(regras) for regras in grupos.values())
+
+    def _vencer_em(self, momento):
+        if self.valida_ate is None or momento < self.valida_ate:
+            self.valida_ate = momento
+
+    def vigente(self, versao, agora):
+        return self.versao == versao and (self.valida_ate is None or agora < self.valida_ate)
+
+    def melhor_regra(self, produto_id, categoria_id, quantidade, metodo=""):
+        """Regra de maior percentual que vale para a linha, ou None."""
+        melhor, chave_melhor = None, None
+        metodos = ("", metodo) if metodo else ("",)
+        for nivel, escopo in enumerate((("produto", produto_id), ("categoria", categoria_id), ("geral", None))):
+            for metodo_regra in metodos:
+                degraus = self.indices.get((*escopo, metodo_regra))
+                regra = degraus.melhor(quantidade) if degraus else None
+                if regra is None:
+                    continue
+                chave = (regra.percentual, -nivel, -regra.id)
+                if chave_melhor is None or chave > chave_melhor:
+                    melhor, chave_melhor = regra, chave
+        return melhor
+
+
+def compilar(versao=None, agora=None):
+    """Lê as regras ativas (uma query) e monta a tabela."""
+    agora = agora or timezone.now()
+    linhas = (
+        Promocao.objects.filter(ativa=True)
+        .filter(Q(fim__isnull=True) | Q(fim__gt=agora))
+        .values_list(*CAMPOS_REGRA)
+    )
+    return TabelaPromocoes(_versao() if versao is None else versao, linhas, agora)
+
+
+_tabela = None
+
+
+def tabela_promocoes():
+    """Tabela compilada da versão atual, recompilada só quando ela muda ou vence."""
+    global _tabela
+    versao, agora = _versao(), timezone.now()
+    tabela = _tabela
+    if tabela is None or not tabela.vigente(versao, agora):
+        tabela = _tabela = compilar(versao, agora)
+    return tabela
+
+
+def precificar(linhas, metodo_pagamento=None, tabela=None):
+    """
+    Para cada linha (produto, categoria, preço, quantidade), em ordem:
+    (valor bruto, desconto, Regra aplicada ou None).
+    """
+    tabela = tabela or tabela_promocoes()
+    # Método desconhecido (ou nenhum) só leva as regras sem método
+    metodo = METODOS.get(metodo_pagamento, "")
+    melhor_regra = tabela.melhor_regra
+    precos = []
+    for produto_id, categoria_id, preco, quantidade in linhas:
+        bruto = preco * quantidade
+        regra = melhor_regra(produto_id, categoria_id, quantidade, metodo)
+        desconto = (bruto * regra.percentual / 100).quantize(CENTAVO) if regra else ZERO
+        precos.append((bruto, desconto, regra))
+    return precos
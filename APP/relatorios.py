@@ -0,0 +1,219 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Devolucao, Pedido, VendaDiariaCategoria, VendaDiariaProduto
+from .status import REGRAS_TRANSICAO
+
+
+# ---- CONSOLIDADOS DE VENDAS ---- #
+# VendaDiariaProduto e VendaDiariaCategoria somam, por dia de criação do
+# pedido, unidades e valores de cada evento:
+#   criado     -> unidades, valor_bruto, valor_desconto
+#   aprovado   -> unidades_aprovadas, valor_aprovado   (PAGAMENTO_APROVADO)
+#   devolvido  -> unidades_devolvidas, valor_devolvido (DEVOLVIDO)
+#   cancelado  -> unidades_canceladas, valor_cancelado (CANCELADO)
+#
+# Cada evento vira dois upserts aditivos (INSERT ... ON CONFLICT DO UPDATE
+# SET x = x + excluded.x), na mesma transação da mudança do pedido. O
+# relatório só lê essas tabelas, qualquer que seja o tamanho do histórico.
+#
+# Preço unitário e desconto de cada linha são os congelados no item no
+# checkout, nunca o preço atual do produto: eventos posteriores e a
+# reconstrução reproduzem os valores da criação. Os valores aprovado,
+# devolvido e cancelado são líquidos do desconto. A devolução conta os itens
+# registrados em Devolucao (ou o pedido inteiro, se não houver).
+METRICAS = [
+    "unidades", "valor_bruto", "valor_desconto", "unidades_aprovadas", "valor_aprovado",
+    "unidades_devolvidas", "valor_devolvido", "unidades_canceladas", "valor_cancelado",
+]
+EVENTO_POR_STATUS = {"PAGAMENTO_APROVADO": "aprovado", "DEVOLVIDO": "devolvido", "CANCELADO": "cancelado"}
+CENTAVO = Decimal("0.01")
+
+# Linha do checkout, com o preço atual: (id do item, produto, categoria, preço, quantidade)
+CAMPOS_CHECKOUT = ["id", "produto_id", "produto__categoria_id", "produto__preco", "quantidade"]
+
+
+def campos_item(prefixo=""):
+    """
+    Linha dos consolidados: (id do item, produto, categoria, preço congelado,
+    quantidade, desconto). Itens ligados a pedidos fora do pipeline (fixtures,
+    cargas em massa) não têm preço congelado: caem no preço atual.
+    """
+    return [
+        f"{prefixo}id", f"{prefixo}produto_id", f"{prefixo}produto__categoria_id",
+        Coalesce(f"{prefixo}preco_unitario", f"{prefixo}produto__preco"), f"{prefixo}quantidade", f"{prefixo}desconto",
+    ]
+
+
+def _posteriores(status):
+    alcancaveis, pendentes = set(), [status]
+    while pendentes:
+        for destino in REGRAS_TRANSICAO.get(pendentes.pop(), ()):
+            if destino not in alcancaveis:
+                alcancaveis.add(destino)
+                pendentes.append(destino)
+    return alcancaveis
+
+
+# Status que só se alcança passando por PAGAMENTO_APROVADO (usado na reconstrução)
+STATUS_APROVADOS = frozenset({"PAGAMENTO_APROVADO"} | _posteriores("PAGAMENTO_APROVADO"))
+
+
+def _acumular(deltas, dia, linhas, eventos, devolvidos=None):
+    for item_id, produto_id, categoria_id, preco, quantidade, desconto in linhas:
+        bruto = preco * quantidade
+        liquido = bruto - desconto
+        for chave in (("produto", dia, produto_id), ("categoria", dia, categoria_id)):
+            valores = deltas[chave]
+            if "criado" in eventos:
+                valores[0] += quantidade
+                valores[1] += bruto
+                valores[2] += desconto
+            if "aprovado" in eventos:
+                valores[3] += quantidade
+                valores[4] += liquido
+            if "devolvido" in eventos and (not devolvidos or item_id in devolvidos):
+                valores[5] += quantidade
+                valores[6] += liquido
+            if "cancelado" in eventos:
+                valores[7] += quantidade
+                valores[8] += liquido
+
+
+def _upsert(modelo, coluna, linhas):
+    if not linhas:
+        return
+    colunas = ["dia", coluna, *METRICAS]
+    marcadores = ", ".join(["%s"] * len(colunas))
+    somas = ", ".join(f"{metrica} = {metrica} + excluded.{metrica}" for metrica in METRICAS)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {modelo._meta.db_table} ({', '.join(colunas)}) VALUES ({marcadores}) "
+            f"ON CONFLICT (dia, {coluna}) DO UPDATE SET {somas}",
+            linhas,
+        )
+
+
+def _gravar(deltas):
+    por_tabela = {"produto": [], "categoria": []}
+    for (tabela, dia, chave_id), valores in sorted(deltas.items()):
+        por_tabela[tabela].append([dia, chave_id, *valores])
+    _upsert(VendaDiariaProduto, "produto_id", por_tabela["produto"])
+    _upsert(VendaDiariaCategoria, "categoria_id", por_tabela["categoria"])
+
+
+def _novos_deltas():
+    return defaultdict(lambda: [0, Decimal(0), Decimal(0), 0, Decimal(0), 0, Decimal(0), 0, Decimal(0)])
+
+
+def _registrar(eventos_por_pedido):
+    """Lança os eventos dos pedidos informados: duas queries de leitura e dois upserts."""
+    through = Pedido.itens.through
+    pedidos, linhas = {}, defaultdict(list)
+    consulta = through.objects.filter(pedido_id__in=list(eventos_por_pedido)).order_by("id").values_list(
+        "pedido_id", "pedido__data_criacao", *campos_item("itemcarrinho__"),
+    )
+    for pedido_id, data_criacao, *linha in consulta:
+        pedidos[pedido_id] = data_criacao
+        linhas[pedido_id].append(linha)
+
+    devolvidos = defaultdict(set)
+    com_devolucao = [pedido_id for pedido_id, eventos in eventos_por_pedido.items() if "devolvido" in eventos]
+    if com_devolucao:
+        for pedido_id, item_id in Devolucao.objects.filter(pedido_id__in=com_devolucao).values_list("pedido_id", "item_id"):
+            devolvidos[pedido_id].add(item_id)
+
+    deltas = _novos_deltas()
+    for pedido_id, data_criacao in pedidos.items():
+        dia = timezone.localdate(data_criacao)
+        _acumular(deltas, dia, linhas[pedido_id], eventos_por_pedido[pedido_id], devolvidos.get(pedido_id))
+    _gravar(deltas)
+
+
+def registrar_criacao(pedido, linhas):
+    """Pedido recém-criado, com as linhas (como campos_item) já montadas pelo pipeline: só os upserts."""
+    deltas = _novos_deltas()
+    _acumular(deltas, timezone.localdate(pedido.data_criacao), linhas, {"criado"})
+    _gravar(deltas)
+
+
+def registrar_status(pedido_ids, novo_status):
+    """Chamado depois de mover pedidos para novo_status, na mesma transação."""
+    evento = EVENTO_POR_STATUS.get(novo_status)
+    if evento and pedido_ids:
+        _registrar({pedido_id: {evento} for pedido_id in pedido_ids})
+
+
+def eventos_do_status(status):
+    eventos = {"criado"}
+    if status in STATUS_APROVADOS:
+        eventos.add("aprovado")
+    if status in EVENTO_POR_STATUS and status != "PAGAMENTO_APROVADO":
+        eventos.add(EVENTO_POR_STATUS[status])
+    return eventos
+
+
+@transaction.atomic
+def reconstruir_vendas(bloco=2000):
+    """Apaga e recalcula os consolidados a partir do status atual de cada pedido."""
+    VendaDiariaProduto.objects.all().delete()
+    VendaDiariaCategoria.objects.all().delete()
+
+    total = 0
+    pedidos = Pedido.objects.order_by("id").values_list("id", "status")
+    ultimo = 0
+    while lote := list(pedidos.filter(id__gt=ultimo)[:bloco]):
+        _registrar({pedido_id: eventos_do_status(status) for pedido_id, status in lote})
+        total += len(lote)
+        ultimo = lote[-1][0]
+    return total
+
+
+# ---- RELATÓRIO ---- #
+AGRUPAMENTOS = {
+    "dia": (VendaDiariaCategoria, ["dia"], {}, "dia"),
+    "categoria": (VendaDiariaCategoria, ["categoria_id"], {"nome": F("categoria__nome")}, "-soma_valor_aprovado"),
+    "produto": (VendaDiariaProduto, ["produto_id"], {"nome": F("produto__nome")}, "-soma_valor_aprovado"),
+}
+# As somas não podem ter o nome dos campos do modelo
+SOMAS = {f"soma_{metrica}": Sum(metrica) for metrica in METRICAS}
+
+
+def _formatar(linha):
+    for metrica in METRICAS:
+        valor = linha.pop(f"soma_{metrica}")
+        if metrica.startswith("valor_"):
+            linha[metrica] = str(valor or Decimal("0.00"))
+        else:
+            linha[metrica] = valor or 0
+    linha["receita_liquida"] = str(Decimal(linha["valor_aprovado"]) - Decimal(linha["valor_devolvido"]))
+    return linha
+
+
+def relatorio_vendas(inicio, fim, agrupar="dia", categoria=None, limite=50):
+    """Soma os consolidados no período [inicio, fim]: uma query para as linhas, outra para os totais."""
+    modelo, campos, expressoes, ordem = AGRUPAMENTOS[agrupar]
+    # Os totais são os mesmos nas duas tabelas: vêm sempre da menor
+    por_categoria = VendaDiariaCategoria.objects.filter(dia__gte=inicio, dia__lte=fim)
+    consolidado = modelo.objects.filter(dia__gte=inicio, dia__lte=fim)
+    if categoria:
+        por_categoria = por_categoria.filter(categoria_id=categoria)
+        filtro = "categoria_id" if modelo is VendaDiariaCategoria else "produto__categoria_id"
+        consolidado = consolidado.filter(**{filtro: categoria})
+
+    linhas = consolidado.values(*campos, **expressoes).annotate(**SOMAS).order_by(ordem)
+    if agrupar == "produto":
+        linhas = linhas[:limite]
+
+    return {
+        "inicio": inicio.isoformat(),
+        "fim": fim.isoformat(),
+        "agrupar": agrupar,
+        "totais": _formatar(por_categoria.aggregate(**SOMAS)),
+        "resultados": [_formatar(linha) for linha in linhas],
+    }
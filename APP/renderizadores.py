@@ -0,0 +1,65 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+# ---- JSON RÁPIDO ---- #
+# Renderer e parser do DRF com orjson quando ele está instalado; sem ele,
+# caem no json da biblioteca padrão (o comportamento do DRF). A saída é a
+# mesma nos dois caminhos: compacta, UTF-8, com \u2028/\u2029 escapados.
+#
+# Tipos fora do JSON passam pelo encoder do DRF, então a resposta não muda:
+# DecimalField de serializer já chega como string, e Decimal montado à mão
+# na view (valor_total do pedido, totais do carrinho) continua saindo número.
+_padrao = encoders.JSONEncoder().default
+# Datas passam pelo encoder do DRF ("Z" no lugar de +00:00); chaves não-string
+# viram string, como no json.dumps
+OPCOES_ORJSON = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+
+def _escapar_separadores(conteudo):
+    return conteudo.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+def dumps(dados):
+    """JSON compacto em bytes, pelo caminho mais rápido disponível."""
+    if orjson is None:
+        return JSONRendererRapido().render(dados)
+    return _escapar_separadores(orjson.dumps(dados, default=_padrao, option=OPCOES_ORJSON))
+
+
+def loads(conteudo):
+    """Erros de sintaxe saem como ValueError nos dois caminhos."""
+    return orjson.loads(conteudo) if orjson else json.loads(conteudo)
+
+
+class JSONRendererRapido(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Indentação (API navegável, "application/json; indent=4") fica com o json padrão
+        if orjson is None or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return _escapar_separadores(orjson.dumps(data, default=_padrao, option=OPCOES_ORJSON))
+
+
+class JSONParserRapido(JSONParser):
+    renderer_class = JSONRendererRapido
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # orjson recusa NaN/Infinity, como o parser estrito do DRF
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
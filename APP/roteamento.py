@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+# ---- ROTEAMENTO LEITURA/ESCRITA ---- #
+# Views marcadas com LeituraReplicaMixin (catálogo, detalhe, busca, relatórios)
+# leem do alias DATABASE_READ_ALIAS. Todo o resto, incluindo o fluxo de
+# pedidos, continua no banco principal ("default").
+#
+# Se a requisição escrever algo, as leituras seguintes dela ficam presas ao
+# principal, para nunca ler da réplica um dado que ela ainda não recebeu.
+_usar_replica = ContextVar("usar_replica", default=False)
+_escreveu = ContextVar("escreveu", default=False)
+
+
+@contextmanager
+def leitura_na_replica():
+    token_replica = _usar_replica.set(True)
+    token_escrita = _escreveu.set(False)
+    try:
+        yield
+    finally:
+        _usar_replica.reset(token_replica)
+        _escreveu.reset(token_escrita)
+
+
+class LeituraReplicaMixin:
+    def dispatch(self, request, *args, **kwargs):
+        with leitura_na_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+
+class RoteadorLeituraEscrita:
+    def db_for_read(self, model, **hints):
+        alias = settings.DATABASE_READ_ALIAS
+        if alias and _usar_replica.get() and not _escreveu.get():
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        _escreveu.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # A réplica é uma cópia do principal: os objetos são os mesmos
+        return True
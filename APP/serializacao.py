@@ -0,0 +1,172 @@
+from collections import defaultdict
+
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+from .models import ProdutoImagem, Pedido
+
+
+# ---- SERIALIZAÇÃO POR VALUES() ---- #
+# Caminho só-leitura das listagens e exportações: cada linha vem de
+# .values() e cada lista aninhada (imagens, itens...) de uma única query
+# por página ou bloco, agrupada pelo pai em memória. Nada de instâncias de
+# modelo nem da maquinaria de fields do DRF por objeto.
+#
+# LEITOR_PRODUTO e LEITOR_PEDIDO produzem exatamente a saída de
+# ProdutoSerializer e PedidoSerializer (os testes comparam byte a byte);
+# ?fields= escolhe as chaves de primeiro nível com Leitor.selecionar.
+class CampoDesconhecido(ValueError):
+    pass
+
+
+def decimal_texto(valor):
+    # Os valores já vêm do banco com as casas do DecimalField: o mesmo que o
+    # DecimalField do DRF com COERCE_DECIMAL_TO_STRING
+    return None if valor is None else f"{valor:f}"
+
+
+def centavos_texto(valor):
+    # Expressões (Coalesce) não voltam do SQLite com as casas do campo: fixa as duas
+    return None if valor is None else f"{valor:.2f}"
+
+
+# Fuso e formato ISO 8601 do DRF ("Z" para UTC)
+data_hora = serializers.DateTimeField().to_representation
+
+
+class Campo:
+    def __init__(self, origem, formatar=None):
+        self.origem = origem
+        self.formatar = formatar
+
+
+class Filhos:
+    """Lista aninhada: uma query para todos os pais, agrupada por `chave`."""
+
+    def __init__(self, modelo, chave, campos, ordem=("id",), plano=False):
+        self.modelo = modelo
+        self.chave = chave
+        self.campos = campos
+        self.ordem = ordem
+        # plano: lista dos valores do único campo, sem dicionário
+        self.plano = plano
+
+    def consulta(self, pai_ids):
+        return (
+            self.modelo.objects.filter(**{f"{self.chave}__in": pai_ids})
+            .order_by(*self.ordem)
+            .values_list(self.chave, *(campo.origem for campo in self.campos.values()))
+        )
+
+    def agrupar(self, pai_ids):
+        return self._agrupar(self.consulta(pai_ids))
+
+    async def aagrupar(self, pai_ids):
+        return self._agrupar([linha async for linha in self.consulta(pai_ids)])
+
+    def _agrupar(self, linhas):
+        nomes = list(self.campos)
+        formatos = [(indice, campo.formatar) for indice, campo in enumerate(self.campos.values()) if campo.formatar]
+
+        grupos = defaultdict(list)
+        for pai, *valores in linhas:
+            for indice, formatar in formatos:
+                valores[indice] = formatar(valores[indice])
+            grupos[pai].append(valores[0] if self.plano else dict(zip(nomes, valores)))
+        return grupos
+
+
+class Leitor:
+    """
+    `campos` na ordem da saída: {nome: Campo ou Filhos}. As colunas de todos
+    os campos (e a `chave`) são sempre lidas, mesmo fora da seleção: a
+    ordenação e o cursor da paginação podem depender delas.
+    """
+
+    def __init__(self, campos, chave="id", origens=None):
+        self.campos = campos
+        self.chave = chave
+        self.origens = origens or list(dict.fromkeys(
+            [chave, *(campo.origem for campo in campos.values() if isinstance(campo, Campo))]
+        ))
+
+    def selecionar(self, nomes):
+        """Leitor só com os campos de "a,b,c" (ou todos, se vazio)."""
+        if not nomes:
+            return self
+        pedidos = {nome.strip() for nome in nomes.split(",") if nome.strip()}
+        desconhecidos = pedidos - set(self.campos)
+        if desconhecidos:
+            raise CampoDesconhecido(f"Campos inválidos: {', '.join(sorted(desconhecidos))}")
+        return Leitor({nome: campo for nome, campo in self.campos.items() if nome in pedidos}, self.chave, self.origens)
+
+    def linhas(self, queryset):
+        """O queryset como dicionários: filtros, ordenação e cursor continuam valendo."""
+        return queryset.values(*self.origens)
+
+    def serializar(self, linhas):
+        linhas = list(linhas)
+        ids = [linha[self.chave] for linha in linhas]
+        grupos = {nome: campo.agrupar(ids) for nome, campo in self._filhos(ids)}
+        return self._montar(linhas, grupos)
+
+    async def aserializar(self, linhas):
+        """serializar() com as listas aninhadas lidas pelo ORM assíncrono."""
+        linhas = list(linhas)
+        ids = [linha[self.chave] for linha in linhas]
+        grupos = {nome: await campo.aagrupar(ids) for nome, campo in self._filhos(ids)}
+        return self._montar(linhas, grupos)
+
+    def _filhos(self, ids):
+        return [(nome, campo) for nome, campo in self.campos.items() if isinstance(campo, Filhos) and ids]
+
+    def _montar(self, linhas, grupos):
+        saida = []
+        for linha in linhas:
+            registro = {}
+            for nome, campo in self.campos.items():
+                if isinstance(campo, Filhos):
+                    registro[nome] = grupos[nome].get(linha[self.chave], [])
+                elif campo.formatar:
+                    registro[nome] = campo.formatar(linha[campo.origem])
+                else:
+                    registro[nome] = linha[campo.origem]
+            saida.append(registro)
+        return saida
+
+
+# Espelha ProdutoSerializer
+LEITOR_PRODUTO = Leitor({
+    "id": Campo("id"),
+    "nome": Campo("nome"),
+    "descricao": Campo("descricao"),
+    "preco": Campo("preco", decimal_texto),
+    "parcelas_max_sem_juros": Campo("parcelas_max_sem_juros"),
+    "media_avaliacao": Campo("media_avaliacao"),
+    "total_avaliacoes": Campo("total_avaliacoes"),
+    "categoria": Campo("categoria__nome"),
+    "imagens": Filhos(
+        ProdutoImagem, "produto_id", {"imagem": Campo("imagem"), "ordem": Campo("ordem")}, ordem=("ordem", "id")
+    ),
+})
+
+# Espelha PedidoSerializer (itens como ItemPedidoSerializer)
+LEITOR_PEDIDO = Leitor({
+    "id": Campo("id"),
+    "status": Campo("status"),
+    "valor_total": Campo("valor_total", decimal_texto),
+    "valor_desconto": Campo("valor_desconto", decimal_texto),
+    "metodo_pagamento": Campo("metodo_pagamento"),
+    "codigo_rastreio": Campo("codigo_rastreio"),
+    "data_criacao": Campo("data_criacao", data_hora),
+    "itens": Filhos(Pedido.itens.through, "pedido_id", {
+        "id": Campo("itemcarrinho_id"),
+        "produto": Campo("itemcarrinho__produto_id"),
+        "produto_nome": Campo("itemcarrinho__produto__nome"),
+        # Preço congelado no checkout; itens sem ele (fora do pipeline) caem no atual
+        "preco_unitario": Campo(
+            Coalesce("itemcarrinho__preco_unitario", "itemcarrinho__produto__preco"), centavos_texto
+        ),
+        "quantidade": Campo("itemcarrinho__quantidade"),
+    }, ordem=("itemcarrinho_id",)),
+})
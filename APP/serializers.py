@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Produto, Categoria, ProdutoImagem
+from .models import Produto, Categoria, ProdutoImagem, Pedido, ItemCarrinho
 from django.contrib.auth import get_user_model
 
 class ProdutoImagemSerializer(serializers.ModelSerializer):
@@ -21,6 +21,45 @@ class ProdutoSerializer(serializers.ModelSerializer):
 
 
 
+# Formata o preço do item como o DecimalField do modelo
+FORMATO_PRECO = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class ItemPedidoSerializer(serializers.ModelSerializer):
+    produto_nome = serializers.CharField(source='produto.nome')
+    # Preço congelado no checkout; itens sem ele (fora do pipeline) caem no atual
+    preco_unitario = serializers.SerializerMethodField()
+
+    def get_preco_unitario(self, item):
+        preco = item.produto.preco if item.preco_unitario is None else item.preco_unitario
+        return FORMATO_PRECO.to_representation(preco)
+
+    class Meta:
+        model = ItemCarrinho
+        fields = ['id', 'produto', 'produto_nome', 'preco_unitario', 'quantidade']
+
+
+class PedidoSerializer(serializers.ModelSerializer):
+    itens = ItemPedidoSerializer(many=True)
+
+    class Meta:
+        model = Pedido
+        fields = [
+            'id', 'status', 'valor_total', 'valor_desconto', 'metodo_pagamento',
+            'codigo_rastreio', 'data_criacao', 'itens'
+        ]
+
+
+class PedidoFilaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Pedido
+        fields = [
+            'id', 'usuario', 'status', 'valor_total', 'metodo_pagamento',
+            'codigo_rastreio', 'data_criacao', 'responsavel', 'reserva', 'reservado_ate'
+        ]
+
+
+
 User = get_user_model()
 
 class UsuarioSerializer(serializers.ModelSerializer):
@@ -32,8 +71,5 @@ class UsuarioSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        # create_user já faz o hash da senha e grava uma única vez
+        return User.objects.create_user(**validated_data)
@@ -0,0 +1,109 @@
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from . import busca
+from .autenticacao import incrementar_versao, usuario_alterado, usuario_criado
+from .cache import invalidar_catalogo
+from .detalhe import agendar_reconstrucao
+from .metricas import instalar_medicao
+from .models import Categoria, Peca, Produto, ProdutoImagem, Promocao, Usuario
+from .promocoes import invalidar_promocoes
+
+
+# ---- INVALIDAÇÃO DO CACHE DO CATÁLOGO ---- #
+# Depois do commit: antes dele, outro worker recalcularia a página ainda sem
+# a mudança e a guardaria na versão nova
+def _catalogo_alterado(sender, **kwargs):
+    transaction.on_commit(invalidar_catalogo)
+
+
+for _modelo in (Produto, ProdutoImagem, Categoria):
+    post_save.connect(_catalogo_alterado, sender=_modelo, dispatch_uid=f"catalogo_{_modelo.__name__}_save")
+    post_delete.connect(_catalogo_alterado, sender=_modelo, dispatch_uid=f"catalogo_{_modelo.__name__}_delete")
+
+
+# ---- ÍNDICE DE BUSCA ---- #
+def _produto_salvo(sender, instance, **kwargs):
+    busca.indexar_produtos([instance.pk])
+
+
+def _produto_removido(sender, instance, **kwargs):
+    busca.remover_produtos([instance.pk])
+
+
+def _categoria_salva(sender, instance, created, **kwargs):
+    if not created:
+        busca.indexar_categoria(instance.pk)
+
+
+def _peca_alterada(sender, instance, **kwargs):
+    busca.indexar_produtos([instance.produto_id])
+
+
+post_save.connect(_produto_salvo, sender=Produto, dispatch_uid="busca_produto_save")
+post_delete.connect(_produto_removido, sender=Produto, dispatch_uid="busca_produto_delete")
+post_save.connect(_categoria_salva, sender=Categoria, dispatch_uid="busca_categoria_save")
+post_save.connect(_peca_alterada, sender=Peca, dispatch_uid="busca_peca_save")
+post_delete.connect(_peca_alterada, sender=Peca, dispatch_uid="busca_peca_delete")
+
+
+# ---- DETALHE DO PRODUTO ---- #
+def _detalhe_do_produto(sender, instance, **kwargs):
+    agendar_reconstrucao([instance.pk])
+
+
+def _detalhe_das_pecas_e_imagens(sender, instance, **kwargs):
+    agendar_reconstrucao([instance.produto_id])
+
+
+def _detalhe_da_categoria(sender, instance, created, **kwargs):
+    if not created:
+        agendar_reconstrucao(instance.produtos.values_list("id", flat=True))
+
+
+post_save.connect(_detalhe_do_produto, sender=Produto, dispatch_uid="detalhe_produto_save")
+post_delete.connect(_detalhe_do_produto, sender=Produto, dispatch_uid="detalhe_produto_delete")
+for _modelo in (ProdutoImagem, Peca):
+    post_save.connect(_detalhe_das_pecas_e_imagens, sender=_modelo, dispatch_uid=f"detalhe_{_modelo.__name__}_save")
+    post_delete.connect(_detalhe_das_pecas_e_imagens, sender=_modelo, dispatch_uid=f"detalhe_{_modelo.__name__}_delete")
+post_save.connect(_detalhe_da_categoria, sender=Categoria, dispatch_uid="detalhe_categoria_save")
+
+
+# ---- PROMOÇÕES ---- #
+# Depois do commit: antes dele, outro worker recompilaria a tabela ainda sem a mudança
+def _promocao_alterada(sender, **kwargs):
+    transaction.on_commit(invalidar_promocoes)
+
+
+post_save.connect(_promocao_alterada, sender=Promocao, dispatch_uid="promocao_save")
+post_delete.connect(_promocao_alterada, sender=Promocao, dispatch_uid="promocao_delete")
+
+
+# ---- CLAIMS DO TOKEN ---- #
+def _usuario_salvando(sender, instance, update_fields=None, **kwargs):
+    if not instance._state.adding and update_fields is None:
+        incrementar_versao(instance)
+
+
+def _usuario_salvo(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        usuario_criado(instance)
+    elif update_fields is None:
+        usuario_alterado(instance, incrementada=True)
+    # O login do admin só grava last_login: os tokens continuam valendo
+    elif set(update_fields) - {"last_login"}:
+        usuario_alterado(instance)
+
+
+def _usuario_removido(sender, instance, **kwargs):
+    usuario_alterado(instance)
+
+
+pre_save.connect(_usuario_salvando, sender=Usuario, dispatch_uid="claims_usuario_pre_save")
+post_save.connect(_usuario_salvo, sender=Usuario, dispatch_uid="claims_usuario_save")
+post_delete.connect(_usuario_removido, sender=Usuario, dispatch_uid="claims_usuario_delete")
+
+
+# ---- MÉTRICAS ---- #
+connection_created.connect(instalar_medicao, dispatch_uid="metricas_queries")
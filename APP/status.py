@@ -0,0 +1,70 @@
+import uuid
+
+from .models import Pedido
+
+
+# ---- PERMISSÕES POR CARGO ---- #
+PERMISSOES_STATUS = {
+    "FINANCEIRO": ["PAGAMENTO_APROVADO", "PAGAMENTO_REPROVADO", "NOTA_FISCAL_EMITIDA", "CANCELADO"],
+    "LOGISTICA": ["EM_PREPARACAO", "ENVIADO"],
+    "CLIENTE": ["RECEBIDO", "SOLICITACAO_DEVOLUCAO"],
+    "POS_VENDA": ["EM_DEVOLUCAO", "DEVOLVIDO", "DEVOLUCAO_CANCELADA"],
+    "ADMIN": [status for status, _ in Pedido.StatusPedido.choices]
+}
+
+
+# ---- REGRAS DA CADEIA DO PEDIDO (ordem obrigatória) ---- #
+# Cancelamento só antes da aprovação do pagamento: um pedido aprovado não
+# volta atrás (a reconstrução dos consolidados conta como aprovado todo
+# status alcançável a partir de PAGAMENTO_APROVADO).
+REGRAS_TRANSICAO = {
+    "EM_PROCESSAMENTO": frozenset(["PAGAMENTO_APROVADO", "PAGAMENTO_REPROVADO", "CANCELADO"]),
+    "PAGAMENTO_REPROVADO": frozenset(["CANCELADO"]),
+    "PAGAMENTO_APROVADO": frozenset(["NOTA_FISCAL_EMITIDA"]),
+    "NOTA_FISCAL_EMITIDA": frozenset(["EM_PREPARACAO"]),
+    "EM_PREPARACAO": frozenset(["ENVIADO"]),
+    "ENVIADO": frozenset(["RECEBIDO"]),
+    "RECEBIDO": frozenset(["SOLICITACAO_DEVOLUCAO"]),
+    "SOLICITACAO_DEVOLUCAO": frozenset(["EM_DEVOLUCAO"]),
+    "EM_DEVOLUCAO": frozenset(["DEVOLVIDO", "DEVOLUCAO_CANCELADA"]),
+}
+
+
+# ---- TABELA PRÉ-COMPILADA ---- #
+# TRANSICOES[cargo][novo_status] = status de origem a partir dos quais o cargo
+# pode mover um pedido para novo_status. Montada uma vez na importação: validar
+# uma transição vira uma busca em dicionário + pertinência em frozenset.
+def _compilar_transicoes():
+    origens_por_destino = {}
+    for origem, destinos in REGRAS_TRANSICAO.items():
+        for destino in destinos:
+            origens_por_destino.setdefault(destino, set()).add(origem)
+
+    return {
+        cargo: {
+            destino: frozenset(origens_por_destino.get(destino, ()))
+            for destino in permitidos
+        }
+        for cargo, permitidos in PERMISSOES_STATUS.items()
+    }
+
+
+TRANSICOES = _compilar_transicoes()
+
+# Status em que um pedido fica aguardando ação de cada cargo
+FILA_POR_CARGO = {
+    cargo: frozenset().union(*destinos.values())
+    for cargo, destinos in TRANSICOES.items()
+}
+
+
+def pode_alterar(cargo, novo_status):
+    return novo_status in TRANSICOES.get(cargo, {})
+
+
+def transicao_valida(cargo, status_atual, novo_status):
+    return status_atual in TRANSICOES.get(cargo, {}).get(novo_status, ())
+
+
+def gerar_codigo_rastreio():
+    return f"BR-{uuid.uuid4().hex[:10].upper()}"
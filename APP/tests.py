@@ -1,3 +1,1925 @@
-from django.test import TestCase
+import io
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import F, Prefetch
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import urls as rotas_api
+from .admin import PaginadorEstimado
+from .autenticacao import TokenUsuarioSerializer
+from .benchmark import CENARIOS, Contexto, executar_cenario, violacoes
+from .busca import ResultadoBusca
+from .carrinho import Carrinho
+from .cache import invalidar_catalogo, obter_ou_calcular
+from .compressao import escolher_codificacao
+from .dados_sinteticos import gerar_dados
+from .exportacao import linhas_pedidos
+from .metricas import registro
+from .pedidos import StatusConcorrente, atualizar_status_em_lote, criar_pedido as criar_pedido_do_pipeline, salvar_status
+from .promocoes import compilar, invalidar_promocoes, precificar, tabela_promocoes
+from .relatorios import METRICAS, reconstruir_vendas
+from .renderizadores import JSONParserRapido, JSONRendererRapido
+from .serializacao import LEITOR_PEDIDO, LEITOR_PRODUTO
+from .serializers import PedidoSerializer, ProdutoSerializer
+from .roteamento import RoteadorLeituraEscrita, leitura_na_replica
+from .views import _alterar_status
+from .models import (
+    Avaliacao, CartaoCredito, Categoria, Devolucao, ItemCarrinho, Peca, Pedido, Produto, ProdutoDetalhe, ProdutoImagem,
+    Promocao, Usuario,
+    VendaDiariaCategoria, VendaDiariaProduto,
+)
+
+
+def criar_catalogo(quantidade, imagens_por_produto=2):
+    categoria = Categoria.objects.create(nome="Mangueiras")
+    produtos = Produto.objects.bulk_create([
+        Produto(
+            nome=f"Produto {i}",
+            descricao=f"Descrição {i}",
+            preco="10.00",
+            categoria=categoria,
+        )
+        for i in range(quantidade)
+    ])
+    ProdutoImagem.objects.bulk_create([
+        ProdutoImagem(produto=produto, imagem=f"https://img.exemplo/{produto.id}/{ordem}.jpg", ordem=ordem)
+        for produto in produtos
+        for ordem in reversed(range(imagens_por_produto))
+    ])
+    return categoria, produtos
+
+
+def criar_usuario(email="cliente@exemplo.com", cpf="00000000000", cargo="CLIENTE"):
+    return Usuario.objects.create_user(
+        email=email, password="senha-forte-123", nome="Cliente", endereco="Rua A", cpf=cpf, cargo=cargo
+    )
+
+
+def criar_pedido(usuario, status="RECEBIDO"):
+    return Pedido.objects.create(
+        usuario=usuario, valor_total="10.00", metodo_pagamento="PIX", status=status
+    )
+
+
+# ---- LISTA PRODUTOS ---- #
+class ListaProdutosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("lista_produtos")
+
+    def test_queries_constantes_por_pagina(self):
+        criar_catalogo(3)
+        with self.assertNumQueries(2):
+            pequeno = self.client.get(self.url)
+
+        criar_catalogo(60)
+        with self.assertNumQueries(2):
+            grande = self.client.get(self.url, {"page_size": 50})
+
+        self.assertEqual(len(pequeno.data["results"]), 3)
+        self.assertEqual(len(grande.data["results"]), 50)
+
+    def test_imagens_ordenadas_e_categoria(self):
+        criar_catalogo(1, imagens_por_produto=3)
+        produto = self.client.get(self.url).data["results"][0]
+
+        self.assertEqual(produto["categoria"], "Mangueiras")
+        self.assertEqual([img["ordem"] for img in produto["imagens"]], [0, 1, 2])
+
+    def test_cursor_estavel_com_insercoes(self):
+        _, produtos = criar_catalogo(5)
+        primeira = self.client.get(self.url, {"page_size": 2}).data
+
+        # Novos produtos entram no fim do keyset e não deslocam a próxima página
+        criar_catalogo(3)
+        segunda = self.client.get(primeira["next"]).data
+
+        self.assertEqual(
+            [p["id"] for p in primeira["results"] + segunda["results"]],
+            [p.id for p in produtos[:4]],
+        )
+
+
+# ---- CACHE DO CATÁLOGO ---- #
+class CacheCatalogoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("lista_produtos")
+        criar_catalogo(2)
+
+    def test_etag_retorna_304_sem_queries(self):
+        primeira = self.client.get(self.url)
+        etag = primeira["ETag"]
+
+        with self.assertNumQueries(0):
+            segunda = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(segunda["ETag"], etag)
+
+    def test_pagina_em_cache_ate_alteracao(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        produto = Produto.objects.first()
+        produto.nome = "Renomeado"
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            produto.save()
+            # Antes do commit a versão não muda: a página antiga continua valendo
+            with self.assertNumQueries(0):
+                self.client.get(self.url)
+        self.assertIn(invalidar_catalogo, callbacks)
+
+        resposta = self.client.get(self.url)
+        self.assertEqual(resposta.data["results"][0]["nome"], "Renomeado")
+
+    def test_misses_concorrentes_calculam_uma_vez(self):
+        chamadas = []
+
+        def calcular():
+            chamadas.append(1)
+            time.sleep(0.05)
+            return {"ok": True}
+
+        threads = [
+            threading.Thread(target=obter_ou_calcular, args=("teste:coalescido", calcular))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(chamadas), 1)
+
+
+# ---- DETALHE DO PRODUTO ---- #
+class DetalheProdutoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        _, (self.produto,) = criar_catalogo(1, imagens_por_produto=3)
+        self.url = reverse("detalhe_produto", kwargs={"produto_id": self.produto.id})
+
+    def test_acerto_no_cache_sem_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            resposta = self.client.get(self.url)
+
+        self.assertEqual(resposta["Content-Type"], "application/json")
+        self.assertEqual(json.loads(resposta.content)["id"], self.produto.id)
+
+    def test_documento_com_imagens_pecas_e_avaliacoes(self):
+        Peca.objects.bulk_create([
+            Peca(produto=self.produto, nome="Abraçadeira", medida="1/2", peso="0.05"),
+            Peca(produto=self.produto, nome="Engate", medida="3/4", peso="0.12"),
+        ])
+        documento = json.loads(self.client.get(self.url).content)
+
+        self.assertEqual(documento["categoria"]["nome"], "Mangueiras")
+        self.assertEqual([img["ordem"] for img in documento["imagens"]], [0, 1, 2])
+        self.assertEqual([peca["nome"] for peca in documento["pecas"]], ["Abraçadeira", "Engate"])
+        self.assertEqual(documento["avaliacoes"]["histograma"], {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0})
+
+    def test_remontado_quando_peca_ou_avaliacao_muda(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Peca.objects.create(produto=self.produto, nome="Engate", medida="3/4", peso="0.12")
+        self.assertEqual(len(json.loads(self.client.get(self.url).content)["pecas"]), 1)
+
+        usuario = criar_usuario()
+        self.client.force_authenticate(usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("avaliar_produto"), {
+                "pedido_id": criar_pedido(usuario).id, "produto_id": self.produto.id, "nota": 4,
+            })
+        # A avaliação só descarta o documento; a leitura seguinte o remonta
+        self.assertFalse(ProdutoDetalhe.objects.filter(produto=self.produto).exists())
+        avaliacoes = json.loads(self.client.get(self.url).content)["avaliacoes"]
+
+        self.assertEqual(avaliacoes["total"], 1)
+        self.assertEqual(avaliacoes["histograma"]["4"], 1)
+
+    def test_sem_cache_le_o_documento_do_banco(self):
+        primeira = self.client.get(self.url).content
+        cache.clear()
+        with self.assertNumQueries(1):
+            resposta = self.client.get(self.url)
+
+        self.assertEqual(resposta.content, primeira)
+        self.assertTrue(ProdutoDetalhe.objects.filter(produto=self.produto).exists())
+
+    def test_produto_inexistente(self):
+        resposta = self.client.get(reverse("detalhe_produto", kwargs={"produto_id": self.produto.id + 1}))
+
+        self.assertEqual(resposta.status_code, 404)
+        self.assertEqual(resposta.json(), {"erro": "Produto não encontrado"})
+
+
+# ---- SERIALIZAÇÃO POR VALUES() ---- #
+class SerializacaoValoresTests(TestCase):
+    def renderizar(self, dados):
+        return JSONRenderer().render(dados)
+
+    def test_produtos_iguais_ao_serializer(self):
+        _, produtos = criar_catalogo(5, imagens_por_produto=3)
+        Produto.objects.filter(id=produtos[0].id).update(
+            nome="Mangueira ½\" \u2028", preco=Decimal("1234.50"), media_avaliacao=4.333333333333333,
+        )
+        Produto.objects.create(nome="Sem imagens", descricao="", preco="0.01", categoria=produtos[0].categoria)
+
+        instancias = Produto.objects.select_related("categoria").prefetch_related(
+            Prefetch("imagens", queryset=ProdutoImagem.objects.order_by("ordem", "id"))
+        ).order_by("id")
+        esperado = self.renderizar(ProdutoSerializer(instancias, many=True).data)
+        obtido = self.renderizar(LEITOR_PRODUTO.serializar(LEITOR_PRODUTO.linhas(Produto.objects.order_by("id"))))
+
+        self.assertEqual(obtido, esperado)
+
+    def test_pedidos_iguais_ao_serializer(self):
+        _, produtos = criar_catalogo(3, imagens_por_produto=0)
+        usuario = criar_usuario()
+        for indice, status in enumerate(["RECEBIDO", "ENVIADO", "EM_PROCESSAMENTO"]):
+            pedido = Pedido.objects.create(
+                usuario=usuario, valor_total="30.00", valor_desconto="2.50", metodo_pagamento="PIX", status=status,
+                codigo_rastreio="BR123" if indice else None,
+            )
+            # Só o segundo pedido tem preço congelado (diferente do atual); os outros caem no preço do produto
+            pedido.itens.set(ItemCarrinho.objects.bulk_create([
+                ItemCarrinho(produto=produto, quantidade=indice + 1, preco_unitario="7.50" if indice == 1 else None)
+                for produto in produtos[indice:]
+            ]))
+
+        instancias = Pedido.objects.prefetch_related(
+            Prefetch("itens", queryset=ItemCarrinho.objects.select_related("produto").order_by("id"))
+        ).order_by("id")
+        esperado = self.renderizar(PedidoSerializer(instancias, many=True).data)
+        obtido = self.renderizar(LEITOR_PEDIDO.serializar(LEITOR_PEDIDO.linhas(Pedido.objects.order_by("id"))))
+
+        self.assertEqual(obtido, esperado)
+        self.assertIn(b'"preco_unitario":"7.50"', obtido)
+        self.assertIn(b'"preco_unitario":"10.00"', obtido)
+
+    def test_escolha_de_campos(self):
+        cache.clear()
+        criar_catalogo(3)
+        url = reverse("lista_produtos")
+
+        with self.assertNumQueries(1):  # sem imagens, sem a query delas
+            resposta = self.client.get(url, {"fields": "id,nome", "ordering": "-preco", "page_size": 2})
+        self.assertEqual([list(produto) for produto in resposta.json()["results"]], [["id", "nome"]] * 2)
+        self.assertEqual(len(self.client.get(resposta.json()["next"]).json()["results"]), 1)
+
+        invalida = self.client.get(url, {"fields": "id,senha"})
+        self.assertEqual(invalida.status_code, 400)
+        self.assertEqual(invalida.json(), {"erro": "Campos inválidos: senha"})
+
+
+# ---- BUSCA DE PRODUTOS ---- #
+class BuscaProdutosTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse("busca_produtos")
+        self.jardim = Categoria.objects.create(nome="Jardinagem")
+        self.mangueira = Produto.objects.create(
+            nome="Mangueira Trançada 20m", descricao="Resistente à pressão da água",
+            preco="89.90", categoria=self.jardim,
+        )
+        self.esguicho = Produto.objects.create(
+            nome="Esguicho", descricao="Acompanha mangueira de reposição",
+            preco="19.90", categoria=self.jardim,
+        )
+
+    def buscar(self, termo):
+        return [p["nome"] for p in self.client.get(self.url, {"q": termo}).data["results"]]
+
+    def test_busca_sem_acentos_e_por_prefixo(self):
+        self.assertEqual(self.buscar("agua"), ["Mangueira Trançada 20m"])
+        self.assertEqual(self.buscar("tranc"), ["Mangueira Trançada 20m"])
+
+    def test_nome_pesa_mais_que_descricao(self):
+        self.assertEqual(self.buscar("mangueira"), ["Mangueira Trançada 20m", "Esguicho"])
+
+    def test_indice_atualizado_por_signals(self):
+        Peca.objects.create(produto=self.esguicho, nome="Engate rápido", medida="1/2", peso="0.10")
+        self.assertEqual(self.buscar("engate"), ["Esguicho"])
+
+        self.jardim.nome = "Irrigação"
+        self.jardim.save()
+        self.assertEqual(len(self.buscar("irrigacao")), 2)
+
+        self.esguicho.delete()
+        self.assertEqual(self.buscar("engate"), [])
+
+    def test_reindexar_busca(self):
+        Produto.objects.bulk_create([
+            Produto(nome="Aspersor", descricao="Giratório", preco="30.00", categoria=self.jardim),
+        ])
+        self.assertEqual(self.buscar("aspersor"), [])
+
+        call_command("reindexar_busca", stdout=io.StringIO())
+        self.assertEqual(self.buscar("aspersor"), ["Aspersor"])
+
+    def test_termo_obrigatorio(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+
+
+# ---- FILTROS E ORDENAÇÃO DO CATÁLOGO ---- #
+class FiltrosCatalogoTests(TestCase):
+    # Valores seletivos: com estatísticas reais, um filtro que casa com quase
+    # toda a tabela é legitimamente mais barato como varredura + LIMIT.
+    FILTROS = {
+        "categoria": None,
+        "preco_min": "990",
+        "preco_max": "15",
+        "avaliacao_min": "4.95",
+        "parcelas_min": "12",
+    }
+    ORDENACOES = [None, "preco", "-preco", "-media_avaliacao", "-total_avaliacoes"]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("lista_produtos")
+
+    def test_combinacoes_usam_indice(self):
+        categorias = Categoria.objects.bulk_create([Categoria(nome=f"Categoria {i}") for i in range(50)])
+        Produto.objects.bulk_create([
+            Produto(
+                nome=f"Produto {i}", descricao="", preco=i % 1000,
+                # Poucos empates por valor: a primeira página termina numa posição de cursor
+                media_avaliacao=(i % 500) / 100, total_avaliacoes=i % 500,
+                parcelas_max_sem_juros=i % 12 + 1, categoria=categorias[i % 50],
+            )
+            for i in range(5000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        filtros = dict(self.FILTROS, categoria=str(categorias[0].id))
+        for tamanho in range(len(filtros) + 1):
+            for combinacao in itertools.combinations(filtros, tamanho):
+                for ordenacao in self.ORDENACOES:
+                    params = {nome: filtros[nome] for nome in combinacao}
+                    if ordenacao:
+                        params["ordering"] = ordenacao
+
+                    with self.subTest(**params):
+                        plano = self.plano(params)
+                        # Busca no índice (SEARCH); "SCAN ... USING INDEX" percorre o índice inteiro
+                        self.assertTrue(any(linha.startswith("SEARCH APP_produto") for linha in plano), plano)
+                        self.assertEqual([linha for linha in plano if linha.startswith("SCAN APP_produto")], [])
+
+    def plano(self, params):
+        """
+        EXPLAIN QUERY PLAN da query de produtos que o endpoint executou. Sem
+        filtro, a da segunda página: só ela tem WHERE (a posição do cursor).
+        """
+        cache.clear()
+        url = self.url
+        if not set(params) - {"ordering"}:
+            url, params = self.client.get(self.url, params).data["next"], {}
+
+        with CaptureQueriesContext(connection) as capturadas:
+            self.client.get(url, params)
+
+        sql = next(q["sql"] for q in capturadas if q["sql"].startswith('SELECT "APP_produto"'))
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [linha[-1] for linha in cursor.fetchall()]
+
+    def test_empates_desempatados_pelo_id(self):
+        categoria = Categoria.objects.create(nome="Jardinagem")
+        Produto.objects.bulk_create([
+            Produto(nome=f"Produto {i}", descricao="", preco="10.00", categoria=categoria) for i in range(7)
+        ])
+
+        vistos, url, params = [], self.url, {"ordering": "-preco", "page_size": 3}
+        while url:
+            dados = self.client.get(url, params).data
+            vistos += [produto["id"] for produto in dados["results"]]
+            url, params = dados["next"], {}
+
+        self.assertEqual(vistos, sorted(Produto.objects.values_list("id", flat=True), reverse=True))
+
+    def test_filtra_e_ordena(self):
+        categoria = Categoria.objects.create(nome="Jardinagem")
+        outra = Categoria.objects.create(nome="Piscina")
+        for nome, preco, media, parcelas, cat in [
+            ("Barata", "15.00", 4.5, 1, categoria),
+            ("Media", "50.00", 3.0, 3, categoria),
+            ("Cara", "150.00", 5.0, 6, categoria),
+            ("Outra", "40.00", 5.0, 6, outra),
+        ]:
+            Produto.objects.create(
+                nome=nome, descricao="", preco=preco, media_avaliacao=media,
+                parcelas_max_sem_juros=parcelas, categoria=cat,
+            )
+
+        def nomes(**params):
+            return [p["nome"] for p in self.client.get(self.url, params).data["results"]]
+
+        self.assertEqual(nomes(categoria=categoria.id, preco_max="100", ordering="-preco"), ["Media", "Barata"])
+        self.assertEqual(nomes(avaliacao_min="4.5", ordering="preco"), ["Barata", "Outra", "Cara"])
+        self.assertEqual(nomes(parcelas_min="3", categoria=categoria.id), ["Media", "Cara"])
+
+
+# ---- AVALIAÇÕES ---- #
+class AvaliarProdutoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = criar_usuario()
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse("avaliar_produto")
+        _, (self.produto,) = criar_catalogo(1, imagens_por_produto=0)
+
+    def avaliar(self, nota, pedido=None):
+        pedido = pedido or criar_pedido(self.usuario)
+        return self.client.post(self.url, {"pedido_id": pedido.id, "produto_id": self.produto.id, "nota": nota})
+
+    def test_agregados_e_histograma_incrementais(self):
+        self.avaliar(5)
+        resposta = self.avaliar(2)
+
+        self.assertEqual(resposta.data["total_avaliacoes"], 2)
+        self.assertEqual(resposta.data["media_atual"], 3.5)
+        self.assertEqual(resposta.data["histograma"], {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1})
+
+    def test_custo_nao_depende_do_numero_de_avaliacoes(self):
+        pedido = criar_pedido(self.usuario)
+        with CaptureQueriesContext(connection) as primeira:
+            self.avaliar(4, pedido)
+
+        outro = criar_usuario(email="outro@exemplo.com", cpf="11111111111")
+        pedidos = Pedido.objects.bulk_create([
+            Pedido(usuario=outro, valor_total="1.00", metodo_pagamento="PIX", status="RECEBIDO")
+            for _ in range(300)
+        ])
+        Avaliacao.objects.bulk_create([Avaliacao(pedido=p, produto=self.produto, nota=3) for p in pedidos])
+
+        pedido = criar_pedido(self.usuario)
+        with CaptureQueriesContext(connection) as depois:
+            self.avaliar(4, pedido)
+
+        self.assertEqual(len(primeira), len(depois))
+
+    def test_nota_ausente_ou_invalida(self):
+        pedido = criar_pedido(self.usuario)
+        for dados in ({}, {"nota": "cinco"}, {"nota": 6}):
+            with self.subTest(dados=dados):
+                resposta = self.client.post(self.url, {"pedido_id": pedido.id, "produto_id": self.produto.id, **dados})
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn("erro", resposta.data)
+        self.assertFalse(Avaliacao.objects.exists())
+
+    def test_avaliacao_duplicada(self):
+        pedido = criar_pedido(self.usuario)
+        self.avaliar(4, pedido)
+        self.assertEqual(self.avaliar(1, pedido).status_code, 400)
+
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.total_avaliacoes, 1)
+
+    def test_reconcile_ratings(self):
+        pedidos = [criar_pedido(self.usuario) for _ in range(3)]
+        Avaliacao.objects.bulk_create([
+            Avaliacao(pedido=pedido, produto=self.produto, nota=nota)
+            for pedido, nota in zip(pedidos, [1, 5, 5])
+        ])
+
+        call_command("reconcile_ratings", stdout=io.StringIO())
+
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.total_avaliacoes, 3)
+        self.assertEqual(self.produto.soma_avaliacoes, 11)
+        self.assertAlmostEqual(self.produto.media_avaliacao, 11 / 3)
+        self.assertEqual(self.produto.histograma_avaliacoes, {"1": 1, "2": 0, "3": 0, "4": 0, "5": 2})
+
+
+# ---- CRIAR PEDIDO ---- #
+class CriarPedidoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = criar_usuario()
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse("criar_pedido")
+        _, self.produtos = criar_catalogo(5, imagens_por_produto=0)
+        # A tabela de promoções compilada fica na memória: compila antes de contar queries
+        tabela_promocoes()
+
+    def criar_itens(self, quantidade):
+        return ItemCarrinho.objects.bulk_create([
+            ItemCarrinho(produto=self.produtos[i % 5], quantidade=2)
+            for i in range(quantidade)
+        ])
+
+    def pedir(self, itens, **extra):
+        return self.client.post(
+            self.url,
+            {"itens": [item.id for item in itens], "metodo_pagamento": "PIX", **extra},
+            format="json",
+        )
+
+    def test_queries_fixas_de_1_a_500_itens(self):
+        for quantidade in (1, 500):
+            itens = self.criar_itens(quantidade)
+            # SAVEPOINT, itens, pedido, M2M, preços congelados, 2 upserts de consolidados, RELEASE
+            with self.subTest(itens=quantidade), self.assertNumQueries(8):
+                resposta = self.pedir(itens)
+
+            pedido = Pedido.objects.get(id=resposta.data["pedido_id"])
+            self.assertEqual(pedido.itens.count(), quantidade)
+            self.assertEqual(pedido.valor_total, 20 * quantidade)
+
+    def test_cartao_gravado_junto_com_pedido(self):
+        itens = self.criar_itens(2)
+        with self.assertNumQueries(9):
+            resposta = self.pedir(
+                itens, metodo_pagamento="CARTAO", numero_cartao="4111111111111111",
+                nome_cartao="CLIENTE", validade="12/30", cvv="123",
+            )
+
+        pedido = Pedido.objects.get(id=resposta.data["pedido_id"])
+        self.assertEqual(pedido.cartao.numero, "4111111111111111")
+
+    def test_valores_do_pedido_saem_como_numero(self):
+        # O contrato da resposta: valor_total e valor_desconto são números JSON
+        dados = self.pedir(self.criar_itens(3)).json()
+
+        self.assertEqual(dados["valor_total"], 60)
+        self.assertIsInstance(dados["valor_total"], float)
+        self.assertIsInstance(dados["valor_desconto"], float)
+
+    def test_itens_inexistentes(self):
+        resposta = self.client.post(self.url, {"itens": [999], "metodo_pagamento": "PIX"}, format="json")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Pedido.objects.exists())
+
+
+# ---- STATUS DO PEDIDO ---- #
+class StatusPedidoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.cliente = criar_usuario()
+
+    def autenticar(self, cargo):
+        usuario = criar_usuario(email=f"{cargo.lower()}@exemplo.com", cpf=cargo[:11].ljust(11, "0"), cargo=cargo)
+        self.client.force_authenticate(usuario)
+        return usuario
+
+    def test_lote_valida_e_atualiza(self):
+        self.autenticar("LOGISTICA")
+        prontos = [criar_pedido(self.cliente, status="EM_PREPARACAO") for _ in range(3)]
+        fora_de_ordem = criar_pedido(self.cliente, status="EM_PROCESSAMENTO")
+        ids = [p.id for p in prontos] + [fora_de_ordem.id, 9999]
+
+        with self.assertNumQueries(4):
+            resposta = self.client.post(reverse("status_pedido_lote"), {"pedidos": ids, "status": "ENVIADO"}, format="json")
+
+        self.assertEqual(resposta.data["atualizados"], 3)
+        self.assertEqual([r["ok"] for r in resposta.data["resultados"]], [True, True, True, False, False])
+        self.assertEqual(resposta.data["resultados"][4]["erro"], "Pedido não encontrado")
+        self.assertEqual(Pedido.objects.filter(status="ENVIADO").count(), 3)
+        fora_de_ordem.refresh_from_db()
+        self.assertEqual(fora_de_ordem.status, "EM_PROCESSAMENTO")
+
+    def test_lote_gera_codigos_de_rastreio(self):
+        self.autenticar("FINANCEIRO")
+        pedidos = [criar_pedido(self.cliente, status="PAGAMENTO_APROVADO") for _ in range(5)]
+
+        resposta = self.client.post(
+            reverse("status_pedido_lote"),
+            {"pedidos": [p.id for p in pedidos], "status": "NOTA_FISCAL_EMITIDA"},
+            format="json",
+        )
+
+        codigos = {r["codigo_rastreio"] for r in resposta.data["resultados"]}
+        self.assertEqual(len(codigos), 5)
+        self.assertEqual(set(Pedido.objects.values_list("codigo_rastreio", flat=True)), codigos)
+
+    def test_lote_ignora_pedido_alterado_depois_da_leitura(self):
+        self.autenticar("FINANCEIRO")
+        _, (produto,) = criar_catalogo(1, imagens_por_produto=0)
+        for novo_status, origem in [("NOTA_FISCAL_EMITIDA", "PAGAMENTO_APROVADO"), ("PAGAMENTO_APROVADO", "EM_PROCESSAMENTO")]:
+            with self.subTest(novo_status=novo_status):
+                pedidos = [criar_pedido(self.cliente, status=origem) for _ in range(3)]
+                for pedido in pedidos:
+                    pedido.itens.add(ItemCarrinho.objects.create(produto=produto, preco_unitario=produto.preco))
+                alterado = pedidos[1]
+                concorrentes = []
+
+                def outra_requisicao(execute, sql, params, many, context):
+                    # Outra requisição muda o pedido entre a leitura e o UPDATE do lote
+                    if sql.startswith('UPDATE "APP_pedido"') and not concorrentes:
+                        concorrentes.append(sql)
+                        context["cursor"].execute(
+                            'UPDATE "APP_pedido" SET "status" = %s WHERE "id" = %s', ["PAGAMENTO_REPROVADO", alterado.id]
+                        )
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(outra_requisicao):
+                    resposta = self.client.post(
+                        reverse("status_pedido_lote"),
+                        {"pedidos": [p.id for p in pedidos], "status": novo_status},
+                        format="json",
+                    )
+
+                resultados = resposta.data["resultados"]
+                self.assertEqual([r["ok"] for r in resultados], [True, False, True])
+                self.assertEqual(resultados[1]["erro"], "Transição inválida conforme regras do pedido!")
+                self.assertEqual(resposta.data["atualizados"], 2)
+                alterado.refresh_from_db()
+                self.assertEqual((alterado.status, alterado.codigo_rastreio), ("PAGAMENTO_REPROVADO", None))
+
+        # Só os dois pedidos aprovados pelo lote entram nos consolidados
+        self.assertEqual(VendaDiariaProduto.objects.get(produto=produto).unidades_aprovadas, 2)
+
+    def test_aprovacoes_simultaneas_contam_uma_vez(self):
+        financeiro = self.autenticar("FINANCEIRO")
+        _, (produto,) = criar_catalogo(1, imagens_por_produto=0)
+        pedido = criar_pedido(self.cliente, status="EM_PROCESSAMENTO")
+        pedido.itens.add(ItemCarrinho.objects.create(produto=produto, preco_unitario=produto.preco))
+
+        # Duas requisições leram o mesmo pedido antes de qualquer uma gravar
+        copias = [Pedido.objects.get(id=pedido.id) for _ in range(2)]
+        for copia in copias:
+            self.assertEqual(_alterar_status(financeiro, copia, "PAGAMENTO_APROVADO")[1], 200)
+        salvar_status(copias[0], "EM_PROCESSAMENTO")
+        with self.assertRaises(StatusConcorrente):
+            salvar_status(copias[1], "EM_PROCESSAMENTO")
+
+        self.assertEqual(VendaDiariaProduto.objects.get(produto=produto).unidades_aprovadas, 1)
+
+    def test_status_alterado_depois_da_leitura_responde_409(self):
+        self.autenticar("FINANCEIRO")
+        pedido = criar_pedido(self.cliente, status="EM_PROCESSAMENTO")
+        concorrentes = []
+
+        def outra_requisicao(execute, sql, params, many, context):
+            # Outra requisição muda o pedido entre a leitura e o UPDATE
+            if sql.startswith('UPDATE "APP_pedido"') and not concorrentes:
+                concorrentes.append(sql)
+                context["cursor"].execute(
+                    'UPDATE "APP_pedido" SET "status" = %s WHERE "id" = %s', ["PAGAMENTO_REPROVADO", pedido.id]
+                )
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(outra_requisicao):
+            resposta = self.client.post(
+                reverse("status_pedido"), {"pedido_id": pedido.id, "status": "PAGAMENTO_APROVADO"}, format="json"
+            )
+
+        self.assertEqual(resposta.status_code, 409)
+        pedido.refresh_from_db()
+        self.assertNotEqual(pedido.status, "PAGAMENTO_APROVADO")
+        self.assertFalse(VendaDiariaProduto.objects.exists())
+
+    def test_lote_sem_permissao_para_status(self):
+        self.autenticar("LOGISTICA")
+        pedido = criar_pedido(self.cliente, status="EM_PROCESSAMENTO")
+        resposta = self.client.post(
+            reverse("status_pedido_lote"), {"pedidos": [pedido.id], "status": "PAGAMENTO_APROVADO"}, format="json"
+        )
+        self.assertEqual(resposta.status_code, 403)
+
+    def test_cliente_so_altera_o_proprio_pedido(self):
+        outro = criar_usuario(email="outro@exemplo.com", cpf="22222222222")
+        meu = criar_pedido(self.cliente, status="ENVIADO")
+        alheio = criar_pedido(outro, status="ENVIADO")
+        self.client.force_authenticate(self.cliente)
+
+        resposta = self.client.post(
+            reverse("status_pedido_lote"), {"pedidos": [meu.id, alheio.id], "status": "RECEBIDO"}, format="json"
+        )
+
+        self.assertEqual([r["ok"] for r in resposta.data["resultados"]], [True, False])
+
+    def test_pedido_unico_usa_mesmas_regras(self):
+        self.client.force_authenticate(self.cliente)
+        pedido = criar_pedido(self.cliente, status="RECEBIDO")
+        url = reverse("status_pedido")
+
+        resposta = self.client.post(url, {"pedido_id": pedido.id, "status": "RECEBIDO"})
+        self.assertEqual(resposta.status_code, 403)
+
+        resposta = self.client.post(url, {"pedido_id": pedido.id, "status": "SOLICITACAO_DEVOLUCAO"})
+        self.assertEqual(resposta.data["mensagem"], "Solicitação de devolução registrada!")
+
+
+# ---- DEVOLUÇÃO ---- #
+class RegistrarDevolucaoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = criar_usuario()
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse("registrar_devolucao")
+        _, produtos = criar_catalogo(40, imagens_por_produto=0)
+        self.pedido = criar_pedido(self.usuario, status="SOLICITACAO_DEVOLUCAO")
+        self.itens = ItemCarrinho.objects.bulk_create([ItemCarrinho(produto=produto) for produto in produtos])
+        self.pedido.itens.set(self.itens)
+
+    def devolver(self, item_ids, motivo="Kit incompleto"):
+        return self.client.post(self.url, {
+            "pedido_id": self.pedido.id, "itens": [{"item_id": item_id, "motivo": motivo} for item_id in item_ids],
+        }, format="json")
+
+    def test_varios_itens_com_queries_constantes(self):
+        with self.assertNumQueries(6):  # pedido, pertencimento, duplicidade, SAVEPOINT, INSERT, RELEASE
+            resposta = self.devolver([item.id for item in self.itens])
+
+        self.assertEqual(resposta.data["registrados"], 40)
+        self.assertEqual(Devolucao.objects.filter(pedido=self.pedido).count(), 40)
+
+    def test_cargo_comparado_sem_diferenciar_maiusculas(self):
+        # Cargo gravado em minúsculas (importação antiga) continua sendo cliente
+        self.client.force_authenticate(criar_usuario("outro@exemplo.com", "11111111111", cargo="cliente"))
+        resposta = self.devolver([self.itens[0].id])
+
+        self.assertEqual(resposta.status_code, 403)
+        self.assertFalse(Devolucao.objects.exists())
+
+    def test_resultado_por_item(self):
+        outro = ItemCarrinho.objects.create(produto=self.itens[0].produto)
+        self.devolver([self.itens[0].id])
+
+        resposta = self.devolver([self.itens[0].id, outro.id, self.itens[1].id])
+
+        self.assertEqual(resposta.data["resultados"], [
+            {"item_id": self.itens[0].id, "ok": False, "erro": "Este item já está em devolução!"},
+            {"item_id": outro.id, "ok": False, "erro": "Esse item não pertence ao pedido informado!"},
+            {"item_id": self.itens[1].id, "ok": True},
+        ])
+        self.assertEqual(Devolucao.objects.filter(pedido=self.pedido).count(), 2)
+
+    def test_formato_de_um_item(self):
+        dados = {"pedido_id": self.pedido.id, "item_id": self.itens[0].id, "motivo": "Vazando"}
+        self.assertEqual(self.client.post(self.url, dados).data, {"mensagem": "Devolução registrada com sucesso!"})
+
+        resposta = self.client.post(self.url, dados)
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(resposta.data, {"erro": "Este item já está em devolução!"})
+
+    def test_pedido_de_outro_cliente(self):
+        outro = criar_usuario(email="outro@exemplo.com", cpf="11111111111")
+        self.client.force_authenticate(outro)
+
+        self.assertEqual(self.devolver([self.itens[0].id]).status_code, 403)
+        self.assertFalse(Devolucao.objects.exists())
+
+
+# ---- FILA DE TRABALHO ---- #
+class FilaPedidosTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        cliente = criar_usuario()
+        self.logistica = criar_usuario(email="log@exemplo.com", cpf="33333333333", cargo="LOGISTICA")
+        self.colega = criar_usuario(email="log2@exemplo.com", cpf="44444444444", cargo="LOGISTICA")
+        self.aguardando = [criar_pedido(cliente, status=s) for s in ["NOTA_FISCAL_EMITIDA", "EM_PREPARACAO"] * 3]
+        criar_pedido(cliente, status="EM_PROCESSAMENTO")
+        criar_pedido(cliente, status="ENVIADO")
+
+    def reservar(self, usuario, quantidade):
+        self.client.force_authenticate(usuario)
+        return self.client.post(reverse("reservar_pedidos"), {"quantidade": quantidade}, format="json").data
+
+    def test_fila_lista_status_do_cargo(self):
+        self.client.force_authenticate(self.logistica)
+        resposta = self.client.get(reverse("fila_pedidos"))
+
+        self.assertEqual([p["id"] for p in resposta.data["results"]], [p.id for p in self.aguardando])
+
+    def test_reservas_sao_disjuntas(self):
+        primeira = {p["id"] for p in self.reservar(self.logistica, 4)["pedidos"]}
+        segunda = {p["id"] for p in self.reservar(self.colega, 4)["pedidos"]}
+
+        self.assertEqual(len(primeira), 4)
+        self.assertEqual(len(segunda), 2)
+        self.assertFalse(primeira & segunda)
+
+        # Pedidos reservados saem da fila dos demais
+        self.client.force_authenticate(self.logistica)
+        self.assertEqual(self.client.get(reverse("fila_pedidos")).data["results"], [])
+
+    def test_reserva_expirada_volta_para_a_fila(self):
+        self.reservar(self.logistica, 6)
+        Pedido.objects.update(reservado_ate=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(len(self.reservar(self.colega, 6)["pedidos"]), 6)
+
+    def test_mudanca_de_status_encerra_reserva(self):
+        dados = self.reservar(self.logistica, 1)
+        pedido_id = dados["pedidos"][0]["id"]
+
+        self.client.post(reverse("status_pedido"), {"pedido_id": pedido_id, "status": "EM_PREPARACAO"})
+
+        pedido = Pedido.objects.get(id=pedido_id)
+        self.assertEqual(pedido.status, "EM_PREPARACAO")
+        self.assertIsNone(pedido.reserva)
+
+    def test_liberar_reserva(self):
+        dados = self.reservar(self.logistica, 3)
+        resposta = self.client.post(reverse("liberar_reserva"), {"reserva": dados["reserva"]}, format="json")
+
+        self.assertEqual(resposta.data["liberados"], 3)
+        self.assertFalse(Pedido.objects.filter(reserva__isnull=False).exists())
+
+
+# ---- HISTÓRICO DE PEDIDOS ---- #
+class HistoricoPedidosTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = criar_usuario()
+        self.client.force_authenticate(self.usuario)
+        self.url = reverse("historico_pedidos")
+        _, self.produtos = criar_catalogo(3, imagens_por_produto=0)
+
+    def criar_pedidos(self, quantidade, status="RECEBIDO", usuario=None):
+        pedidos = []
+        for _ in range(quantidade):
+            pedido = criar_pedido(usuario or self.usuario, status=status)
+            itens = ItemCarrinho.objects.bulk_create([ItemCarrinho(produto=p, quantidade=1) for p in self.produtos])
+            pedido.itens.set(itens)
+            pedidos.append(pedido)
+        return pedidos
+
+    def test_queries_fixas_com_itens_embutidos(self):
+        self.criar_pedidos(2)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        self.criar_pedidos(20)
+        with self.assertNumQueries(2):
+            resposta = self.client.get(self.url)
+
+        primeiro = resposta.data["results"][0]
+        self.assertEqual(len(primeiro["itens"]), 3)
+        self.assertEqual(primeiro["itens"][0]["produto_nome"], "Produto 0")
+
+    def test_preco_pago_e_nao_o_atual(self):
+        pedido = criar_pedido(self.usuario)
+        pedido.itens.add(ItemCarrinho.objects.create(produto=self.produtos[0], preco_unitario="10.00"))
+        Produto.objects.filter(id=self.produtos[0].id).update(preco="99.00")
+
+        item = self.client.get(self.url).json()["results"][0]["itens"][0]
+        self.assertEqual(item["preco_unitario"], "10.00")
+
+    def test_mais_recentes_primeiro_e_so_do_usuario(self):
+        antigos = self.criar_pedidos(2)
+        outro = criar_usuario(email="outro@exemplo.com", cpf="55555555555")
+        self.criar_pedidos(1, usuario=outro)
+        recente = self.criar_pedidos(1)
+
+        ids = [p["id"] for p in self.client.get(self.url).data["results"]]
+        self.assertEqual(ids, [recente[0].id, antigos[1].id, antigos[0].id])
+
+    def test_filtro_por_status(self):
+        self.criar_pedidos(2, status="ENVIADO")
+        self.criar_pedidos(1, status="CANCELADO")
+
+        resposta = self.client.get(self.url, {"status": "CANCELADO"})
+        self.assertEqual([p["status"] for p in resposta.data["results"]], ["CANCELADO"])
+
+
+# ---- CARRINHO ---- #
+class CarrinhoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # As cópias dos carrinhos ficam em outro alias e sobrevivem ao rollback
+        caches["carrinho"].clear()
+        self.client = APIClient()
+        self.usuario = criar_usuario()
+        self.client.force_authenticate(self.usuario)
+        _, self.produtos = criar_catalogo(3, imagens_por_produto=0)
+
+    def test_adicionar_mescla_sem_gravar_itens(self):
+        produto = self.produtos[0]
+        self.client.post(reverse("add_carrinho"), {"produto_id": produto.id, "quantidade": 2})
+        resposta = self.client.post(
+            reverse("add_carrinho"),
+            {"itens": [{"produto_id": produto.id, "quantidade": 3}, {"produto_id": self.produtos[1].id}]},
+            format="json",
+        )
+
+        self.assertEqual(resposta.data["itens"], {produto.id: 5, self.produtos[1].id: 1})
+        self.assertFalse(ItemCarrinho.objects.exists())
+
+    def test_operacoes_em_lote(self):
+        a, b, c = self.produtos
+        self.client.post(reverse("add_carrinho"), {"itens": [{"produto_id": a.id}, {"produto_id": b.id}]}, format="json")
+
+        resposta = self.client.post(reverse("carrinho"), {"operacoes": [
+            {"acao": "definir", "produto_id": a.id, "quantidade": 4},
+            {"acao": "remover", "produto_id": b.id},
+            {"acao": "adicionar", "produto_id": c.id, "quantidade": 1},
+        ]}, format="json")
+        self.assertEqual(resposta.data["itens"], {a.id: 4, c.id: 1})
+
+        resumo = self.client.get(reverse("carrinho")).data
+        self.assertEqual(resumo["total"], 50)
+
+    def test_operacao_invalida_nao_altera_carrinho(self):
+        resposta = self.client.post(reverse("carrinho"), {"operacoes": [
+            {"acao": "adicionar", "produto_id": self.produtos[0].id},
+            {"acao": "adicionar", "produto_id": 9999},
+        ]}, format="json")
+
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(self.client.get(reverse("carrinho")).data["itens"], [])
+
+    def test_checkout_grava_itens_e_esvazia_carrinho(self):
+        self.client.post(reverse("add_carrinho"), {"itens": [
+            {"produto_id": p.id, "quantidade": 2} for p in self.produtos
+        ]}, format="json")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(reverse("criar_pedido"), {"metodo_pagamento": "PIX"}, format="json")
+
+        pedido = Pedido.objects.get(id=resposta.data["pedido_id"])
+        self.assertEqual(pedido.valor_total, 60)
+        self.assertEqual(pedido.itens.count(), 3)
+        self.assertEqual(self.client.get(reverse("carrinho")).data["itens"], [])
+
+    def test_carrinho_sobrevive_a_perda_do_cache(self):
+        self.client.post(reverse("add_carrinho"), {"produto_id": self.produtos[0].id, "quantidade": 2})
+        caches["carrinho"].clear()
+
+        resumo = self.client.get(reverse("carrinho")).data
+        self.assertEqual(resumo["itens"][0]["quantidade"], 2)
+
+    def test_alteracoes_simultaneas_nao_perdem_itens(self):
+        a, b, _ = self.produtos
+        self.client.post(reverse("add_carrinho"), {"produto_id": a.id, "quantidade": 1})
+        tentativas = []
+
+        def adicionar_a(carrinho):
+            if not tentativas:
+                # Outra requisição grava entre a leitura e o compare-and-set
+                Carrinho.alterar(self.usuario.id, lambda outro: outro.adicionar(b.id, 2))
+            tentativas.append(carrinho.versao)
+            carrinho.adicionar(a.id, 3)
+
+        carrinho = Carrinho.alterar(self.usuario.id, adicionar_a)
+
+        self.assertEqual(tentativas, [1, 2])
+        self.assertEqual(carrinho.itens, {a.id: 4, b.id: 2})
+        self.assertEqual(Carrinho.do_banco(self.usuario.id).itens, {a.id: 4, b.id: 2})
+        self.assertEqual(self.client.get(reverse("carrinho")).data["total"], 60)
+
+    def test_checkout_informa_produtos_removidos(self):
+        a, b, _ = self.produtos
+        self.client.post(reverse("add_carrinho"), {"itens": [{"produto_id": a.id}, {"produto_id": b.id}]}, format="json")
+        removido = b.id
+        b.delete()
+
+        resposta = self.client.post(reverse("criar_pedido"), {"metodo_pagamento": "PIX"}, format="json")
+
+        self.assertEqual(resposta.status_code, 409)
+        self.assertEqual(resposta.data["detalhes"], [{"produto_id": removido, "erro": "Produto não encontrado"}])
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(ItemCarrinho.objects.exists())
+        self.assertEqual(Carrinho.do_banco(self.usuario.id).itens, {a.id: 1, removido: 1})
+
+    def test_limpar_itens_orfaos(self):
+        ItemCarrinho.objects.bulk_create([ItemCarrinho(produto=self.produtos[0]) for _ in range(5)])
+        usado = ItemCarrinho.objects.create(produto=self.produtos[1])
+        criar_pedido(self.usuario).itens.add(usado)
+
+        call_command("limpar_itens_carrinho", lote=2, stdout=io.StringIO())
+
+        self.assertEqual(list(ItemCarrinho.objects.all()), [usado])
+
+
+# ---- PROMOÇÕES ---- #
+class PromocoesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["carrinho"].clear()
+        # A tabela compilada sobrevive ao rollback do teste: as próximas classes recompilam
+        self.addCleanup(invalidar_promocoes)
+        self.client = APIClient()
+        self.usuario = criar_usuario()
+        self.client.force_authenticate(self.usuario)
+        self.categoria, self.produtos = criar_catalogo(3, imagens_por_produto=0)
+        self.outra = Categoria.objects.create(nome="Conexões")
+        self.avulso = Produto.objects.create(nome="Avulso", descricao="", preco="50.00", categoria=self.outra)
+
+    def criar_regras(self):
+        a, b, _ = self.produtos
+        with self.captureOnCommitCallbacks(execute=True):
+            Promocao.objects.create(nome="Categoria", percentual=10, categoria=self.categoria)
+            Promocao.objects.create(nome="Atacado", percentual=30, categoria=self.categoria, quantidade_minima=10)
+            Promocao.objects.create(nome="Produto A", percentual=20, produto=a)
+            Promocao.objects.create(nome="PIX", percentual=5, metodo_pagamento="PIX")
+            Promocao.objects.create(nome="Cartão B", percentual=25, produto=b, metodo_pagamento="CARTAO_DE_CREDITO")
+
+    def linha(self, produto, quantidade):
+        return (produto.id, produto.categoria_id, Decimal(produto.preco), quantidade)
+
+    def test_melhor_regra_de_cada_linha(self):
+        self.criar_regras()
+        a, b, c = self.produtos
+        linhas = [self.linha(a, 2), self.linha(b, 1), self.linha(c, 10), self.linha(self.avulso, 1)]
+
+        precos = precificar(linhas, "PIX")
+        self.assertEqual([regra.nome for _, _, regra in precos], ["Produto A", "Categoria", "Atacado", "PIX"])
+        self.assertEqual(
+            [desconto for _, desconto, _ in precos], [Decimal("4.00"), Decimal("1.00"), Decimal("30.00"), Decimal("2.50")]
+        )
+
+        # "CARTAO" (nome da opção, como o checkout recebe) leva as regras do cartão
+        precos = precificar(linhas, "CARTAO")
+        self.assertEqual([regra and regra.nome for _, _, regra in precos], ["Produto A", "Cartão B", "Atacado", None])
+
+    def test_cotacao_igual_ao_checkout(self):
+        self.criar_regras()
+        a, _, c = self.produtos
+        self.client.post(reverse("add_carrinho"), {"itens": [
+            {"produto_id": a.id, "quantidade": 2}, {"produto_id": c.id, "quantidade": 10},
+        ]}, format="json")
+
+        cotacao = self.client.get(reverse("cotacao_carrinho"), {"metodo_pagamento": "PIX"}).json()
+        self.assertEqual((cotacao["subtotal"], cotacao["desconto"], cotacao["total"]), (120, 34, 86))
+        self.assertEqual(cotacao["itens"][0]["promocao"]["nome"], "Produto A")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(reverse("criar_pedido"), {"metodo_pagamento": "PIX"}, format="json")
+        pedido = Pedido.objects.get(id=resposta.data["pedido_id"])
+        self.assertEqual((pedido.valor_total, pedido.valor_desconto), (Decimal("86.00"), Decimal("34.00")))
+        self.assertEqual(
+            VendaDiariaCategoria.objects.values_list("valor_bruto", "valor_desconto").get(),
+            (Decimal("120.00"), Decimal("34.00")),
+        )
+
+    def test_desconto_de_cada_linha_nos_consolidados(self):
+        a = self.produtos[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Promocao.objects.create(nome="Produto A", percentual=20, produto=a)
+        itens = ItemCarrinho.objects.bulk_create([
+            ItemCarrinho(produto=a, quantidade=1), ItemCarrinho(produto=self.avulso, quantidade=1),
+        ])
+        criar_pedido_do_pipeline(self.usuario, ItemCarrinho.objects.filter(id__in=[i.id for i in itens]), "PIX")
+
+        # O desconto do produto A não é rateado com o avulso, de outra categoria
+        por_produto = dict(VendaDiariaProduto.objects.values_list("produto_id", "valor_desconto"))
+        self.assertEqual(por_produto, {a.id: Decimal("2.00"), self.avulso.id: Decimal("0.00")})
+        por_categoria = dict(VendaDiariaCategoria.objects.values_list("categoria_id", "valor_desconto"))
+        self.assertEqual(por_categoria, {self.categoria.id: Decimal("2.00"), self.outra.id: Decimal("0.00")})
+
+        reconstruir_vendas()
+        self.assertEqual(dict(VendaDiariaProduto.objects.values_list("produto_id", "valor_desconto")), por_produto)
+
+    def test_cotacao_com_tabela_compilada_custa_uma_query(self):
+        self.criar_regras()
+        self.client.post(reverse("add_carrinho"), {"produto_id": self.produtos[0].id}, format="json")
+        self.client.get(reverse("cotacao_carrinho"))
+
+        with self.assertNumQueries(1):
+            resposta = self.client.get(reverse("cotacao_carrinho"), {"metodo_pagamento": "BOLETO"})
+        self.assertEqual(resposta.json()["metodo_pagamento"], "BOLETO")
+
+    def test_metodo_invalido(self):
+        resposta = self.client.get(reverse("cotacao_carrinho"), {"metodo_pagamento": "CHEQUE"})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_alterar_regra_recompila(self):
+        tabela = tabela_promocoes()
+        with self.assertNumQueries(0):
+            self.assertIs(tabela_promocoes(), tabela)
+
+        self.criar_regras()
+        nova = tabela_promocoes()
+        self.assertIsNot(nova, tabela)
+        self.assertEqual(nova.total_regras, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Promocao.objects.filter(nome="PIX").get().delete()
+        self.assertEqual(tabela_promocoes().total_regras, 4)
+
+    def test_vigencia(self):
+        agora = timezone.now()
+        Promocao.objects.bulk_create([
+            Promocao(nome="Encerrada", percentual=50, fim=agora - timedelta(hours=1)),
+            Promocao(nome="Futura", percentual=40, inicio=agora + timedelta(hours=1)),
+            Promocao(nome="Até amanhã", percentual=10, fim=agora + timedelta(days=1)),
+            Promocao(nome="Pausada", percentual=60, ativa=False),
+        ])
+
+        tabela = compilar(agora=agora)
+        self.assertEqual(tabela.total_regras, 1)
+        self.assertEqual(tabela.valida_ate, agora + timedelta(hours=1))
+        self.assertFalse(tabela.vigente(tabela.versao, agora + timedelta(hours=1)))
+
+        depois = compilar(agora=agora + timedelta(hours=2))
+        regra = depois.melhor_regra(self.avulso.id, self.outra.id, 1)
+        self.assertEqual(regra.nome, "Futura")
+
+
+# ---- AUTENTICAÇÃO POR CLAIMS ---- #
+class AutenticacaoClaimsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.usuario = criar_usuario(cargo="LOGISTICA")
+        cache.clear()
+        caches["carrinho"].clear()
+        # Cópia do carrinho (vazio) já no cache: as requisições medem só a autenticação
+        Carrinho.do_usuario(self.usuario.id)
+
+    def login(self):
+        resposta = self.client.post(reverse("login"), {"email": self.usuario.email, "password": "senha-forte-123"})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {resposta.data['access']}")
+        return resposta.data
+
+    def test_requisicao_autenticada_sem_buscar_usuario(self):
+        self.login()
+        with self.assertNumQueries(0):
+            resposta = self.client.get(reverse("carrinho"))
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_troca_de_cargo_invalida_claims(self):
+        self.login()
+        self.usuario.cargo = "FINANCEIRO"
+        self.usuario.save()
+
+        # Token antigo: versão e usuário relidos do banco, depois só o cache
+        with self.assertNumQueries(2):
+            self.client.get(reverse("carrinho"))
+        with self.assertNumQueries(0):
+            self.client.get(reverse("carrinho"))
+
+        pedido = criar_pedido(self.usuario, status="EM_PROCESSAMENTO")
+        fila = self.client.get(reverse("fila_pedidos")).data["results"]
+        self.assertEqual([p["id"] for p in fila], [pedido.id])
+
+    def test_alteracao_em_outro_processo_vale_quando_a_copia_expira(self):
+        caches["credenciais"].clear()
+        with override_settings(CREDENCIAIS_CACHE_TIMEOUT=0.2):
+            self.login()
+            self.assertEqual(self.client.get(reverse("carrinho")).status_code, 200)
+
+            # Outro worker desativa o usuário: o update não passa pelos signals,
+            # então a cópia da versão neste processo continua a antiga
+            Usuario.objects.filter(id=self.usuario.id).update(
+                is_active=False, versao_credenciais=F("versao_credenciais") + 1
+            )
+            time.sleep(0.25)
+
+            self.assertEqual(self.client.get(reverse("carrinho")).status_code, 401)
+
+    def test_cache_perdido_nao_revalida_token_antigo(self):
+        self.usuario.cargo = "FINANCEIRO"
+        self.usuario.save()
+        self.login()
+        self.assertEqual(self.client.get(reverse("exportar_pedidos")).status_code, 200)
+
+        self.usuario.cargo = "CLIENTE"
+        self.usuario.save()
+        # Cópias da versão despejadas (ou de outro processo): vale o banco
+        caches["credenciais"].clear()
+        cache.clear()
+        self.assertEqual(self.client.get(reverse("exportar_pedidos")).status_code, 403)
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        caches["credenciais"].clear()
+        self.assertEqual(self.client.get(reverse("carrinho")).status_code, 401)
+
+    def test_versao_relida_do_banco_uma_vez(self):
+        self.login()
+        caches["credenciais"].clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse("carrinho")).status_code, 200)
+        with self.assertNumQueries(0):
+            self.client.get(reverse("carrinho"))
+
+    def test_refresh_relê_o_cargo(self):
+        tokens = self.login()
+        self.usuario.cargo = "POS_VENDA"
+        self.usuario.save()
+
+        resposta = self.client.post(reverse("token_refresh"), {"refresh": tokens["refresh"]})
+        access = AccessToken(resposta.data["access"])
+        self.assertEqual(access["cargo"], "POS_VENDA")
+        self.assertEqual(access["uid"], self.usuario.id)
+
+
+# ---- VIEWS ASSÍNCRONAS ---- #
+class RotasAsync:
+    urlpatterns = [path("api/", include("APP.urls_async"))]
+
+
+class ViewsAsyncTests(TestCase):
+    """Cada endpoint responde igual pela view síncrona e pela assíncrona."""
+
+    def setUp(self):
+        cache.clear()
+        caches["carrinho"].clear()
+        self.client = APIClient()
+        self.usuario = criar_usuario()
+        _, self.produtos = criar_catalogo(3)
+        self.autenticar(self.usuario)
+
+    def autenticar(self, usuario):
+        token = TokenUsuarioSerializer.get_token(usuario).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def post(self, nome, dados):
+        return self.client.post(reverse(nome), dados, format="json")
+
+    def nas_duas(self, requisicao):
+        """Executa a requisição pelas rotas síncronas e pelas assíncronas."""
+        sincrona = requisicao()
+        with override_settings(ROOT_URLCONF=RotasAsync):
+            assincrona = requisicao()
+        return sincrona, assincrona
+
+    def assertRespostasIguais(self, sincrona, assincrona):
+        self.assertEqual(assincrona.status_code, sincrona.status_code)
+        self.assertEqual(assincrona.json(), sincrona.json())
+
+    def test_rotas_async_trocam_so_os_endpoints_quentes(self):
+        with override_settings(ROOT_URLCONF=RotasAsync):
+            self.assertEqual(self.client.get(reverse("carrinho")).status_code, 200)
+            self.assertEqual(reverse("lista_produtos"), "/api/produtos/")
+
+    def test_lista_produtos(self):
+        def listar():
+            cache.clear()
+            return self.client.get(reverse("lista_produtos"), {"page_size": 2})
+
+        sincrona, assincrona = self.nas_duas(listar)
+        self.assertRespostasIguais(sincrona, assincrona)
+
+        with override_settings(ROOT_URLCONF=RotasAsync):
+            resposta = self.client.get(reverse("lista_produtos"), {"page_size": 2})
+            with self.assertNumQueries(0):
+                nao_mudou = self.client.get(
+                    reverse("lista_produtos"), {"page_size": 2}, HTTP_IF_NONE_MATCH=resposta["ETag"]
+                )
+        self.assertEqual(nao_mudou.status_code, 304)
+
+    def test_lista_produtos_filtrada_e_paginada_pelo_orm_assincrono(self):
+        # Uma query síncrona dentro da view assíncrona levantaria SynchronousOnlyOperation
+        consultas = [
+            {"page_size": 1, "preco_min": 1},
+            {"categoria": self.produtos[0].categoria_id, "ordering": "-preco", "page_size": 2},
+            {"fields": "id,imagens", "page_size": 2},
+        ]
+        for parametros in consultas:
+            def listar(url=reverse("lista_produtos"), parametros=parametros):
+                cache.clear()
+                return self.client.get(url, parametros)
+
+            sincrona, assincrona = self.nas_duas(listar)
+            self.assertRespostasIguais(sincrona, assincrona)
+
+            # A segunda página, pelo cursor de cada resposta
+            proxima = sincrona.json()["next"]
+            self.assertIsNotNone(proxima)
+            self.assertRespostasIguais(*self.nas_duas(lambda: listar(proxima, {})))
+
+    def test_lista_produtos_campo_desconhecido_nao_entra_no_cache(self):
+        def listar():
+            return self.client.get(reverse("lista_produtos"), {"fields": "bogus"})
+
+        sincrona, assincrona = self.nas_duas(listar)
+        self.assertEqual(assincrona.status_code, 400)
+        self.assertRespostasIguais(sincrona, assincrona)
+
+        # A repetição não acha uma página "200" guardada pela primeira
+        with override_settings(ROOT_URLCONF=RotasAsync):
+            repetida = listar()
+        self.assertEqual(repetida.status_code, 400)
+        self.assertNotIn("ETag", repetida)
+
+    def test_adicionar_ao_carrinho(self):
+        produto = self.produtos[0]
+
+        def adicionar():
+            Carrinho(self.usuario.id).limpar()
+            return self.post("add_carrinho", {"produto_id": produto.id, "quantidade": 2})
+
+        self.assertRespostasIguais(*self.nas_duas(adicionar))
+        self.assertRespostasIguais(*self.nas_duas(lambda: self.post("add_carrinho", {"produto_id": 999})))
+        self.assertRespostasIguais(*self.nas_duas(lambda: self.post("add_carrinho", {"itens": "x"})))
+
+    def test_sem_token(self):
+        self.client.credentials()
+        sincrona, assincrona = self.nas_duas(lambda: self.post("add_carrinho", {"produto_id": 1}))
+        self.assertEqual(assincrona.status_code, 401)
+        self.assertRespostasIguais(sincrona, assincrona)
+
+    def test_criar_pedido_do_carrinho(self):
+        with override_settings(ROOT_URLCONF=RotasAsync):
+            self.post("add_carrinho", {"itens": [{"produto_id": p.id, "quantidade": 2} for p in self.produtos]})
+            with self.captureOnCommitCallbacks(execute=True):
+                resposta = self.post("criar_pedido", {"metodo_pagamento": "PIX"})
+            vazio = self.post("criar_pedido", {"metodo_pagamento": "PIX"})
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.json()["valor_total"], 60)
+        self.assertIsInstance(resposta.json()["valor_total"], float)
+        pedido = Pedido.objects.get(id=resposta.json()["pedido_id"])
+        self.assertEqual(pedido.itens.count(), 3)
+        self.assertEqual(vazio.json(), {"erro": "Nenhum item informado"})
+
+    def test_status_do_pedido(self):
+        logistica = criar_usuario(email="log@exemplo.com", cpf="11111111111", cargo="LOGISTICA")
+        self.autenticar(logistica)
+        pedidos = iter([criar_pedido(self.usuario, status="EM_PREPARACAO") for _ in range(2)])
+
+        sincrona, assincrona = self.nas_duas(
+            lambda: self.post("status_pedido", {"pedido_id": next(pedidos).id, "status": "ENVIADO"})
+        )
+        self.assertRespostasIguais(sincrona, assincrona)
+        self.assertEqual(Pedido.objects.filter(status="ENVIADO").count(), 2)
+
+        for dados in ({"pedido_id": 9999, "status": "ENVIADO"}, {"status": "ENVIADO"}):
+            self.assertRespostasIguais(*self.nas_duas(lambda: self.post("status_pedido", dados)))
+
+
+# ---- IMPORTAÇÃO DE USUÁRIOS ---- #
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ImportUsuariosTests(TestCase):
+    def test_importa_csv_ignorando_duplicados(self):
+        criar_usuario(email="existente@exemplo.com", cpf="99999999999")
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as arquivo:
+            arquivo.write("email,cpf,nome,password,cargo\n")
+            for i in range(5):
+                arquivo.write(f"novo{i}@exemplo.com,{i:011d},Novo {i},senha{i},\n")
+            arquivo.write("existente@exemplo.com,12345678901,Repetido,senha,\n")
+            arquivo.write("outro@exemplo.com,00000000001,CPF repetido,senha,\n")
+            arquivo.write("staff@exemplo.com,77777777777,Staff,senha,logistica\n")
+        self.addCleanup(os.remove, arquivo.name)
+
+        saida = io.StringIO()
+        call_command("import_usuarios", arquivo.name, lote=3, processos=2, stdout=saida, stderr=io.StringIO())
+
+        self.assertIn("6 usuários importados, 2 rejeitados", saida.getvalue())
+        novo = Usuario.objects.get(email="novo3@exemplo.com")
+        self.assertTrue(novo.check_password("senha3"))
+        self.assertEqual(Usuario.objects.get(email="staff@exemplo.com").cargo, "LOGISTICA")
+
+    def test_registro_grava_senha_uma_vez(self):
+        dados = {"email": "api@exemplo.com", "password": "senha-forte-123", "nome": "API", "endereco": "Rua", "cpf": "88888888888"}
+        # Dois SELECTs de unicidade (email, CPF) e um único INSERT
+        with self.assertNumQueries(3):
+            resposta = APIClient().post(reverse("registrar"), dados)
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertTrue(Usuario.objects.get(email="api@exemplo.com").check_password("senha-forte-123"))
+
+
+# ---- IMPORTAÇÃO/EXPORTAÇÃO DO CATÁLOGO ---- #
+class CatalogoImportExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def importar(self, conteudo, sufixo=".jsonl", **opcoes):
+        with tempfile.NamedTemporaryFile("w", suffix=sufixo, delete=False, encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+        self.addCleanup(os.remove, arquivo.name)
+        saida = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("importar_catalogo", arquivo.name, stdout=saida, stderr=io.StringIO(), **opcoes)
+        return saida.getvalue()
+
+    def exportar(self, usuario, **parametros):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return client.get(reverse("exportar_catalogo"), parametros)
+
+    def test_importa_e_atualiza_pelo_codigo(self):
+        registros = [
+            {
+                "codigo": f"SKU-{i}", "nome": f"Mangueira {i}", "descricao": "Flexível", "preco": "19.90",
+                "categoria": "Mangueiras", "imagens": [f"https://img.exemplo/{i}/0.jpg", f"https://img.exemplo/{i}/1.jpg"],
+                "pecas": [{"nome": "Engate", "medida": '1/2"', "peso": "0.10"}],
+            }
+            for i in range(5)
+        ]
+        registros.append({"codigo": "SKU-X", "nome": "Sem preço", "categoria": "Mangueiras"})
+        saida = self.importar("".join(json.dumps(registro) + "\n" for registro in registros), lote=2)
+
+        self.assertIn("5 produtos criados, 0 atualizados, 1 rejeitados", saida)
+        self.assertEqual(ProdutoImagem.objects.count(), 10)
+        self.assertEqual(Peca.objects.count(), 5)
+
+        # Reimportação: atualiza os campos e substitui imagens e peças
+        registros[0].update(nome="Esguicho Turbo", preco="25.00", categoria="Esguichos", imagens=["https://img.exemplo/novo.jpg"], pecas=[])
+        saida = self.importar(json.dumps(registros[0]) + "\n")
+
+        self.assertIn("0 produtos criados, 1 atualizados", saida)
+        produto = Produto.objects.get(codigo="SKU-0")
+        self.assertEqual((produto.nome, str(produto.preco), produto.categoria.nome), ("Esguicho Turbo", "25.00", "Esguichos"))
+        self.assertEqual(list(produto.imagens.values_list("imagem", flat=True)), ["https://img.exemplo/novo.jpg"])
+        self.assertFalse(produto.pecas.exists())
+        self.assertEqual(Produto.objects.count(), 5)
+        self.assertEqual([p.id for p in ResultadoBusca("turbo")[:10]], [produto.id])
+
+    def test_exportacao_reimporta_sem_alteracoes(self):
+        categoria, produtos = criar_catalogo(3)
+        for i, produto in enumerate(produtos):
+            produto.codigo = f"SKU-{i}"
+        Produto.objects.bulk_update(produtos, ["codigo"])
+        Peca.objects.create(produto=produtos[0], nome="Anel", medida='3/4"', peso="1.50")
+        admin = criar_usuario(cargo="ADMIN")
+
+        resposta = self.exportar(admin, formato="csv", categoria=categoria.id)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        self.assertIn('filename="catalogo.csv"', resposta["Content-Disposition"])
+        conteudo = b"".join(resposta.streaming_content).decode()
+        # Imagens na ordem de exibição, não na de criação
+        self.assertIn(f"https://img.exemplo/{produtos[0].id}/0.jpg|https://img.exemplo/{produtos[0].id}/1.jpg", conteudo)
+
+        saida = self.importar(conteudo, sufixo=".csv")
+        self.assertIn("0 produtos criados, 3 atualizados, 0 rejeitados", saida)
+        self.assertEqual(ProdutoImagem.objects.count(), 6)
+        self.assertEqual(Peca.objects.get().peso, Decimal("1.50"))
+
+        linhas = b"".join(self.exportar(admin, formato="jsonl").streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(linha)["codigo"] for linha in linhas], ["SKU-0", "SKU-1", "SKU-2"])
+
+    def test_exportacao_restrita_ao_admin(self):
+        resposta = self.exportar(criar_usuario())
+        self.assertEqual(resposta.status_code, 403)
+        self.assertIn("erro", resposta.json())
+        self.assertEqual(self.exportar(criar_usuario("admin@exemplo.com", "11111111111", "ADMIN"), formato="xml").status_code, 400)
+
+
+# ---- EXPORTAÇÃO DE PEDIDOS ---- #
+class ExportarPedidosTests(TestCase):
+    def setUp(self):
+        self.financeiro = criar_usuario("fin@exemplo.com", "22222222222", "FINANCEIRO")
+        self.cliente = criar_usuario()
+        _, produtos = criar_catalogo(2)
+        self.pedidos = []
+        for i in range(5):
+            pedido = criar_pedido(self.cliente)
+            pedido.itens.set(ItemCarrinho.objects.bulk_create([
+                ItemCarrinho(produto=produto, quantidade=i + 1) for produto in produtos
+            ]))
+            self.pedidos.append(pedido)
+        cartao = CartaoCredito.objects.create(usuario=self.cliente, numero="4111111111111234", nome="Cliente", validade="12/30", cvv="123")
+        Pedido.objects.filter(id=self.pedidos[0].id).update(metodo_pagamento="CARTAO_DE_CREDITO", cartao=cartao)
+        # Um pedido antigo, fora do período
+        Pedido.objects.filter(id=self.pedidos[-1].id).update(data_criacao=timezone.now() - timedelta(days=10))
+
+    def exportar(self, usuario, **parametros):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return client.get(reverse("exportar_pedidos"), parametros)
+
+    def test_periodo_itens_e_cartao_mascarado(self):
+        hoje = timezone.localdate().isoformat()
+        resposta = self.exportar(self.financeiro, formato="jsonl", inicio=hoje, fim=hoje)
+        self.assertEqual(resposta.status_code, 200)
+        registros = [json.loads(linha) for linha in b"".join(resposta.streaming_content).decode().splitlines()]
+
+        self.assertEqual([r["id"] for r in registros], [p.id for p in self.pedidos[:4]])
+        self.assertEqual(registros[0]["cartao"], "**** **** **** 1234")
+        self.assertEqual([item["quantidade"] for item in registros[1]["itens"]], [2, 2])
+        self.assertNotIn("4111111111111234", json.dumps(registros))
+
+    def test_itens_fecham_com_o_valor_total(self):
+        produto = Produto.objects.first()
+        Promocao.objects.create(nome="Dez", percentual=10, produto=produto)
+        item = ItemCarrinho.objects.create(produto=produto, quantidade=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido = criar_pedido_do_pipeline(self.cliente, ItemCarrinho.objects.filter(id=item.id), "PIX")
+        Produto.objects.filter(id=produto.id).update(preco="99.00")
+
+        registro = next(
+            json.loads(linha) for linha in linhas_pedidos("jsonl") if json.loads(linha)["id"] == pedido.id
+        )
+        (exportado,) = registro["itens"]
+        self.assertEqual((exportado["preco_unitario"], exportado["desconto"]), ("10.00", "3.00"))
+        self.assertEqual(
+            Decimal(exportado["preco_unitario"]) * exportado["quantidade"] - Decimal(exportado["desconto"]),
+            Decimal(registro["valor_total"]),
+        )
+
+    def test_blocos_de_tamanho_fixo(self):
+        # 2 queries (pedidos e itens) por bloco; o último bloco incompleto encerra
+        with self.assertNumQueries(6):
+            linhas = list(linhas_pedidos("csv", chunk_size=2))
+        self.assertEqual(len(linhas), 6)
+        self.assertEqual(linhas[0].strip().split(",")[:2], ["id", "data_criacao"])
+
+    def test_comando_e_permissoes(self):
+        saida = io.StringIO()
+        call_command("exportar_pedidos", formato="jsonl", bloco=2, stdout=saida)
+        self.assertEqual(len(saida.getvalue().splitlines()), 5)
+
+        self.assertEqual(self.exportar(self.cliente).status_code, 403)
+        self.assertEqual(self.exportar(self.financeiro, inicio="31/12/2025").status_code, 400)
+
+
+# ---- CONSOLIDADOS DE VENDAS ---- #
+class RelatorioVendasTests(TestCase):
+    def setUp(self):
+        self.cliente = criar_usuario()
+        self.financeiro = criar_usuario("fin@exemplo.com", "22222222222", "FINANCEIRO")
+        self.pos_venda = criar_usuario("pos@exemplo.com", "33333333333", "POS_VENDA")
+        _, self.produtos = criar_catalogo(2)
+        self.pedidos = [self.pedir(quantidade) for quantidade in (1, 2, 3)]
+
+    def pedir(self, quantidade):
+        itens = ItemCarrinho.objects.bulk_create([
+            ItemCarrinho(produto=produto, quantidade=quantidade) for produto in self.produtos
+        ])
+        return criar_pedido_do_pipeline(self.cliente, ItemCarrinho.objects.filter(id__in=[i.id for i in itens]), "PIX")
+
+    def mudar_status(self, usuario, pedido, status):
+        client = APIClient()
+        client.force_authenticate(usuario)
+        return client.post(reverse("status_pedido"), {"pedido_id": pedido.id, "status": status}, format="json")
+
+    def consolidados(self):
+        return (
+            list(VendaDiariaProduto.objects.order_by("dia", "produto_id").values("dia", "produto_id", *METRICAS)),
+            list(VendaDiariaCategoria.objects.order_by("dia", "categoria_id").values("dia", "categoria_id", *METRICAS)),
+        )
+
+    def test_eventos_incrementais_e_reconstrucao(self):
+        self.assertEqual(self.mudar_status(self.financeiro, self.pedidos[0], "PAGAMENTO_APROVADO").status_code, 200)
+        atualizar_status_em_lote(self.financeiro, "FINANCEIRO", [self.pedidos[1].id, self.pedidos[2].id], "PAGAMENTO_APROVADO")
+        # Devolução de um dos dois itens do pedido de 3 unidades cada
+        Pedido.objects.filter(id=self.pedidos[2].id).update(status="EM_DEVOLUCAO")
+        Devolucao.objects.create(pedido=self.pedidos[2], item=self.pedidos[2].itens.first(), motivo="Vazando")
+        self.assertEqual(self.mudar_status(self.pos_venda, self.pedidos[2], "DEVOLVIDO").status_code, 200)
+
+        categoria = VendaDiariaCategoria.objects.get()
+        self.assertEqual((categoria.unidades, categoria.valor_bruto), (12, Decimal("120.00")))
+        self.assertEqual((categoria.unidades_aprovadas, categoria.valor_aprovado), (12, Decimal("120.00")))
+        self.assertEqual((categoria.unidades_devolvidas, categoria.valor_devolvido), (3, Decimal("30.00")))
+
+        incrementais = self.consolidados()
+        self.assertEqual(reconstruir_vendas(bloco=2), 3)
+        self.assertEqual(self.consolidados(), incrementais)
+
+    def test_cancelamento_pela_api(self):
+        admin = criar_usuario("admin@exemplo.com", "44444444444", "ADMIN")
+        self.assertEqual(self.mudar_status(self.financeiro, self.pedidos[0], "CANCELADO").status_code, 200)
+        self.assertEqual(self.mudar_status(self.financeiro, self.pedidos[1], "PAGAMENTO_REPROVADO").status_code, 200)
+        self.assertEqual(self.mudar_status(admin, self.pedidos[1], "CANCELADO").status_code, 200)
+        # Depois da aprovação não há cancelamento
+        self.mudar_status(self.financeiro, self.pedidos[2], "PAGAMENTO_APROVADO")
+        self.assertEqual(self.mudar_status(admin, self.pedidos[2], "CANCELADO").status_code, 403)
+
+        categoria = VendaDiariaCategoria.objects.get()
+        self.assertEqual((categoria.unidades_canceladas, categoria.valor_cancelado), (6, Decimal("60.00")))
+        self.assertEqual(categoria.unidades_aprovadas, 6)
+
+        incrementais = self.consolidados()
+        reconstruir_vendas()
+        self.assertEqual(self.consolidados(), incrementais)
+
+    def test_precos_congelados_no_checkout(self):
+        pedido = self.pedidos[1]
+        Produto.objects.filter(id=self.produtos[0].id).update(preco="99.00")
+        self.assertEqual(self.mudar_status(self.financeiro, pedido, "PAGAMENTO_APROVADO").status_code, 200)
+
+        # Aprovação com o preço do checkout, não o atual: bate com a criação
+        categoria = VendaDiariaCategoria.objects.get()
+        self.assertEqual((categoria.valor_bruto, categoria.valor_aprovado), (Decimal("120.00"), Decimal("40.00")))
+        self.assertEqual(
+            set(pedido.itens.values_list("preco_unitario", "desconto")), {(Decimal("10.00"), Decimal("0.00"))}
+        )
+
+        incrementais = self.consolidados()
+        reconstruir_vendas()
+        self.assertEqual(self.consolidados(), incrementais)
+
+    def test_relatorio_le_so_os_consolidados(self):
+        self.mudar_status(self.financeiro, self.pedidos[0], "PAGAMENTO_APROVADO")
+        client = APIClient()
+        client.force_authenticate(self.financeiro)
+
+        with self.assertNumQueries(2):
+            resposta = client.get(reverse("relatorio_vendas"), {"agrupar": "produto"})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data["totais"]["unidades"], 12)
+        self.assertEqual(resposta.data["totais"]["receita_liquida"], "20.00")
+        self.assertEqual([linha["nome"] for linha in resposta.data["resultados"]], ["Produto 0", "Produto 1"])
+
+        self.assertEqual(client.get(reverse("relatorio_vendas"), {"agrupar": "mes"}).status_code, 400)
+        client.force_authenticate(self.cliente)
+        self.assertEqual(client.get(reverse("relatorio_vendas")).status_code, 403)
+
+
+# ---- JSON E COMPRESSÃO ---- #
+class JSONRapidoTests(TestCase):
+    def test_mesma_saida_do_renderer_padrao(self):
+        dados = {
+            "nome": "Mangueira ½\u2028", "ids": (1, 2), 3: None, "nota": 4.5,
+            "data": datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+        }
+        self.assertEqual(JSONRendererRapido().render(dados), JSONRenderer().render(dados))
+        # Decimal montado à mão sai número, como no encoder do DRF
+        decimais = {"preco": Decimal("10.50"), "itens": [{"total": Decimal("3")}]}
+        self.assertEqual(JSONRendererRapido().render(decimais), JSONRenderer().render(decimais))
+        self.assertEqual(JSONRendererRapido().render(decimais), b'{"preco":10.5,"itens":[{"total":3.0}]}')
+
+    def test_parser(self):
+        self.assertEqual(JSONParserRapido().parse(io.BytesIO('{"a": [1, "ç"]}'.encode())), {"a": [1, "ç"]})
+        with self.assertRaises(ParseError):
+            JSONParserRapido().parse(io.BytesIO(b'{"a": NaN}'))
+
+
+class CompressaoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = reverse("lista_produtos")
+
+    def test_escolhe_codificacao(self):
+        self.assertEqual(escolher_codificacao("gzip, deflate"), "gzip")
+        self.assertIsNone(escolher_codificacao("gzip;q=0, identity"))
+        self.assertIsNone(escolher_codificacao(""))
+
+    def test_comprime_acima_do_limite(self):
+        criar_catalogo(50)
+        resposta = self.client.get(self.url, {"page_size": 50}, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(resposta["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", resposta["Vary"])
+        self.assertEqual(len(json.loads(zlib.decompress(resposta.content, 16 + zlib.MAX_WBITS))["results"]), 50)
+
+        # O ETag fraco da resposta comprimida continua valendo para o 304
+        repetida = self.client.get(
+            self.url, {"page_size": 50}, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=resposta["ETag"]
+        )
+        self.assertTrue(resposta["ETag"].startswith("W/"))
+        self.assertEqual(repetida.status_code, 304)
+
+    def test_resposta_pequena_sai_sem_compressao(self):
+        criar_catalogo(1)
+        resposta = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertFalse(resposta.has_header("Content-Encoding"))
+
+    def test_streaming_comprimido(self):
+        criar_catalogo(30)
+        admin = criar_usuario(cargo="ADMIN")
+        self.client.force_authenticate(admin)
+        resposta = self.client.get(reverse("exportar_catalogo"), {"formato": "jsonl"}, HTTP_ACCEPT_ENCODING="gzip")
+
+        linhas = zlib.decompress(b"".join(resposta.streaming_content), 16 + zlib.MAX_WBITS).decode().splitlines()
+        self.assertEqual(resposta["Content-Encoding"], "gzip")
+        self.assertEqual(len(linhas), 30)
+
+
+# ---- ROTEAMENTO LEITURA/ESCRITA ---- #
+@override_settings(DATABASE_READ_ALIAS="replica")
+class RoteamentoTests(TestCase):
+    def setUp(self):
+        self.roteador = RoteadorLeituraEscrita()
+
+    def test_leitura_fora_das_views_de_catalogo_usa_principal(self):
+        self.assertIsNone(self.roteador.db_for_read(Produto))
+
+    def test_views_de_catalogo_leem_da_replica(self):
+        with leitura_na_replica():
+            self.assertEqual(self.roteador.db_for_read(Produto), "replica")
+
+    def test_fixa_no_principal_depois_de_escrever(self):
+        with leitura_na_replica():
+            self.assertEqual(self.roteador.db_for_write(Pedido), "default")
+            self.assertIsNone(self.roteador.db_for_read(Pedido))
+
+        # A fixação vale só para a requisição em que houve escrita
+        with leitura_na_replica():
+            self.assertEqual(self.roteador.db_for_read(Produto), "replica")
+
+    @override_settings(DATABASE_READ_ALIAS=None)
+    def test_sem_replica_configurada(self):
+        with leitura_na_replica():
+            self.assertIsNone(self.roteador.db_for_read(Produto))
+
+
+@override_settings(DATABASE_READ_ALIAS="replica")
+class RoteamentoReplicaTests(TestCase):
+    """
+    Com um segundo banco de verdade no alias "replica", separado do principal:
+    o que cada rota enxerga diz de qual banco ela leu. O alias só existe
+    durante a classe, então entra em databases depois de criado.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings["replica"] = connections.configure_settings({
+            "default": connections.settings["default"],
+            "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"},
+        })["replica"]
+        connections["replica"].creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        cls.databases = {"default", "replica"}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].creation.destroy_test_db(":memory:", verbosity=0)
+        del connections["replica"]
+        del connections.settings["replica"]
+
+    def setUp(self):
+        cache.clear()
+        caches["carrinho"].clear()
+        self.client = APIClient()
+        _, self.produtos = criar_catalogo(2, imagens_por_produto=0)
+        categoria = Categoria.objects.using("replica").create(nome="Réplica")
+        self.da_replica = Produto.objects.using("replica").create(
+            nome="Só na réplica", descricao="", preco="10.00", categoria=categoria,
+        )
+
+    def test_catalogo_le_da_replica(self):
+        lista = self.client.get(reverse("lista_produtos")).json()
+        detalhe = self.client.get(reverse("detalhe_produto", args=[self.da_replica.id]))
+
+        self.assertEqual([produto["nome"] for produto in lista["results"]], ["Só na réplica"])
+        self.assertEqual(detalhe.json()["nome"], "Só na réplica")
+
+    def test_leitura_depois_de_escrever_fica_no_principal(self):
+        with leitura_na_replica():
+            self.assertFalse(Produto.objects.filter(nome="Produto 0").exists())
+            Produto.objects.create(nome="Novo", descricao="", preco="1.00", categoria_id=self.produtos[0].categoria_id)
+            self.assertTrue(Produto.objects.filter(nome="Novo").exists())
+
+        self.assertFalse(Produto.objects.using("replica").filter(nome="Novo").exists())
+
+    def test_pedidos_ficam_no_principal(self):
+        self.client.force_authenticate(criar_usuario())
+        self.client.post(reverse("add_carrinho"), {"produto_id": self.produtos[1].id}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post(reverse("criar_pedido"), {"metodo_pagamento": "PIX"}, format="json")
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertTrue(Pedido.objects.using("default").filter(id=resposta.json()["pedido_id"]).exists())
+        self.assertFalse(Pedido.objects.using("replica").exists())
+
+
+# ---- MÉTRICAS ---- #
+class MetricasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registro.limpar()
+        criar_catalogo(3)
+
+    def metricas(self):
+        return self.client.get(reverse("metricas")).content.decode()
+
+    def test_latencia_queries_e_tamanho_por_rota(self):
+        resposta = self.client.get(reverse("lista_produtos"))
+        texto = self.metricas()
+
+        self.assertIn('mangeira_requisicao_segundos_count{rota="lista_produtos"} 1', texto)
+        self.assertIn('mangeira_queries_por_requisicao_sum{rota="lista_produtos"} 2.0', texto)
+        self.assertIn('mangeira_queries_por_requisicao_bucket{rota="lista_produtos",le="1"} 0', texto)
+        self.assertIn('mangeira_queries_por_requisicao_bucket{rota="lista_produtos",le="2"} 1', texto)
+        self.assertIn(f'mangeira_resposta_bytes_sum{{rota="lista_produtos"}} {float(len(resposta.content))}', texto)
+        self.assertIn('mangeira_requisicoes_total{rota="lista_produtos",status="200"} 1.0', texto)
+
+    @override_settings(ROOT_URLCONF=RotasAsync)
+    def test_queries_das_views_assincronas(self):
+        self.client.get(reverse("lista_produtos"))
+        self.assertIn('mangeira_queries_por_requisicao_sum{rota="lista_produtos"} 2.0', self.metricas())
+
+    @override_settings(METRICAS_QUERY_LENTA_MS=0)
+    def test_query_lenta_registra_a_rota(self):
+        with self.assertLogs("APP.metricas", "WARNING") as logs:
+            self.client.get(reverse("lista_produtos"))
+        self.assertIn("na rota lista_produtos: SELECT", logs.output[0])
+        self.assertIn('mangeira_queries_lentas_total{rota="lista_produtos"} 2.0', self.metricas())
+
+    @override_settings(METRICAS_TOKEN="segredo")
+    def test_token_do_scraper(self):
+        self.assertEqual(self.client.get(reverse("metricas")).status_code, 401)
+        resposta = self.client.get(reverse("metricas"), headers={"Authorization": "Bearer segredo"})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn("# TYPE mangeira_requisicao_segundos histogram", resposta.content.decode())
+
+
+# ---- ADMIN ---- #
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_superuser(
+            email="admin@exemplo.com", password="senha-forte-123", nome="Admin", cpf="99999999999"
+        )
+        self.client.force_login(self.admin)
+
+    def test_changelists_com_queries_constantes(self):
+        _, produtos = criar_catalogo(2, imagens_por_produto=1)
+        usuario = criar_usuario()
+        for produto in produtos:
+            Peca.objects.create(produto=produto, nome="Engate", medida="3/4", peso="0.12")
+            criar_pedido(usuario).itens.add(ItemCarrinho.objects.create(produto=produto))
+
+        for modelo in ["peca", "pedido", "itemcarrinho", "produtoimagem", "produto", "usuario"]:
+            with self.subTest(modelo=modelo):
+                url = reverse(f"admin:APP_{modelo}_changelist")
+                with CaptureQueriesContext(connection) as poucos:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+                _, mais = criar_catalogo(20, imagens_por_produto=1)
+                Peca.objects.bulk_create([Peca(produto=p, nome="Engate", medida="3/4", peso="0.12") for p in mais])
+                ItemCarrinho.objects.bulk_create([ItemCarrinho(produto=p) for p in mais])
+                Pedido.objects.bulk_create([
+                    Pedido(usuario=usuario, valor_total="1.00", metodo_pagamento="PIX", status="RECEBIDO")
+                    for _ in range(20)
+                ])
+                with CaptureQueriesContext(connection) as muitos:
+                    self.client.get(url)
+
+                self.assertEqual(len(poucos), len(muitos))
+
+    def test_pedido_nao_carrega_todos_os_itens(self):
+        _, produtos = criar_catalogo(1, imagens_por_produto=0)
+        ItemCarrinho.objects.bulk_create([ItemCarrinho(produto=produtos[0]) for _ in range(200)])
+        pedido = criar_pedido(criar_usuario())
+
+        resposta = self.client.get(reverse("admin:APP_pedido_change", args=[pedido.id]))
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertContains(resposta, "vManyToManyRawIdAdminField")
+        self.assertNotContains(resposta, f"Produto 0 x 1</option>")
+        # Status só pela API, que mantém os consolidados de vendas
+        self.assertNotContains(resposta, 'name="status"')
+
+    def test_contagem_estimada_sem_count(self):
+        criar_catalogo(30, imagens_por_produto=0)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+        paginador = PaginadorEstimado(Produto.objects.order_by("id"), 10)
+        paginador.limite_exato = 10
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(paginador.count, 30)
+        self.assertNotIn("COUNT(", consultas[0]["sql"])
+
+        # Com filtro, a contagem é exata
+        filtrado = PaginadorEstimado(Produto.objects.filter(nome="Produto 1").order_by("id"), 10)
+        filtrado.limite_exato = 10
+        self.assertEqual(filtrado.count, 1)
+
+
+# ---- ORÇAMENTO DE QUERIES POR ROTA ---- #
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class OrcamentoQueriesTests(TransactionTestCase):
+    """
+    Os mesmos cenários do benchmark_endpoints, sem os limites de latência.
+    TransactionTestCase: em autocommit os on_commit rodam dentro da
+    requisição, como em produção, e entram na conta.
+    """
+
+    def setUp(self):
+        cache.clear()
+        caches["carrinho"].clear()
+        self.tamanhos = gerar_dados(produtos=300, usuarios=30, pedidos=60, avaliacoes=40, lote=100)
+        self.contexto = Contexto()
+
+    def test_gerar_dados(self):
+        self.assertEqual(self.tamanhos["produtos"], 300)
+        self.assertEqual(ProdutoImagem.objects.count(), 900)
+        self.assertEqual(Pedido.objects.exclude(usuario=self.contexto.cliente).count(), 60)
+        self.assertTrue(ResultadoBusca("mangueira").count())
+        self.assertEqual(sum(Produto.objects.values_list("total_avaliacoes", flat=True)), Avaliacao.objects.count())
+
+        # Datas espalhadas pelo último ano, crescendo com o id
+        sinteticos = Pedido.objects.exclude(usuario=self.contexto.cliente).order_by("id")
+        datas = list(sinteticos.values_list("data_criacao", flat=True))
+        self.assertEqual(datas, sorted(datas))
+        self.assertGreater(datas[-1] - datas[0], timedelta(days=300))
+        self.assertGreater(datas[0], timezone.now() - timedelta(days=366))
+
+    def test_todas_as_rotas_tem_cenario(self):
+        rotas = {rota.name for rota in rotas_api.urlpatterns}
+        self.assertEqual(rotas - {cenario.rota for cenario in CENARIOS}, set())
+
+    def test_cenarios_dentro_do_orcamento(self):
+        for cenario in CENARIOS:
+            with self.subTest(cenario=cenario.nome):
+                resultado = executar_cenario(cenario, self.contexto, repeticoes=2)
+                self.assertEqual(violacoes(cenario, resultado, fator_latencia=0), [])
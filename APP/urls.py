@@ -1,11 +1,24 @@
 from django.urls import path
 from .views import (
     ListaProdutosView,
+    BuscaProdutosView,
+    ExportarCatalogoView,
     AddCarrinhoView,
+    CarrinhoView,
+    CotacaoCarrinhoView,
     CriarPedidoView,
     StatusPedidoView,
-    AvaliarProdutoView,RegistrarUsuarioView,RegistrarDevolucaoView
+    StatusPedidoLoteView,
+    HistoricoPedidosView,
+    ExportarPedidosView,
+    FilaPedidosView,
+    ReservarPedidosView,
+    LiberarReservaView,
+    AvaliarProdutoView,RegistrarUsuarioView,RegistrarDevolucaoView,
+    RelatorioVendasView,
+    detalhe_produto,
 )
+from .metricas import metricas
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -14,6 +27,9 @@ from rest_framework_simplejwt.views import (
 urlpatterns = [
  
     path('produtos/', ListaProdutosView.as_view(), name='lista_produtos'),
+    path('produtos/<int:produto_id>/', detalhe_produto, name='detalhe_produto'),
+    path('produtos/busca/', BuscaProdutosView.as_view(), name='busca_produtos'),
+    path('produtos/exportar/', ExportarCatalogoView.as_view(), name='exportar_catalogo'),
 
     path("registrar/", RegistrarUsuarioView.as_view(), name="registrar"),
 
@@ -21,11 +37,24 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
    
+    path('carrinho/', CarrinhoView.as_view(), name='carrinho'),
     path('carrinho/add/', AddCarrinhoView.as_view(), name='add_carrinho'),
+    path('carrinho/cotacao/', CotacaoCarrinhoView.as_view(), name='cotacao_carrinho'),
     path('pedido/criar/', CriarPedidoView.as_view(), name='criar_pedido'),
     path('pedido/status/', StatusPedidoView.as_view(), name='status_pedido'),
-    path("pedido/devolucao/", RegistrarDevolucaoView.as_view()),
+    path('pedido/status/lote/', StatusPedidoLoteView.as_view(), name='status_pedido_lote'),
+    path("pedido/devolucao/", RegistrarDevolucaoView.as_view(), name="registrar_devolucao"),
+
+    path('pedidos/', HistoricoPedidosView.as_view(), name='historico_pedidos'),
+    path('pedidos/exportar/', ExportarPedidosView.as_view(), name='exportar_pedidos'),
+    path('pedidos/fila/', FilaPedidosView.as_view(), name='fila_pedidos'),
+    path('pedidos/fila/reservar/', ReservarPedidosView.as_view(), name='reservar_pedidos'),
+    path('pedidos/fila/liberar/', LiberarReservaView.as_view(), name='liberar_reserva'),
 
     
     path('produto/avaliar/', AvaliarProdutoView.as_view(), name='avaliar_produto'),
+
+    path('relatorios/vendas/', RelatorioVendasView.as_view(), name='relatorio_vendas'),
+
+    path('metricas/', metricas, name='metricas'),
 ]
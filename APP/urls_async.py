@@ -0,0 +1,24 @@
+from django.urls import path
+
+from . import urls
+from .views_async import (
+    AddCarrinhoAsyncView,
+    CriarPedidoAsyncView,
+    ListaProdutosAsyncView,
+    StatusPedidoAsyncView,
+)
+
+# Mesmas rotas (e nomes) de APP/urls.py, trocando só os endpoints que têm
+# versão assíncrona. Selecionado por API_ASYNC em MANGEMANGEIRA/urls.py.
+VIEWS_ASYNC = {
+    "lista_produtos": ListaProdutosAsyncView,
+    "add_carrinho": AddCarrinhoAsyncView,
+    "criar_pedido": CriarPedidoAsyncView,
+    "status_pedido": StatusPedidoAsyncView,
+}
+
+urlpatterns = [
+    path(str(rota.pattern), VIEWS_ASYNC[rota.name].as_view(), name=rota.name)
+    if rota.name in VIEWS_ASYNC else rota
+    for rota in urls.urlpatterns
+]
@@ -1,18 +1,247 @@
+from datetime import date, timedelta
+
 from rest_framework import generics
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .serializers import ProdutoSerializer, UsuarioSerializer
-from .models import Produto, ItemCarrinho, Pedido, Avaliacao, CartaoCredito,Devolucao
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
+from .avaliacoes import registrar_nota
+from .busca import ResultadoBusca
+from .carrinho import ACOES, Carrinho, CarrinhoConcorrente, QuantidadeInvalida, produtos_inexistentes
+from .cache import chave_pagina, etag_confere, invalidar_catalogo, obter_ou_calcular
+from .detalhe import descartar_detalhes, documento_produto
+from .exportacao import FORMATOS, intervalo_datas, linhas_catalogo, linhas_pedidos
+from .filters import PedidoFilter, ProdutoFilter
+from .serializers import PedidoFilaSerializer, PedidoSerializer, ProdutoSerializer, UsuarioSerializer
+from .models import Produto, ItemCarrinho, Pedido, Avaliacao
+from .promocoes import METODOS
+from .pagination import BuscaPagination, FilaCursorPagination, HistoricoCursorPagination, ProdutoCursorPagination
+from .relatorios import AGRUPAMENTOS, relatorio_vendas
+from .roteamento import LeituraReplicaMixin, leitura_na_replica
+from .serializacao import LEITOR_PEDIDO, LEITOR_PRODUTO, CampoDesconhecido
+from .pedidos import (
+    ITEM_EM_DEVOLUCAO, ITEM_FORA_DO_PEDIDO, MOTIVO_OBRIGATORIO, SEM_RESERVA, CarrinhoVazio, PedidoVazio,
+    ProdutosIndisponiveis, StatusConcorrente, atualizar_status_em_lote, criar_pedido, fechar_carrinho, fila_do_cargo,
+    liberar_reserva, registrar_devolucoes, reservar_pedidos, salvar_status,
+)
+from .status import gerar_codigo_rastreio, pode_alterar, transicao_valida
 
 # ---- REGISTRAR USUÁRIO ---- #
 class RegistrarUsuarioView(generics.CreateAPIView):
     serializer_class = UsuarioSerializer
 
 
+# ---- LISTAGENS POR VALUES() ---- #
+class LeitorValoresMixin:
+    """
+    Lista servida por um Leitor (APP/serializacao.py) em vez do serializer:
+    a mesma saída, sem instâncias de modelo. ?fields=a,b escolhe os campos.
+    """
+    leitor = None
+
+    def get_leitor(self):
+        return self.leitor.selecionar(self.request.query_params.get("fields"))
+
+    def list(self, request, *args, **kwargs):
+        try:
+            leitor = self.get_leitor()
+        except CampoDesconhecido as exc:
+            return Response({"erro": str(exc)}, status=400)
+        pagina = self.paginate_queryset(leitor.linhas(self.filter_queryset(self.get_queryset())))
+        return self.get_paginated_response(leitor.serializar(pagina))
+
+
 # ---- LISTA PRODUTOS ---- #
-class ListaProdutosView(generics.ListAPIView):
+class ListaProdutosView(LeituraReplicaMixin, LeitorValoresMixin, generics.ListAPIView):
+    # Categoria via JOIN e imagens em uma única query extra, já ordenadas:
+    # o número de queries por página é constante.
     queryset = Produto.objects.all()
+    leitor = LEITOR_PRODUTO
+    # Só documenta o formato (API navegável): a saída vem do leitor
     serializer_class = ProdutoSerializer
+    pagination_class = ProdutoCursorPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_class = ProdutoFilter
+    # total_avaliacoes é a medida de popularidade; a paginação acrescenta o id
+    # como desempate (ver com_desempate) e cada ordem tem o índice (campo, id)
+    ordering_fields = ["id", "preco", "media_avaliacao", "total_avaliacoes"]
+
+    def list(self, request, *args, **kwargs):
+        # ?fields= inválido não pode virar uma página em cache
+        try:
+            self.get_leitor()
+        except CampoDesconhecido as exc:
+            return Response({"erro": str(exc)}, status=400)
+
+        chave, etag = chave_pagina(request)
+
+        # Catálogo não mudou desde a última resposta do cliente: nem toca no banco
+        if etag_confere(etag, request.headers.get("If-None-Match", "")):
+            response = Response(status=304)
+        else:
+            response = Response(obter_ou_calcular(chave, lambda: self.montar_pagina(request, *args, **kwargs)))
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+    def montar_pagina(self, request, *args, **kwargs):
+        """Filtra, pagina e serializa a página, sem passar pelo cache."""
+        return super().list(request, *args, **kwargs).data
+
+
+# ---- DETALHE DO PRODUTO ---- #
+# View Django pura: o documento já vem serializado (APP/detalhe.py), então
+# não passa por autenticação, negociação de conteúdo nem serializer do DRF.
+@require_GET
+def detalhe_produto(request, produto_id):
+    with leitura_na_replica():
+        documento = documento_produto(produto_id)
+    if documento is None:
+        return JsonResponse({"erro": "Produto não encontrado"}, status=404)
+    return HttpResponse(documento, content_type="application/json")
+
+
+# ---- BUSCA DE PRODUTOS ---- #
+class BuscaProdutosView(LeituraReplicaMixin, LeitorValoresMixin, generics.ListAPIView):
+    queryset = Produto.objects.all()
+    leitor = LEITOR_PRODUTO
+    serializer_class = ProdutoSerializer
+    pagination_class = BuscaPagination
+    filter_backends = []
+
+    def list(self, request, *args, **kwargs):
+        termo = request.query_params.get("q", "").strip()
+        if not termo:
+            return Response({"erro": "Informe o termo de busca no parâmetro q"}, status=400)
+
+        try:
+            leitor = self.get_leitor()
+        except CampoDesconhecido as exc:
+            return Response({"erro": str(exc)}, status=400)
+
+        resultados = ResultadoBusca(termo, leitor.linhas(self.get_queryset()))
+        pagina = self.paginate_queryset(resultados)
+        return self.get_paginated_response(leitor.serializar(pagina))
+
+
+# ---- EXPORTAR CATÁLOGO ---- #
+class ExportarCatalogoView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.cargo.upper() != "ADMIN":
+            return Response({"erro": "Apenas administradores podem exportar o catálogo!"}, status=403)
+
+        formato = request.query_params.get("formato", "csv")
+        if formato not in FORMATOS:
+            return Response({"erro": "formato deve ser csv ou jsonl!"}, status=400)
+
+        categoria = request.query_params.get("categoria")
+        if categoria is not None and not categoria.isdigit():
+            return Response({"erro": "categoria inválida!"}, status=400)
+
+        response = StreamingHttpResponse(linhas_catalogo(formato, categoria), content_type=FORMATOS[formato])
+        response["Content-Disposition"] = f'attachment; filename="catalogo.{formato}"'
+        return response
+
+
+# ---- CARRINHO ---- #
+def _validar_operacoes(operacoes):
+    """Erros de formato e ids dos produtos que precisam existir, sem tocar no banco."""
+    erros = []
+    novos_produtos = set()
+    for indice, operacao in enumerate(operacoes):
+        if not isinstance(operacao, dict) or operacao.get("acao") not in ACOES:
+            erros.append({"operacao": indice, "erro": "Ação inválida! Use adicionar, definir ou remover."})
+            continue
+        try:
+            produto_id = int(operacao.get("produto_id"))
+        except (TypeError, ValueError):
+            erros.append({"operacao": indice, "erro": "produto_id inválido!"})
+            continue
+        if operacao["acao"] != "remover":
+            novos_produtos.add(produto_id)
+    return erros, novos_produtos
+
+
+def _erros_inexistentes(produto_ids):
+    return [{"produto_id": produto_id, "erro": "Produto não encontrado"} for produto_id in sorted(produto_ids)]
+
+
+def _aplicacao(operacoes):
+    """As operações como função do carrinho: reaplicadas se a gravação encontrar conflito."""
+    def aplicar(carrinho):
+        for operacao in operacoes:
+            ACOES[operacao["acao"]](carrinho, operacao["produto_id"], operacao.get("quantidade", 1))
+    return aplicar
+
+
+ERROS_QUANTIDADE = [{"erro": "A quantidade deve ser um número inteiro positivo!"}]
+ERRO_CONCORRENTE = {"erro": "O carrinho foi alterado por outra requisição, tente novamente!"}
+ERRO_STATUS_CONCORRENTE = {"erro": "O status do pedido foi alterado por outra requisição, tente novamente!"}
+
+
+def _aplicar_operacoes(usuario_id, operacoes):
+    """
+    Valida todas as operações (uma query para os produtos) antes de gravar o
+    carrinho. Devolve (carrinho, erros); CarrinhoConcorrente sobe para a view.
+    """
+    erros, novos_produtos = _validar_operacoes(operacoes)
+    if not erros and novos_produtos:
+        erros = _erros_inexistentes(produtos_inexistentes(novos_produtos))
+    if erros:
+        return None, erros
+
+    try:
+        return Carrinho.alterar(usuario_id, _aplicacao(operacoes)), []
+    except QuantidadeInvalida:
+        return None, ERROS_QUANTIDADE
+
+
+def _itens_para_adicionar(dados):
+    """Aceita um único produto_id/quantidade ou a lista `itens`."""
+    itens = dados.get("itens")
+    if itens is None:
+        itens = [{"produto_id": dados.get("produto_id"), "quantidade": dados.get("quantidade", 1)}]
+    if not isinstance(itens, list):
+        return None
+    return [dict(item, acao="adicionar") if isinstance(item, dict) else item for item in itens]
+
+
+def _status_erros_carrinho(erros):
+    return 404 if all(e.get("erro") == "Produto não encontrado" for e in erros) else 400
+
+
+class CarrinhoView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(Carrinho.do_usuario(request.user.id).resumo())
+
+    def post(self, request):
+        operacoes = request.data.get("operacoes")
+        if not isinstance(operacoes, list) or not operacoes:
+            return Response({"erro": "Informe a lista de operacoes!"}, status=400)
+
+        try:
+            carrinho, erros = _aplicar_operacoes(request.user.id, operacoes)
+        except CarrinhoConcorrente:
+            return Response(ERRO_CONCORRENTE, status=409)
+        if erros:
+            return Response({"erro": "Carrinho não alterado", "detalhes": erros}, status=400)
+
+        return Response({"mensagem": "Carrinho atualizado", "itens": carrinho.itens})
+
+    def delete(self, request):
+        Carrinho(request.user.id).limpar()
+        return Response(status=204)
 
 
 # ---- ADICIONA ITEM AO CARRINHO ---- #
@@ -20,26 +249,52 @@ class AddCarrinhoView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        produto_id = request.data.get("produto_id")
-        quantidade = request.data.get("quantidade", 1)
+        operacoes = _itens_para_adicionar(request.data)
+        if operacoes is None:
+            return Response({"erro": "itens deve ser uma lista!"}, status=400)
 
         try:
-            produto = Produto.objects.get(id=produto_id)
-        except Produto.DoesNotExist:
-            return Response({"erro": "Produto não encontrado"}, status=404)
-
-        item = ItemCarrinho.objects.create(
-            produto=produto,
-            quantidade=quantidade
-        )
+            carrinho, erros = _aplicar_operacoes(request.user.id, operacoes)
+        except CarrinhoConcorrente:
+            return Response(ERRO_CONCORRENTE, status=409)
+        if erros:
+            return Response({"erro": erros[0]["erro"], "detalhes": erros}, status=_status_erros_carrinho(erros))
 
         return Response({
             "mensagem": "Item adicionado ao carrinho",
-            "item_id": item.id
+            "itens": carrinho.itens
         })
 
 
+# ---- COTAÇÃO DO CARRINHO ---- #
+class CotacaoCarrinhoView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        metodo_pagamento = request.query_params.get("metodo_pagamento")
+        if metodo_pagamento and metodo_pagamento not in METODOS:
+            return Response({"erro": "Método de pagamento inválido!"}, status=400)
+        return Response(Carrinho.do_usuario(request.user.id).cotacao(metodo_pagamento))
+
+
 # ---- CRIAR PEDIDO ---- #
+def _erros_indisponiveis(produto_ids):
+    """Produtos que saíram do catálogo: o cliente decide se remove e tenta de novo."""
+    return {
+        "erro": "Produtos do carrinho não estão mais disponíveis!",
+        "detalhes": _erros_inexistentes(produto_ids),
+    }
+
+
+def _dados_cartao(dados):
+    return {
+        "numero": dados.get("numero_cartao"),
+        "nome": dados.get("nome_cartao"),
+        "validade": dados.get("validade"),
+        "cvv": dados.get("cvv"),
+    }
+
+
 class CriarPedidoView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
@@ -47,73 +302,117 @@ class CriarPedidoView(generics.GenericAPIView):
         itens_ids = request.data.get("itens")
         metodo_pagamento = request.data.get("metodo_pagamento")
 
-        if not itens_ids:
-            return Response({"erro": "Nenhum item informado"}, status=400)
-
-        itens = ItemCarrinho.objects.filter(id__in=itens_ids)
-
-        if not itens.exists():
-            return Response({"erro": "Nenhum item encontrado"}, status=400)
-
         # Validação específica para cartão
-        numero = nome = validade = cvv = None
+        dados_cartao = None
         if metodo_pagamento == "CARTAO":
-            numero = request.data.get("numero_cartao")
-            nome = request.data.get("nome_cartao")
-            validade = request.data.get("validade")
-            cvv = request.data.get("cvv")
+            dados_cartao = _dados_cartao(request.data)
 
-            if not all([numero, nome, validade, cvv]):
+            if not all(dados_cartao.values()):
                 return Response({"erro": "Dados do cartão incompletos!"}, status=400)
 
-        total = sum(i.produto.preco * i.quantidade for i in itens)
-
-        pedido = Pedido.objects.create(
-            usuario=request.user,
-            valor_total=total,
-            valor_desconto=0,
-            metodo_pagamento=metodo_pagamento,
-            status="EM_PROCESSAMENTO"
-        )
-        pedido.itens.set(itens)
-
-        if metodo_pagamento == "CARTAO":
-            cartao = CartaoCredito.objects.create(
-                usuario=request.user,
-                numero=numero,
-                nome=nome,
-                validade=validade,
-                cvv=cvv
-            )
-            pedido.cartao = cartao
-            pedido.save()
+        try:
+            if itens_ids:
+                # Itens de carrinho já gravados (fluxo legado)
+                itens = ItemCarrinho.objects.filter(id__in=itens_ids)
+                pedido = criar_pedido(request.user, itens, metodo_pagamento, dados_cartao)
+            else:
+                pedido = fechar_carrinho(request.user, metodo_pagamento, dados_cartao)
+        except CarrinhoVazio:
+            return Response({"erro": "Nenhum item informado"}, status=400)
+        except PedidoVazio:
+            return Response({"erro": "Nenhum item encontrado"}, status=400)
+        except ProdutosIndisponiveis as exc:
+            return Response(_erros_indisponiveis(exc.produto_ids), status=409)
+        except CarrinhoConcorrente:
+            return Response(ERRO_CONCORRENTE, status=409)
 
         return Response({
             "mensagem": "Pedido criado com sucesso",
             "pedido_id": pedido.id,
-            "valor_total": total
+            "valor_total": pedido.valor_total,
+            "valor_desconto": pedido.valor_desconto,
         }, status=201)
 
 
 
-# ---- PERMISSÕES POR CARGO ---- #
-PERMISSOES_STATUS = {
-    "FINANCEIRO": ["PAGAMENTO_APROVADO", "PAGAMENTO_REPROVADO", "NOTA_FISCAL_EMITIDA"],
-    "LOGISTICA": ["EM_PREPARACAO", "ENVIADO"],
-    "CLIENTE": ["RECEBIDO", "SOLICITACAO_DEVOLUCAO"],
-    "POS_VENDA": ["EM_DEVOLUCAO", "DEVOLVIDO", "DEVOLUCAO_CANCELADA"],
-    "ADMIN": [status for status, _ in Pedido.StatusPedido.choices]
-}
+# ---- EXPORTAR PEDIDOS ---- #
+class ExportarPedidosView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.cargo.upper() not in ("FINANCEIRO", "ADMIN"):
+            return Response({"erro": "Apenas o financeiro pode exportar pedidos!"}, status=403)
+
+        formato = request.query_params.get("formato", "csv")
+        if formato not in FORMATOS:
+            return Response({"erro": "formato deve ser csv ou jsonl!"}, status=400)
+
+        try:
+            inicio, fim = intervalo_datas(request.query_params.get("inicio"), request.query_params.get("fim"))
+        except ValueError:
+            return Response({"erro": "inicio e fim devem ser datas AAAA-MM-DD, com inicio <= fim!"}, status=400)
+
+        response = StreamingHttpResponse(linhas_pedidos(formato, inicio, fim), content_type=FORMATOS[formato])
+        response["Content-Disposition"] = f'attachment; filename="pedidos.{formato}"'
+        return response
 
 
 # ---- ATUALIZAR STATUS DO PEDIDO ---- #
+def _alterar_status(usuario, pedido, novo_status):
+    """
+    Aplica as regras de permissão e transição ao pedido já carregado.
+    Devolve (dados, status_http); se status_http for 200, o pedido foi
+    alterado em memória e só falta salvá-lo.
+    """
+    cargo = usuario.cargo.upper()
+    status_atual = pedido.status
+
+    # Permissões configuradas na tabela pré-compilada (APP/status.py)
+    if not pode_alterar(cargo, novo_status):
+        return {"erro": "Você não tem permissão para mudar para este status!"}, 403
+
+    # Cliente só pode alterar o próprio pedido
+    # ---- REGRA ESPECÍFICA CLIENTE ---- #
+    if cargo == "CLIENTE":
+        if pedido.usuario_id != usuario.id:
+            return {"erro": "Você não pode alterar pedido de outro usuário!"}, 403
+
+        # Só pode marcar como RECEBIDO se já foi enviado e
+        # só pode pedir devolução se já recebeu
+        if not transicao_valida(cargo, status_atual, novo_status):
+            return {"erro": "Você não pode alterar para este status nessa etapa!"}, 403
+
+        pedido.status = novo_status
+
+        if novo_status == "RECEBIDO":
+            return {"mensagem": "Pedido marcado como recebido!"}, 200
+        return {"mensagem": "Solicitação de devolução registrada!"}, 200
+
+    # Regras da Cadeia do Pedido (ordem obrigatória)
+    if not transicao_valida(cargo, status_atual, novo_status):
+        return {"erro": "Transição inválida conforme regras do pedido!"}, 403
+
+    # 🧾 Quando emitir nota fiscal → deve gerar código de rastreio
+    if novo_status == "NOTA_FISCAL_EMITIDA":
+        pedido.codigo_rastreio = gerar_codigo_rastreio()
+
+    pedido.status = novo_status
+    for campo, valor in SEM_RESERVA.items():
+        setattr(pedido, campo, valor)
+
+    return {
+        "mensagem": "Status atualizado com sucesso!",
+        "novo_status": pedido.status,
+        "codigo_rastreio": pedido.codigo_rastreio
+    }, 200
+
+
 class StatusPedidoView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
         pedido_id = request.data.get("pedido_id")
         novo_status = request.data.get("status")
-        usuario = request.user
 
         if not pedido_id or not novo_status:
             return Response({"erro": "Campos pedido_id e status são obrigatórios!"}, status=400)
@@ -123,66 +422,126 @@ class StatusPedidoView(generics.GenericAPIView):
         except Pedido.DoesNotExist:
             return Response({"erro": "Pedido não encontrado"}, status=404)
 
-        cargo = usuario.cargo.upper()
-        status_atual = pedido.status
+        status_anterior = pedido.status
+        dados, status = _alterar_status(request.user, pedido, novo_status)
+        if status == 200:
+            try:
+                salvar_status(pedido, status_anterior)
+            except StatusConcorrente:
+                return Response(ERRO_STATUS_CONCORRENTE, status=409)
+        return Response(dados, status=status)
+
+
+# ---- ATUALIZAR STATUS EM LOTE ---- #
+class StatusPedidoLoteView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    limite_pedidos = 5000
+
+    def post(self, request):
+        pedidos_ids = request.data.get("pedidos")
+        novo_status = request.data.get("status")
+        usuario = request.user
 
-        # Permissões configuradas no dicionário
-        permissoes = PERMISSOES_STATUS.get(cargo, [])
+        if not pedidos_ids or not novo_status:
+            return Response({"erro": "Campos pedidos e status são obrigatórios!"}, status=400)
 
-        if novo_status not in permissoes:
+        try:
+            pedidos_ids = list(dict.fromkeys(int(i) for i in pedidos_ids))
+        except (TypeError, ValueError):
+            return Response({"erro": "Informe uma lista de ids de pedidos!"}, status=400)
+
+        if len(pedidos_ids) > self.limite_pedidos:
+            return Response({"erro": f"Máximo de {self.limite_pedidos} pedidos por requisição!"}, status=400)
+
+        cargo = usuario.cargo.upper()
+        if not pode_alterar(cargo, novo_status):
             return Response({"erro": "Você não tem permissão para mudar para este status!"}, status=403)
 
-        # Cliente só pode alterar o próprio pedido
-        # ---- REGRA ESPECÍFICA CLIENTE ---- #
+        resultados = atualizar_status_em_lote(usuario, cargo, pedidos_ids, novo_status)
+
+        return Response({
+            "novo_status": novo_status,
+            "atualizados": sum(1 for r in resultados if r["ok"]),
+            "resultados": resultados
+        })
+
+
+# ---- HISTÓRICO DE PEDIDOS DO CLIENTE ---- #
+class HistoricoPedidosView(LeitorValoresMixin, generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    leitor = LEITOR_PEDIDO
+    serializer_class = PedidoSerializer
+    pagination_class = HistoricoCursorPagination
+    filterset_class = PedidoFilter
+
+    def get_queryset(self):
+        # Página de pedidos + uma única query para itens e produtos da página
+        return Pedido.objects.filter(usuario_id=self.request.user.id)
+
+
+# ---- FILA DE TRABALHO POR CARGO ---- #
+class FilaPedidosView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = PedidoFilaSerializer
+    pagination_class = FilaCursorPagination
+    filter_backends = []
+
+    def get_queryset(self):
+        fila = fila_do_cargo(self.request.user.cargo.upper())
+        status = self.request.query_params.get("status")
+        if status:
+            fila = fila.filter(status=status)
+        return fila
+
+    def list(self, request, *args, **kwargs):
+        if request.user.cargo.upper() == "CLIENTE":
+            return Response({"erro": "A fila de pedidos é exclusiva da equipe!"}, status=403)
+        return super().list(request, *args, **kwargs)
+
+
+class ReservarPedidosView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    limite_reserva = 500
+    duracao_padrao = 300
+
+    def post(self, request):
+        cargo = request.user.cargo.upper()
         if cargo == "CLIENTE":
-            if pedido.usuario != usuario:
-                return Response({"erro": "Você não pode alterar pedido de outro usuário!"}, status=403)
-
-            # Só pode marcar como RECEBIDO se já foi enviado
-            if status_atual == "ENVIADO" and novo_status == "RECEBIDO":
-                pedido.status = novo_status
-                pedido.save()
-                return Response({"mensagem": "Pedido marcado como recebido!"})
-
-            # Só pode pedir devolução se já recebeu
-            if status_atual == "RECEBIDO" and novo_status == "SOLICITACAO_DEVOLUCAO":
-                pedido.status = novo_status
-                pedido.save()
-                return Response({"mensagem": "Solicitação de devolução registrada!"})
-
-            return Response({"erro": "Você não pode alterar para este status nessa etapa!"}, status=403)
-
-
-        # Regras da Cadeia do Pedido (ordem obrigatória)
-        regras_transicao = {
-            "EM_PROCESSAMENTO": ["PAGAMENTO_APROVADO", "PAGAMENTO_REPROVADO"],
-            "PAGAMENTO_APROVADO": ["NOTA_FISCAL_EMITIDA"],
-            "NOTA_FISCAL_EMITIDA": ["EM_PREPARACAO"],
-            "EM_PREPARACAO": ["ENVIADO"],
-            "ENVIADO": ["RECEBIDO"],
-            "RECEBIDO": ["SOLICITACAO_DEVOLUCAO"],
-            "SOLICITACAO_DEVOLUCAO": ["EM_DEVOLUCAO"],
-            "EM_DEVOLUCAO": ["DEVOLVIDO", "DEVOLUCAO_CANCELADA"]
-        }
-
-        if novo_status not in regras_transicao.get(status_atual, []):
-            return Response({"erro": "Transição inválida conforme regras do pedido!"}, status=403)
-
-        # 🧾 Quando emitir nota fiscal → deve gerar código de rastreio
-        if novo_status == "NOTA_FISCAL_EMITIDA":
-            import uuid
-            pedido.codigo_rastreio = f"BR-{uuid.uuid4().hex[:10].upper()}"
+            return Response({"erro": "A fila de pedidos é exclusiva da equipe!"}, status=403)
 
-        pedido.status = novo_status
-        pedido.save()
+        try:
+            quantidade = int(request.data.get("quantidade", 10))
+            duracao = int(request.data.get("duracao", self.duracao_padrao))
+        except (TypeError, ValueError):
+            return Response({"erro": "quantidade e duracao devem ser números inteiros!"}, status=400)
+
+        if not 0 < quantidade <= self.limite_reserva or duracao <= 0:
+            return Response({"erro": f"Reserve entre 1 e {self.limite_reserva} pedidos por vez!"}, status=400)
+
+        reserva, pedidos = reservar_pedidos(request.user, cargo, quantidade, duracao)
 
         return Response({
-            "mensagem": "Status atualizado com sucesso!",
-            "novo_status": pedido.status,
-            "codigo_rastreio": pedido.codigo_rastreio
+            "reserva": reserva,
+            "pedidos": PedidoFilaSerializer(pedidos, many=True).data
         })
 
 
+class LiberarReservaView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        reserva = request.data.get("reserva")
+        if not reserva:
+            return Response({"erro": "Informe a reserva a ser liberada!"}, status=400)
+
+        try:
+            liberados = liberar_reserva(request.user, reserva)
+        except ValidationError:
+            return Response({"erro": "Reserva inválida!"}, status=400)
+
+        return Response({"mensagem": "Reserva liberada!", "liberados": liberados})
+
+
 # ---- AVALIAR PRODUTO ---- #
 class AvaliarProdutoView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
@@ -190,85 +549,134 @@ class AvaliarProdutoView(generics.GenericAPIView):
     def post(self, request):
         pedido_id = request.data.get("pedido_id")
         produto_id = request.data.get("produto_id")
-        nota = int(request.data.get("nota"))
+        try:
+            nota = int(request.data.get("nota"))
+        except (TypeError, ValueError):
+            return Response({"erro": "A nota deve ser um número inteiro entre 1 e 5"}, status=400)
 
         if nota < 1 or nota > 5:
             return Response({"erro": "A nota deve ser entre 1 e 5"}, status=400)
 
         try:
-            pedido = Pedido.objects.get(id=pedido_id, usuario=request.user)
+            pedido = Pedido.objects.get(id=pedido_id, usuario_id=request.user.id)
         except Pedido.DoesNotExist:
             return Response({"erro": "Esse pedido não pertence a você"}, status=403)
 
-        try:
-            produto = Produto.objects.get(id=produto_id)
-        except Produto.DoesNotExist:
+        if not Produto.objects.filter(id=produto_id).exists():
             return Response({"erro": "Produto não encontrado"}, status=404)
 
-        Avaliacao.objects.create(
-            pedido=pedido,
-            produto=produto,
-            nota=nota
-        )
-
-        avaliacoes = Avaliacao.objects.filter(produto=produto)
-        total = avaliacoes.count()
-        media = sum(a.nota for a in avaliacoes) / total
-
-        produto.media_avaliacao = media
-        produto.total_avaliacoes = total
-        produto.save()
+        # Insere a avaliação e soma a nota aos agregados do produto com
+        # F-expressions: custo constante, sem reler as avaliações anteriores
+        try:
+            with transaction.atomic():
+                Avaliacao.objects.create(
+                    pedido=pedido,
+                    produto_id=produto_id,
+                    nota=nota
+                )
+                registrar_nota(produto_id, nota)
+                descartar_detalhes([produto_id])
+        except IntegrityError:
+            return Response({"erro": "Você já avaliou este produto neste pedido!"}, status=400)
+
+        # update() não dispara signals: invalida o catálogo e o detalhe do
+        # produto manualmente; o detalhe é remontado na próxima leitura, fora
+        # desta requisição
+        transaction.on_commit(invalidar_catalogo)
+
+        produto = Produto.objects.get(id=produto_id)
 
         return Response({
             "mensagem": "Avaliação registrada!",
-            "media_atual": media,
-            "total_avaliacoes": total
+            "media_atual": produto.media_avaliacao,
+            "total_avaliacoes": produto.total_avaliacoes,
+            "histograma": produto.histograma_avaliacoes
         })
 
 class RegistrarDevolucaoView(generics.GenericAPIView):
+    """
+    Aceita vários itens do mesmo pedido ({"pedido_id", "itens": [{"item_id",
+    "motivo"}, ...]}) e responde um resultado por item; o formato antigo, com
+    um só item_id e motivo, continua aceito e com as mesmas respostas.
+    """
     permission_classes = [IsAuthenticated]
+    limite_itens = 500
+    # Status do formato de um item só, por erro
+    STATUS_ERRO = {MOTIVO_OBRIGATORIO: 400, ITEM_FORA_DO_PEDIDO: 403, ITEM_EM_DEVOLUCAO: 400}
 
     def post(self, request):
         pedido_id = request.data.get("pedido_id")
-        item_id = request.data.get("item_id")
-        motivo = request.data.get("motivo")
+        itens = request.data.get("itens")
+        um_item = itens is None
 
-        if not motivo:
-            return Response({"erro": "É obrigatório informar o motivo da devolução!"}, status=400)
+        if um_item:
+            if not request.data.get("motivo"):
+                return Response({"erro": MOTIVO_OBRIGATORIO}, status=400)
+            itens = [{"item_id": request.data.get("item_id"), "motivo": request.data.get("motivo")}]
 
+        motivos = {}
         try:
-            pedido = Pedido.objects.get(id=pedido_id)
-        except Pedido.DoesNotExist:
+            for item in itens:
+                motivos.setdefault(int(item["item_id"]), item.get("motivo"))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            return Response({"erro": "Informe uma lista de itens com item_id e motivo!"}, status=400)
+
+        if not motivos:
+            return Response({"erro": "Informe ao menos um item para devolver!"}, status=400)
+        if len(motivos) > self.limite_itens:
+            return Response({"erro": f"Máximo de {self.limite_itens} itens por requisição!"}, status=400)
+
+        try:
+            pedido = Pedido.objects.only("usuario_id", "status").get(id=pedido_id)
+        except (Pedido.DoesNotExist, ValueError, TypeError):
             return Response({"erro": "Pedido não encontrado!"}, status=404)
 
         # Cliente só pode criar devolução do próprio pedido
-        if "Cliente" in request.user.groups.values_list("name", flat=True):
-            if pedido.usuario != request.user:
+        if request.user.cargo.upper() == "CLIENTE":
+            if pedido.usuario_id != request.user.id:
                 return Response({"erro": "Você não pode devolver pedido de outro usuário!"}, status=403)
 
             if pedido.status != "SOLICITACAO_DEVOLUCAO":
                 return Response({"erro": "O pedido ainda não está em processo de devolução!"}, status=403)
 
-        try:
-            item = ItemCarrinho.objects.get(id=item_id)
-        except ItemCarrinho.DoesNotExist:
-            return Response({"erro": "Item não encontrado!"}, status=404)
+        resultados = registrar_devolucoes(pedido.id, motivos)
 
-        # Garantir que o item pertence ao pedido
-        if item not in pedido.itens.all():
-            return Response({"erro": "Esse item não pertence ao pedido informado!"}, status=403)
+        if um_item:
+            resultado = resultados[0]
+            if not resultado["ok"]:
+                return Response({"erro": resultado["erro"]}, status=self.STATUS_ERRO[resultado["erro"]])
+            return Response({"mensagem": "Devolução registrada com sucesso!"})
 
-        # Evita criar devoluções duplicadas
-        if Devolucao.objects.filter(pedido=pedido, item=item).exists():
-            return Response({"erro": "Este item já está em devolução!"}, status=400)
+        return Response({
+            "registrados": sum(1 for r in resultados if r["ok"]),
+            "resultados": resultados
+        })
 
-        # Criar a devolução corretamente
-        Devolucao.objects.create(
-            pedido=pedido,
-            item=item,
-            motivo=motivo
-        )
 
-        return Response({
-            "mensagem": "Devolução registrada com sucesso!"
-        })
\ No newline at end of file
+# ---- RELATÓRIO DE VENDAS ---- #
+class RelatorioVendasView(LeituraReplicaMixin, generics.GenericAPIView):
+    """Lê só os consolidados (APP/relatorios.py), nunca os pedidos."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.cargo.upper() not in ("FINANCEIRO", "ADMIN"):
+            return Response({"erro": "Apenas o financeiro pode ver o relatório de vendas!"}, status=403)
+
+        agrupar = request.query_params.get("agrupar", "dia")
+        if agrupar not in AGRUPAMENTOS:
+            return Response({"erro": "agrupar deve ser dia, categoria ou produto!"}, status=400)
+
+        try:
+            fim = date.fromisoformat(request.query_params.get("fim") or timezone.localdate().isoformat())
+            inicio = date.fromisoformat(request.query_params.get("inicio") or (fim - timedelta(days=30)).isoformat())
+            limite = int(request.query_params.get("limite", 50))
+        except ValueError:
+            return Response({"erro": "inicio e fim devem ser datas AAAA-MM-DD e limite um número!"}, status=400)
+        if inicio > fim:
+            return Response({"erro": "inicio deve ser anterior ao fim!"}, status=400)
+
+        categoria = request.query_params.get("categoria")
+        if categoria is not None and not categoria.isdigit():
+            return Response({"erro": "categoria inválida!"}, status=400)
+
+        return Response(relatorio_vendas(inicio, fim, agrupar, categoria, max(1, min(limite, 500))))
@@ -0,0 +1,211 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, ParseError
+
+from .autenticacao import ClaimsJWTAuthentication
+from .cache import aobter_ou_calcular, chave_pagina, etag_confere
+from .carrinho import Carrinho, CarrinhoConcorrente, QuantidadeInvalida, aprodutos_inexistentes
+from .models import ItemCarrinho, Pedido
+from .pedidos import (
+    CarrinhoVazio, PedidoVazio, ProdutosIndisponiveis, StatusConcorrente, criar_pedido, fechar_carrinho,
+    salvar_status,
+)
+from .renderizadores import dumps, loads
+from .roteamento import leitura_na_replica
+from .serializacao import CampoDesconhecido
+from .views import (
+    ERRO_CONCORRENTE, ERRO_STATUS_CONCORRENTE, ERROS_QUANTIDADE, ListaProdutosView, _alterar_status, _aplicacao,
+    _dados_cartao, _erros_indisponiveis, _erros_inexistentes, _itens_para_adicionar, _status_erros_carrinho,
+    _validar_operacoes,
+)
+
+
+# ---- VIEWS ASSÍNCRONAS ---- #
+# Versões async dos endpoints mais quentes, servidas por APP/urls_async.py
+# (API_ASYNC=True). Respondem exatamente como as views síncronas de
+# APP/views.py, cujas regras reaproveitam.
+#
+# A lista de produtos e o carrinho usam o ORM assíncrono (que, no Django,
+# ainda executa cada query numa thread dedicada); o ganho vem de não ocupar
+# um worker enquanto a requisição espera (cache, trava do catálogo, claims
+# do token). O que precisa de transação (checkout, status) vai numa única
+# passagem pela thread, com sync_to_async.
+def resposta_json(dados, status=200):
+    return HttpResponse(dumps(dados), status=status, content_type="application/json")
+
+
+def ler_dados(request):
+    """Corpo JSON ou formulário, como request.data do DRF."""
+    if request.content_type == "application/json":
+        try:
+            return loads(request.body or b"{}")
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+    return request.POST
+
+
+class APIAsyncView(View):
+    """Autenticação por claims, leitura do corpo e erros no formato do DRF."""
+
+    autenticacao = ClaimsJWTAuthentication()
+    exige_login = True
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Autenticação por token, como nas APIViews do DRF: sem CSRF
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            usuario = await self.autenticacao.aautenticar(request)
+            if usuario is None and self.exige_login:
+                raise NotAuthenticated()
+            if usuario is not None:
+                request.user = usuario
+            self.dados = ler_dados(request) if request.method == "POST" else {}
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            dados = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            response = resposta_json(dados, status=exc.status_code)
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                response.status_code = 401
+                response["WWW-Authenticate"] = self.autenticacao.authenticate_header(request)
+            return response
+
+
+# ---- LISTA PRODUTOS ---- #
+async def _pagina_catalogo(request):
+    """
+    A página de ListaProdutosView (filtros, cursor, leitor) com as queries
+    da página e das imagens pelo ORM assíncrono.
+    """
+    view = ListaProdutosView()
+    view.setup(request)
+    view.request = view.initialize_request(request)
+    view.format_kwarg = None
+
+    leitor = view.get_leitor()
+    if request.GET.get("categoria"):
+        # O filtro de categoria valida o id no banco (ModelChoiceFilter): só ele passa pela thread
+        queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+    else:
+        queryset = view.filter_queryset(view.get_queryset())
+
+    pagina = await view.paginator.apaginate_queryset(leitor.linhas(queryset), view.request, view=view)
+    return view.paginator.get_paginated_response(await leitor.aserializar(pagina)).data
+
+
+class ListaProdutosAsyncView(APIAsyncView):
+    exige_login = False
+
+    async def get(self, request):
+        # ?fields= inválido não pode virar uma página em cache
+        try:
+            ListaProdutosView.leitor.selecionar(request.GET.get("fields"))
+        except CampoDesconhecido as exc:
+            return resposta_json({"erro": str(exc)}, status=400)
+
+        with leitura_na_replica():
+            chave, etag = chave_pagina(request)
+
+            if etag_confere(etag, request.headers.get("If-None-Match", "")):
+                response = HttpResponse(status=304)
+            else:
+                # Só a falta de cache vai ao banco
+                dados = await aobter_ou_calcular(chave, lambda: _pagina_catalogo(request))
+                response = resposta_json(dados)
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+
+# ---- ADICIONA ITEM AO CARRINHO ---- #
+class AddCarrinhoAsyncView(APIAsyncView):
+    async def post(self, request):
+        operacoes = _itens_para_adicionar(self.dados)
+        if operacoes is None:
+            return resposta_json({"erro": "itens deve ser uma lista!"}, status=400)
+
+        erros, novos_produtos = _validar_operacoes(operacoes)
+        if not erros and novos_produtos:
+            erros = _erros_inexistentes(await aprodutos_inexistentes(novos_produtos))
+        if not erros:
+            try:
+                carrinho = await Carrinho.aalterar(request.user.id, _aplicacao(operacoes))
+            except QuantidadeInvalida:
+                erros = ERROS_QUANTIDADE
+            except CarrinhoConcorrente:
+                return resposta_json(ERRO_CONCORRENTE, status=409)
+        if erros:
+            return resposta_json({"erro": erros[0]["erro"], "detalhes": erros}, status=_status_erros_carrinho(erros))
+
+        return resposta_json({
+            "mensagem": "Item adicionado ao carrinho",
+            "itens": carrinho.itens
+        })
+
+
+# ---- CRIAR PEDIDO ---- #
+class CriarPedidoAsyncView(APIAsyncView):
+    async def post(self, request):
+        itens_ids = self.dados.get("itens")
+        metodo_pagamento = self.dados.get("metodo_pagamento")
+
+        dados_cartao = None
+        if metodo_pagamento == "CARTAO":
+            dados_cartao = _dados_cartao(self.dados)
+            if not all(dados_cartao.values()):
+                return resposta_json({"erro": "Dados do cartão incompletos!"}, status=400)
+
+        # transaction.atomic não funciona em código assíncrono: o pipeline
+        # inteiro (já com número fixo de queries) roda em uma só passagem
+        try:
+            if itens_ids:
+                itens = ItemCarrinho.objects.filter(id__in=itens_ids)
+                pedido = await sync_to_async(criar_pedido)(request.user, itens, metodo_pagamento, dados_cartao)
+            else:
+                pedido = await sync_to_async(fechar_carrinho)(request.user, metodo_pagamento, dados_cartao)
+        except CarrinhoVazio:
+            return resposta_json({"erro": "Nenhum item informado"}, status=400)
+        except PedidoVazio:
+            return resposta_json({"erro": "Nenhum item encontrado"}, status=400)
+        except ProdutosIndisponiveis as exc:
+            return resposta_json(_erros_indisponiveis(exc.produto_ids), status=409)
+        except CarrinhoConcorrente:
+            return resposta_json(ERRO_CONCORRENTE, status=409)
+
+        return resposta_json({
+            "mensagem": "Pedido criado com sucesso",
+            "pedido_id": pedido.id,
+            "valor_total": pedido.valor_total,
+            "valor_desconto": pedido.valor_desconto,
+        }, status=201)
+
+
+# ---- ATUALIZAR STATUS DO PEDIDO ---- #
+class StatusPedidoAsyncView(APIAsyncView):
+    async def post(self, request):
+        pedido_id = self.dados.get("pedido_id")
+        novo_status = self.dados.get("status")
+
+        if not pedido_id or not novo_status:
+            return resposta_json({"erro": "Campos pedido_id e status são obrigatórios!"}, status=400)
+
+        try:
+            pedido = await Pedido.objects.aget(id=pedido_id)
+        except Pedido.DoesNotExist:
+            return resposta_json({"erro": "Pedido não encontrado"}, status=404)
+
+        status_anterior = pedido.status
+        dados, status = _alterar_status(request.user, pedido, novo_status)
+        if status == 200:
+            try:
+                await sync_to_async(salvar_status)(pedido, status_anterior)
+            except StatusConcorrente:
+                return resposta_json(ERRO_STATUS_CONCORRENTE, status=409)
+        return resposta_json(dados, status=status)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista: a latência medida inclui todos os outros middlewares
+    'APP.metricas.MetricasMiddleware',
+    # Antes de todos os que leem ou alteram o corpo da resposta (ver APP/compressao.py)
+    'APP.compressao.CompressaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,13 +81,105 @@ WSGI_APPLICATION = 'MANGEMANGEIRA.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Executado em cada nova conexão SQLite; cache_size negativo é em KiB.
+# WAL deixa leitores e o escritor trabalharem ao mesmo tempo, mas fica
+# gravado no arquivo: só com MANGEIRA_SQLITE_WAL=1, para que rodar o
+# manage.py não altere o db.sqlite3 versionado do ambiente de desenvolvimento.
+# synchronous=NORMAL só é seguro contra queda de energia em WAL.
+SQLITE_WAL = os.environ.get('MANGEIRA_SQLITE_WAL') == '1'
+SQLITE_INIT_COMMAND = (
+    ('PRAGMA journal_mode=WAL;PRAGMA synchronous=NORMAL;' if SQLITE_WAL else '')
+    + 'PRAGMA cache_size=-20000;'
+    'PRAGMA temp_store=MEMORY'
+)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+        },
     }
 }
 
+# Réplica de leitura opcional para o tráfego do catálogo (ver APP/roteamento.py).
+# Localmente: MANGEIRA_DB_REPLICA=replica.sqlite3 com uma cópia do db.sqlite3.
+if os.environ.get('MANGEIRA_DB_REPLICA'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.environ['MANGEIRA_DB_REPLICA'],
+        'OPTIONS': {
+            'init_command': SQLITE_INIT_COMMAND,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+
+DATABASE_READ_ALIAS = 'replica' if 'replica' in DATABASES else None
+
+DATABASE_ROUTERS = ['APP.roteamento.RoteadorLeituraEscrita']
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mangeira',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Versões das credenciais dos usuários (APP/autenticacao.py): nunca
+    # disputam espaço com páginas e documentos do catálogo. Em produção, um
+    # backend compartilhado e sem despejo (ex.: Redis com noeviction).
+    'credenciais': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mangeira-credenciais',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10_000_000,
+        },
+    },
+    # Cópias de leitura dos carrinhos (APP/carrinho.py), também fora do
+    # despejo das páginas do catálogo; em produção, compartilhado entre os
+    # processos. Os carrinhos em si ficam no banco (CarrinhoSalvo).
+    'carrinho': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'mangeira-carrinho',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10_000_000,
+        },
+    },
+}
+
+# Páginas do catálogo em cache (segundos) e tempo máximo de espera
+# enquanto outro worker recalcula a mesma página.
+CATALOGO_CACHE_TIMEOUT = 60 * 15
+CATALOGO_CACHE_ESPERA = 5
+
+# Documentos de detalhe do produto (APP/detalhe.py): remontados a cada
+# alteração; a validade só limita o espaço ocupado no cache.
+DETALHE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Carrinho de compras: alias do cache da cópia de leitura e validade dela
+# em segundos (o carrinho continua no banco depois que a cópia vence).
+CARRINHO_CACHE = 'carrinho'
+CARRINHO_TIMEOUT = 60 * 60 * 24 * 30
+
+# Sob ASGI (uvicorn MANGEMANGEIRA.asgi:application), MANGEIRA_API_ASYNC=1
+# serve o catálogo, o carrinho, a criação e o status de pedidos pelas views
+# assíncronas de APP/views_async.py.
+API_ASYNC = os.environ.get('MANGEIRA_API_ASYNC') == '1'
+
+# Métricas por rota em /api/metricas/ (formato Prometheus). Com o token
+# definido, o scraper precisa enviar "Authorization: Bearer <token>".
+# Queries acima do limite (ms) são registradas no logger APP.metricas.
+METRICAS_TOKEN = os.environ.get('MANGEIRA_METRICAS_TOKEN')
+METRICAS_QUERY_LENTA_MS = 200
+
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -93,10 +190,24 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'APP.autenticacao.ClaimsJWTAuthentication',
     ),
+
+    # orjson quando instalado, json padrão senão (ver APP/renderizadores.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'APP.renderizadores.JSONRendererRapido',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'APP.renderizadores.JSONParserRapido',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Respostas menores que isso não são comprimidas
+COMPRESSAO_MINIMO_BYTES = 1024
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -120,8 +231,21 @@ AUTH_USER_MODEL = 'APP.Usuario'
 
 SIMPLE_JWT = {
     'USER_ID_FIELD': 'email',
+    'TOKEN_OBTAIN_SERIALIZER': 'APP.autenticacao.TokenUsuarioSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'APP.autenticacao.TokenRefreshUsuarioSerializer',
 }
 
+# Validade (segundos) do cache de usuários usado quando o token não traz
+# as claims de id/cargo ou é anterior a uma alteração do usuário.
+USUARIO_CACHE_TIMEOUT = 60
+
+# Alias e validade (segundos) das cópias em cache da versao_credenciais.
+# Com o LocMem cada processo tem sua cópia e só o worker que alterou o
+# usuário a descarta: nos outros, a validade é o tempo máximo em que um
+# token antigo ainda passa. Por isso é curta como a do cache de usuários.
+CREDENCIAIS_CACHE = 'credenciais'
+CREDENCIAIS_CACHE_TIMEOUT = USUARIO_CACHE_TIMEOUT
+
 
 
 
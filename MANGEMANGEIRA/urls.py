@@ -14,10 +14,11 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path,include
 
 urlpatterns = [
-    path('api/', include('APP.urls')),
+    path('api/', include('APP.urls_async' if settings.API_ASYNC else 'APP.urls')),
     path('admin/', admin.site.urls),
 ]